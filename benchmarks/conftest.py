@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.templates import LARGE_TEMPLATE, TEMPLATE_SHAPES, build_template, build_tags
+from ieasyreports.core.report_generator import DefaultReportGenerator, TemplateCache
+from ieasyreports.settings import TagSettings
+
+DEFAULT_ROWS = "10,1000,10000,100000"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-rows", default=DEFAULT_ROWS,
+        help=f"comma separated numbers of data rows to render, defaults to {DEFAULT_ROWS}"
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        rows = [int(value) for value in metafunc.config.getoption("bench_rows").split(",")]
+        metafunc.parametrize("rows", rows)
+    if "shape" in metafunc.fixturenames:
+        metafunc.parametrize("shape", TEMPLATE_SHAPES, ids=[shape.name for shape in TEMPLATE_SHAPES])
+
+
+@pytest.fixture(scope="session")
+def tag_settings():
+    return TagSettings()
+
+
+@pytest.fixture(scope="session")
+def templates_directory(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("templates")
+    for shape in (*TEMPLATE_SHAPES, LARGE_TEMPLATE):
+        build_template(shape, str(directory))
+    return str(directory)
+
+
+@pytest.fixture
+def make_generator(templates_directory, tag_settings, tmp_path):
+    def make(shape, template_cache=None, generator_class=DefaultReportGenerator):
+        return generator_class(
+            tags=build_tags(tag_settings),
+            template=f"{shape.name}.xlsx",
+            templates_directory_path=templates_directory,
+            reports_directory_path=str(tmp_path),
+            tag_settings=tag_settings,
+            template_cache=template_cache if template_cache is not None else TemplateCache(max_entries=0)
+        )
+    return make
@@ -0,0 +1,101 @@
+"""Synthetic templates and data for the benchmarks."""
+import os
+from dataclasses import dataclass
+
+import openpyxl
+from openpyxl.styles import Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from ieasyreports.core.tags import Tag
+from ieasyreports.settings import TagSettings
+
+
+@dataclass(frozen=True)
+class TemplateShape:
+    """Size of the parts of a template that the generators have to move and copy for every rendered row."""
+    name: str
+    merged_ranges: int = 0
+    formulas: int = 0
+    styled_columns: int = 0
+    static_rows: int = 0
+
+
+TEMPLATE_SHAPES = (
+    TemplateShape("plain"),
+    TemplateShape("merged", merged_ranges=200),
+    TemplateShape("formulas", formulas=200),
+    TemplateShape("styled", styled_columns=20),
+)
+# a template with a large static part, which is copied for every report
+LARGE_TEMPLATE = TemplateShape("large", static_rows=2000)
+STATIC_COLUMNS = 20
+
+HEADER_ROW = 3
+DATA_ROW = HEADER_ROW + 1
+
+
+class Station:
+    def __init__(self, idx: int):
+        self.code = f"S{idx:06d}"
+        self.name = f"Station {idx}"
+        self.discharge = idx * 1.5
+        self.region = f"Region {idx % 10}"
+
+
+def build_template(shape: TemplateShape, directory: str) -> str:
+    """
+    Saves a template with a single table and returns its filename. The merged ranges, formulas
+    and static rows are placed below the table, so they are shifted for every inserted row.
+    """
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "{{TITLE}}"
+    ws.merge_cells("A1:D1")
+    ws.cell(row=HEADER_ROW, column=1, value="{{HEADER.REGION}}")
+    ws.cell(row=DATA_ROW, column=1, value="{{DATA.CODE}}")
+    ws.cell(row=DATA_ROW, column=2, value="{{DATA.NAME}}")
+    ws.cell(row=DATA_ROW, column=3, value="{{DATA.DISCHARGE}}")
+    ws.cell(row=DATA_ROW, column=4, value=f"=C{DATA_ROW}*2")
+
+    border = Border(left=Side(style="thin"), right=Side(style="thin"))
+    for column in range(5, 5 + shape.styled_columns):
+        cell = ws.cell(row=DATA_ROW, column=column, value="{{DATA.DISCHARGE}}")
+        cell.font = Font(bold=column % 2 == 0)
+        cell.fill = PatternFill("solid", fgColor="FFFF00")
+        cell.border = border
+        cell.number_format = "0.00"
+
+    row = DATA_ROW + 2
+    for idx in range(shape.merged_ranges):
+        ws.cell(row=row + idx, column=1, value=f"merged {idx}")
+        ws.merge_cells(start_row=row + idx, start_column=1, end_row=row + idx, end_column=3)
+    row += shape.merged_ranges
+
+    for idx in range(shape.formulas):
+        column = get_column_letter(idx % 4 + 1)
+        ws.cell(row=row + idx, column=idx % 4 + 1, value=f"=SUM({column}{DATA_ROW}:{column}{DATA_ROW})+{column}{row}")
+
+    row += shape.formulas
+    for idx in range(shape.static_rows):
+        for column in range(1, STATIC_COLUMNS + 1):
+            cell = ws.cell(row=row + idx, column=column, value=f"static {idx}" if column % 2 else idx * column)
+            if column % 5 == 0:
+                cell.border = border
+
+    filename = f"{shape.name}.xlsx"
+    wb.save(os.path.join(directory, filename))
+    return filename
+
+
+def build_tags(tag_settings: TagSettings) -> list[Tag]:
+    return [
+        Tag("TITLE", "Benchmark", tag_settings),
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+        Tag("NAME", lambda obj, **kwargs: obj.name, tag_settings, data=True),
+        Tag("DISCHARGE", lambda obj, **kwargs: obj.discharge, tag_settings, data=True),
+    ]
+
+
+def build_stations(rows: int) -> list[Station]:
+    return sorted((Station(idx) for idx in range(rows)), key=lambda station: station.region)
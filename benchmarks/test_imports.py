@@ -0,0 +1,25 @@
+"""
+Benchmarks of the time it takes to import the library in a fresh interpreter, as CLI tools and serverless
+handlers do on every invocation. `pass` is the startup time of the interpreter itself.
+"""
+import subprocess
+import sys
+
+import pytest
+
+STATEMENTS = [
+    "pass",
+    "import ieasyreports",
+    "from ieasyreports.core.tags import Tag",
+    "from ieasyreports.core.report_generator import scan_template_tags",
+    "from ieasyreports.core.report_generator import DefaultReportGenerator",
+    "from ieasyreports.settings import ReportGeneratorSettings; ReportGeneratorSettings()",
+]
+
+
+@pytest.mark.parametrize("statement", STATEMENTS)
+def test_import(benchmark, statement):
+    benchmark.group = "import"
+    benchmark.pedantic(
+        lambda: subprocess.run([sys.executable, "-c", statement], check=True), rounds=5
+    )
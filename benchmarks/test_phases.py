@@ -0,0 +1,100 @@
+"""
+Benchmarks of the phases of `DefaultReportGenerator.generate_report`, for each template shape and number of rows.
+
+Every round starts from a freshly loaded template, the setup of a round isn't part of the measurement.
+`test_generate_report` times whole reports rendered by each of the generators.
+"""
+import pytest
+
+from benchmarks.templates import LARGE_TEMPLATE, build_stations
+from ieasyreports.core.report_generator import DefaultReportGenerator, StreamingReportGenerator, XmlReportGenerator
+
+
+def _rounds(rows: int) -> int:
+    return 5 if rows <= 1000 else 1
+
+
+@pytest.fixture
+def generator(make_generator, shape):
+    generator = make_generator(shape)
+    generator.validate()
+    return generator
+
+
+def _render_tables(generator, stations) -> dict:
+    generator._load_compiled_template()
+    generator._select_table(None)
+    return {None: generator._render_table(stations)}
+
+
+def test_validate(benchmark, make_generator, shape):
+    benchmark.group = "validate"
+    benchmark.pedantic(
+        lambda generator: generator.validate(),
+        setup=lambda: ((make_generator(shape),), {}),
+        rounds=5
+    )
+
+
+@pytest.mark.parametrize("source", ["compiled", "file"])
+def test_load_large_template(benchmark, make_generator, source):
+    """Times copying the compiled workbook of a large template for a report, against loading the file again."""
+    benchmark.group = "load-large"
+    generator = make_generator(LARGE_TEMPLATE)
+    generator.validate()
+
+    load = generator.compiled_template.new_workbook if source == "compiled" else generator.open_template_file
+    benchmark.pedantic(load, rounds=5)
+
+
+def test_prepare_structure(benchmark, generator, shape, rows):
+    benchmark.group = f"prepare_structure-{shape.name}"
+    benchmark.extra_info["rows"] = rows
+    stations = build_stations(rows)
+
+    benchmark.pedantic(
+        generator._prepare_structure,
+        setup=lambda: ((_render_tables(generator, stations),), {}),
+        rounds=_rounds(rows)
+    )
+
+
+def test_handle_header_and_data_tags(benchmark, generator, shape, rows):
+    benchmark.group = f"handle_header_and_data_tags-{shape.name}"
+    benchmark.extra_info["rows"] = rows
+    stations = build_stations(rows)
+
+    def setup():
+        tables = _render_tables(generator, stations)
+        generator._prepare_structure(tables)
+        return (tables[None],), {}
+
+    benchmark.pedantic(generator._handle_header_and_data_tags, setup=setup, rounds=_rounds(rows))
+
+
+def test_save(benchmark, generator, shape, rows):
+    benchmark.group = f"save-{shape.name}"
+    benchmark.extra_info["rows"] = rows
+    stations = build_stations(rows)
+
+    def setup():
+        generator._render_report(stations, None)
+        return (None, None, True), {}
+
+    benchmark.pedantic(generator._write_report, setup=setup, rounds=_rounds(rows))
+
+
+@pytest.mark.parametrize(
+    "generator_class", [DefaultReportGenerator, StreamingReportGenerator, XmlReportGenerator],
+    ids=lambda generator_class: generator_class.__name__
+)
+def test_generate_report(benchmark, make_generator, shape, rows, generator_class):
+    benchmark.group = f"generate_report-{shape.name}-{rows}"
+    benchmark.extra_info["rows"] = rows
+    stations = build_stations(rows)
+    generator = make_generator(shape, generator_class=generator_class)
+    generator.validate()
+
+    benchmark.pedantic(
+        lambda: generator.generate_report(stations, as_stream=True), rounds=_rounds(rows)
+    )
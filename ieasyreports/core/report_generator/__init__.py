@@ -1 +1,58 @@
-from .report_generator import DefaultReportGenerator
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# the exports are imported on first access (PEP 562), so e.g. scanning templates or using the report cache
+# doesn't import openpyxl, and importing the package doesn't load the settings or the generators
+_EXPORTS = {
+    "CompiledSheet": ".compiled_template",
+    "CompiledTemplate": ".compiled_template",
+    "DefaultReportGenerator": ".report_generator",
+    "StreamingReportGenerator": ".streaming_report_generator",
+    "XmlReportGenerator": ".xml_report_generator",
+    "TemplateCache": ".template_cache",
+    "get_default_template_cache": ".template_cache",
+    "TemplateStore": ".template_store",
+    "get_default_template_store": ".template_store",
+    "scan_template_sheets": ".template_scanner",
+    "scan_template_tags": ".template_scanner",
+    "AsyncReportGenerator": ".async_report_generator",
+    "ReportJob": ".batch",
+    "ReportResult": ".batch",
+    "generate_reports": ".batch",
+    "LoggingInstrumentation": ".instrumentation",
+    "ReportInstrumentation": ".instrumentation",
+    "ReportStats": ".instrumentation",
+    "SpanInstrumentation": ".instrumentation",
+    "DiskReportCache": ".report_cache",
+    "ReportCache": ".report_cache",
+    "ReportCacheInfo": ".report_cache",
+    "fingerprint": ".report_cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(importlib.import_module(module, __name__), name)
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .compiled_template import CompiledSheet, CompiledTemplate
+    from .report_generator import DefaultReportGenerator
+    from .streaming_report_generator import StreamingReportGenerator
+    from .xml_report_generator import XmlReportGenerator
+    from .template_cache import TemplateCache, get_default_template_cache
+    from .template_store import TemplateStore, get_default_template_store
+    from .template_scanner import scan_template_sheets, scan_template_tags
+    from .async_report_generator import AsyncReportGenerator
+    from .batch import ReportJob, ReportResult, generate_reports
+    from .instrumentation import LoggingInstrumentation, ReportInstrumentation, ReportStats, SpanInstrumentation
+    from .report_cache import DiskReportCache, ReportCache, ReportCacheInfo, fingerprint
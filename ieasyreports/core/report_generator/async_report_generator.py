@@ -0,0 +1,231 @@
+import asyncio
+import inspect
+import io
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, Optional
+
+from ieasyreports.core.report_generator.columnar import ColumnarData, is_columnar
+from ieasyreports.core.report_generator.compiled_template import CompiledSheet
+from ieasyreports.core.report_generator.report_cache import materialize
+from ieasyreports.core.report_generator.report_generator import DefaultReportGenerator
+from ieasyreports.core.tags.tag import Tag
+from ieasyreports.core.tags.tag_cache import MISSING
+from ieasyreports.exceptions import InvalidTagException, TemplateNotValidatedException
+
+
+class AsyncReportGenerator(DefaultReportGenerator):
+    """
+    Report generator for asyncio applications, whose tag value functions can be coroutines.
+
+    All tag values of a report, on all of its worksheets, are resolved concurrently, at most `max_concurrency`
+    at a time, before any cell is written. The report is then rendered and serialized in `executor`,
+    or the event loop's default executor, so the event loop isn't blocked by openpyxl.
+
+    A generator renders one report at a time, reports can be generated concurrently with separate generators.
+    """
+    def __init__(self, *args, max_concurrency: int = 16, executor: Optional[Executor] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.executor = executor
+        self._general_values: dict[str, Any] = {}
+        self._object_values: dict[tuple[str, int], Any] = {}
+        self._column_values: dict[tuple[str, int], list[Any]] = {}
+
+    async def generate_report(
+        self, list_objects: Optional[Iterable[Any]] = None,
+        output_path: Optional[str] = None, output_filename: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        as_stream: bool = False,
+        presorted: bool = False,
+        data_sources: Optional[Dict[str, Iterable[Any]]] = None,
+        data_fingerprint: Optional[str] = None
+    ) -> io.BytesIO | str:
+        if self.validate_only:
+            raise TemplateNotValidatedException(
+                "The template was only scanned for tags. "
+                "Create the generator without `validate_only` to generate reports."
+            )
+        if not self.validated:
+            raise TemplateNotValidatedException(
+                "Template must be validated first. Did you forget to call the `.validate()` method?"
+            )
+
+        with self._instrument_report():
+            cache_key = None
+            if self.report_cache is not None:
+                if data_fingerprint is None:
+                    list_objects = materialize(list_objects)
+                    data_sources = {name: materialize(objects) for name, objects in (data_sources or {}).items()}
+                cache_key = self._get_report_cache_key(list_objects, context, presorted, data_sources, data_fingerprint)
+                output = self._read_cached_report(cache_key, output_path, output_filename, as_stream)
+                if output is not None:
+                    return output
+
+            output = await self._generate_report(
+                list_objects, output_path, output_filename, context, as_stream, data_sources
+            )
+            self._cache_report(cache_key, output)
+            return output
+
+    async def _generate_report(
+        self, list_objects: Optional[Iterable[Any]], output_path: Optional[str], output_filename: Optional[str],
+        context: Optional[Dict[str, Any]], as_stream: bool, data_sources: Optional[Dict[str, Iterable[Any]]]
+    ) -> io.BytesIO | str:
+        self._reset_tag_resolver()
+        sheets = []
+        for compiled_sheet, table_objects in self._get_sheet_data_sources(
+            list_objects if list_objects is not None else [], data_sources
+        ):
+            self._select_sheet(compiled_sheet, self.compiled_template.workbook.worksheets[compiled_sheet.sheet_index])
+            tables = {}
+            for name, objects in table_objects.items():
+                sorted_list_objects = self.prepare_list_objects(objects)
+                tables[name] = sorted_list_objects if is_columnar(sorted_list_objects) else list(sorted_list_objects)
+            if context:
+                self._add_global_tag_context(context)
+            sheets.append((compiled_sheet, tables))
+
+        try:
+            with self._phase("tag_resolution"):
+                await self._resolve_tag_values(sheets)
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._render_and_write_report, sheets, output_path, output_filename, as_stream
+            )
+        finally:
+            self._general_values = {}
+            self._object_values = {}
+            self._column_values = {}
+
+    def _render_and_write_report(
+        self, sheets: list[tuple[CompiledSheet, dict[Optional[str], Any]]], output_path: Optional[str],
+        output_filename: Optional[str], as_stream: bool
+    ) -> io.BytesIO | str:
+        self._load_compiled_template()
+        for compiled_sheet, tables in sheets:
+            self._select_sheet(compiled_sheet, self.template.worksheets[compiled_sheet.sheet_index])
+            self._render_objects(tables)
+        return self._write_report(output_path, output_filename, as_stream)
+
+    async def _resolve_tag_values(self, sheets: list[tuple[CompiledSheet, dict[Optional[str], Any]]]) -> None:
+        """
+        Resolves the values of all tags in the template, for every object of every table of every worksheet,
+        with bounded concurrency.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        general_tags = set()
+        object_tags: dict[str, list[Any]] = {}
+        column_tags: dict[str, list[ColumnarData]] = {}
+        for compiled_sheet, tables in sheets:
+            self._select_sheet(compiled_sheet, self.compiled_template.workbook.worksheets[compiled_sheet.sheet_index])
+            sheet_general_tags, _ = self._get_template_tags()
+            general_tags.update(sheet_general_tags)
+            for name, sorted_list_objects in tables.items():
+                self._select_table(name)
+                if is_columnar(sorted_list_objects):
+                    data = ColumnarData.from_table(sorted_list_objects)
+                    for tag in self._get_table_tags():
+                        column_tags.setdefault(tag, []).append(data)
+                else:
+                    for tag in self._get_table_tags():
+                        object_tags.setdefault(tag, []).extend(sorted_list_objects)
+
+        await self._prefetch_tag_values_async(object_tags, column_tags)
+
+        general_tags = list(general_tags)
+        object_keys = list({
+            (tag, id(obj)): (tag, obj) for tag, objs in object_tags.items() for obj in objs
+        }.values())
+        column_keys = [
+            (tag, data) for tag, tables in column_tags.items() for data in tables if self.tags[tag].column is None
+        ]
+        values = await asyncio.gather(
+            *(self._call_value_fn(semaphore, tag) for tag in general_tags),
+            *(self._call_value_fn(semaphore, tag, obj=obj) for tag, obj in object_keys),
+            *(self._resolve_column_values(semaphore, tag, data) for tag, data in column_keys)
+        )
+
+        values = iter(values)
+        self._general_values = {tag: next(values) for tag in general_tags}
+        self._object_values = {(tag, id(obj)): next(values) for tag, obj in object_keys}
+        self._column_values = {(tag, id(data.table)): next(values) for tag, data in column_keys}
+
+    async def _prefetch_tag_values_async(
+        self, object_tags: dict[str, list[Any]], column_tags: dict[str, list[ColumnarData]]
+    ) -> None:
+        """Calls the prefetch function of every tag once, with its objects from all tables and worksheets."""
+        async def prefetch(tag: Tag) -> None:
+            objs = list(object_tags.get(tag.name, []))
+            for data in column_tags.get(tag.name, []):
+                objs.extend(data.row(idx) for idx in range(data.num_rows))
+            value = self._resolver.prefetch(tag, objs)
+            if inspect.isawaitable(value):
+                value = await value
+            self._resolver.update_tag_context(tag.name, {"prefetched": value})
+
+        prefetch_tags = [
+            self.tags[tag] for tag in {*object_tags, *column_tags} if self.tags[tag].has_prefetch_fn()
+        ]
+        await asyncio.gather(*(prefetch(tag) for tag in prefetch_tags))
+
+    def _prefetch_tag_values(self, objs: list[Any], header: bool = True) -> None:
+        # the values are prefetched while they are resolved, before the report is rendered
+        pass
+
+    async def _resolve_column_values(self, semaphore: asyncio.Semaphore, tag_name: str, data: ColumnarData) -> list:
+        tag = self.tags[tag_name]
+        if tag.vectorized_fn is None:
+            return await asyncio.gather(
+                *(self._call_value_fn(semaphore, tag_name, obj=data.row(idx)) for idx in range(data.num_rows))
+            )
+
+        async with semaphore:
+            start = time.perf_counter()
+            values = tag.vectorized_fn(data.table, **self._resolver.get_context(tag))
+            if inspect.isawaitable(values):
+                values = await values
+            if self._stats is not None:
+                self._stats.add_tag(tag_name, time.perf_counter() - start)
+        values = list(values)
+        if len(values) != data.num_rows:
+            raise InvalidTagException(
+                f"Vectorized function of tag {tag} returned {len(values)} values for {data.num_rows} rows."
+            )
+        return values
+
+    async def _call_value_fn(self, semaphore: asyncio.Semaphore, tag_name: str, **context) -> Any:
+        tag = self.tags[tag_name]
+        if not tag.has_callable_value_fn():
+            return tag.get_value_fn
+
+        context = self._resolver.get_context(tag, **context)
+        cache = self._resolver.get_cache(tag)
+        key = tag.get_cache_key(context)
+        if key is not None:
+            value = cache.get(key)
+            if value is not MISSING:
+                return value
+
+        async with semaphore:
+            start = time.perf_counter()
+            value = tag.get_value_fn(**context)
+            if inspect.isawaitable(value):
+                value = await value
+            if self._stats is not None:
+                self._stats.add_tag(tag_name, time.perf_counter() - start)
+
+        if key is not None:
+            cache.put(key, value)
+        return value
+
+    def _get_general_tag_value(self, tag: Tag) -> Any:
+        return self._general_values[tag.name]
+
+    def _get_object_tag_value(self, tag: Tag, obj: Any) -> Any:
+        return self._object_values[(tag.name, id(obj))]
+
+    def _get_tag_column_values(self, tag: Tag, data: ColumnarData) -> list[Any]:
+        values = self._column_values.get((tag.name, id(data.table)))
+        if values is not None:
+            return values
+        return super()._get_tag_column_values(tag, data)
@@ -0,0 +1,145 @@
+import io
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Type, Union
+
+from ieasyreports.core.report_generator.report_generator import DefaultReportGenerator
+from ieasyreports.core.tags.tag import Tag
+
+if TYPE_CHECKING:
+    from ieasyreports.settings import TagSettings
+
+
+@dataclass
+class ReportJob:
+    """A single report of a batch, with the same arguments as `DefaultReportGenerator.generate_report`."""
+    template: str
+    list_objects: Optional[Iterable[Any]] = None
+    context: Optional[Dict[str, Any]] = None
+    output_filename: Optional[str] = None
+    output_path: Optional[str] = None
+    as_stream: bool = False
+    presorted: bool = False
+    data_sources: Optional[Dict[str, Iterable[Any]]] = None
+
+
+@dataclass
+class ReportResult:
+    """Outcome of a `ReportJob`, either the path / stream of the report or the error raised while generating it."""
+    job: ReportJob
+    output: Optional[Union[str, io.BytesIO]] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _BatchWorker:
+    """Generates the jobs of a batch, validating each template only once."""
+    def __init__(
+        self,
+        generator_class: Type[DefaultReportGenerator],
+        tags: List[Tag],
+        templates_directory_path: str,
+        reports_directory_path: str,
+        tag_settings: "TagSettings",
+        requires_header: bool
+    ):
+        self.generator_class = generator_class
+        self.tags = tags
+        self.templates_directory_path = templates_directory_path
+        self.reports_directory_path = reports_directory_path
+        self.tag_settings = tag_settings
+        self.requires_header = requires_header
+        self.generators: dict[str, DefaultReportGenerator] = {}
+
+    def get_generator(self, template: str) -> DefaultReportGenerator:
+        generator = self.generators.get(template)
+        if generator is None:
+            generator = self.generator_class(
+                tags=self.tags,
+                template=template,
+                templates_directory_path=self.templates_directory_path,
+                reports_directory_path=self.reports_directory_path,
+                tag_settings=self.tag_settings,
+                requires_header=self.requires_header
+            )
+            generator.validate()
+            self.generators[template] = generator
+        return generator
+
+    def run(self, job: ReportJob) -> Union[str, io.BytesIO]:
+        return self.get_generator(job.template).generate_report(
+            list_objects=job.list_objects,
+            output_path=job.output_path,
+            output_filename=job.output_filename,
+            context=job.context,
+            as_stream=job.as_stream,
+            presorted=job.presorted,
+            data_sources=job.data_sources
+        )
+
+
+_worker: Optional[_BatchWorker] = None
+
+
+def _init_worker(*args) -> None:
+    global _worker
+    _worker = _BatchWorker(*args)
+
+
+def _run_job(job: ReportJob) -> Union[str, io.BytesIO]:
+    return _worker.run(job)
+
+
+def generate_reports(
+    jobs: Iterable[ReportJob],
+    tags: List[Tag],
+    templates_directory_path: str,
+    reports_directory_path: str,
+    tag_settings: "TagSettings",
+    requires_header: bool = False,
+    workers: Optional[int] = None,
+    generator_class: Type[DefaultReportGenerator] = DefaultReportGenerator,
+    mp_context: Any = None
+) -> List[ReportResult]:
+    """
+    Generates a batch of reports over a pool of `workers` processes, defaulting to the number of CPUs.
+    Every worker validates each template once and reuses it for all of its jobs of that template.
+
+    The results are returned in the order of the jobs. A job that fails doesn't stop the batch,
+    its error is returned in its `ReportResult` instead.
+
+    The jobs are sent to the workers by pickling them. The tags are pickled as well, unless the processes
+    are started with the `fork` start method, in which case the tags don't have to be picklable.
+    With `workers=1` the jobs are generated in the current process.
+    """
+    jobs = list(jobs)
+    worker_args = (
+        generator_class, tags, templates_directory_path, reports_directory_path, tag_settings, requires_header
+    )
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        worker = _BatchWorker(*worker_args)
+        results = []
+        for job in jobs:
+            try:
+                results.append(ReportResult(job, output=worker.run(job)))
+            except Exception as e:
+                results.append(ReportResult(job, error=e))
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)) or 1, mp_context=mp_context, initializer=_init_worker, initargs=worker_args
+    ) as executor:
+        futures: list[Future] = [executor.submit(_run_job, job) for job in jobs]
+        results = []
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(ReportResult(job, output=future.result()))
+            except Exception as e:
+                results.append(ReportResult(job, error=e))
+        return results
@@ -0,0 +1,46 @@
+from typing import Any
+
+
+class ColumnarRow(dict):
+    """A single row of columnar data, accessible both as a mapping and through attributes."""
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ColumnarData:
+    """
+    Column-oriented view of a pandas DataFrame or a pyarrow Table.
+
+    Neither library is a dependency of ieasyreports, the tables are recognized by their type
+    and converted to plain Python lists column by column.
+    """
+    def __init__(self, table: Any, columns: dict[str, list[Any]]):
+        self.table = table
+        self.columns = columns
+        self.num_rows = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_table(cls, table: Any) -> "ColumnarData":
+        if _is_pandas_dataframe(table):
+            return cls(table, {str(name): table[name].tolist() for name in table.columns})
+        return cls(table, table.to_pydict())
+
+    def row(self, idx: int) -> ColumnarRow:
+        return ColumnarRow((name, values[idx]) for name, values in self.columns.items())
+
+
+def _is_pandas_dataframe(obj: Any) -> bool:
+    cls = type(obj)
+    return cls.__module__.split(".")[0] == "pandas" and cls.__name__ == "DataFrame"
+
+
+def _is_pyarrow_table(obj: Any) -> bool:
+    cls = type(obj)
+    return cls.__module__.split(".")[0] == "pyarrow" and cls.__name__ in ("Table", "RecordBatch")
+
+
+def is_columnar(obj: Any) -> bool:
+    return _is_pandas_dataframe(obj) or _is_pyarrow_table(obj)
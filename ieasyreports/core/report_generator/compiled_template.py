@@ -0,0 +1,155 @@
+import copy
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Mapping, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    import openpyxl
+
+    from ieasyreports.core.report_generator.formula import FormulaTemplate
+
+
+@dataclass(frozen=True)
+class TagPosition:
+    """Location of a single tag occurrence found while validating a template."""
+    tag: str
+    tag_type: Optional[str]
+    row: int
+    column: int
+    table: Optional[str] = None
+
+
+class TagSlot(NamedTuple):
+    tag: str
+    tag_type: Optional[str]
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CompiledCell:
+    """Content of a template cell, split into literal text and the tags that have to be replaced."""
+    segments: tuple[Union[str, TagSlot], ...]
+
+    @cached_property
+    def slots(self) -> tuple[TagSlot, ...]:
+        return tuple(segment for segment in self.segments if isinstance(segment, TagSlot))
+
+    def render(self, values: Mapping[str, Any]) -> Optional[str]:
+        """
+        Joins the literal text with the values of the tags, keyed by tag name.
+        Like `Tag.replace`, a tag without a value clears the whole cell.
+        """
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, TagSlot):
+                value = values[segment.tag]
+                if value is None:
+                    return None
+                segment = str(value)
+            parts.append(segment)
+        return "".join(parts)
+
+
+@dataclass
+class CompiledSheet:
+    """Everything `_check_template_tags` learned about one worksheet of a template."""
+    sheet_index: int = 0
+    tag_positions: tuple[TagPosition, ...] = ()
+    header_tag_type: Optional[str] = None
+    data_tag_type: Optional[str] = None
+    merged_ranges: tuple[tuple[int, int, int, int], ...] = field(default=())
+    max_column: int = 0
+    cells: dict[tuple[int, int], CompiledCell] = field(default_factory=dict)
+    formulas: dict[tuple[int, int], "FormulaTemplate"] = field(default_factory=dict)
+
+    @property
+    def header_position(self) -> Optional[TagPosition]:
+        for position in self.tag_positions:
+            if position.tag_type is not None and position.tag_type == self.header_tag_type:
+                return position
+        return None
+
+    @property
+    def data_positions(self) -> list[TagPosition]:
+        return [
+            position for position in self.tag_positions
+            if position.tag_type is not None and position.tag_type == self.data_tag_type
+        ]
+
+    @property
+    def table_names(self) -> list[Optional[str]]:
+        """Names of the HEADER / DATA tables of the worksheet, the unnamed table is `None`."""
+        return list(dict.fromkeys(
+            position.table for position in self.tag_positions
+            if position.tag_type is not None and position.tag_type == self.header_tag_type
+        ))
+
+    @property
+    def header_row(self) -> Optional[int]:
+        header = self.header_position
+        return header.row if header else None
+
+    @property
+    def data_row(self) -> Optional[int]:
+        data = self.data_positions
+        return data[0].row if data else None
+
+
+@dataclass
+class CompiledTemplate:
+    """
+    Result of a single validation pass over a template.
+
+    Holds the pristine workbook together with everything `_check_template_tags` learned about its worksheets,
+    so the template can be rendered any number of times without reparsing the xlsx file.
+    """
+    workbook: "openpyxl.Workbook"
+    sheets: tuple[CompiledSheet, ...] = ()
+
+    def new_workbook(self) -> "openpyxl.Workbook":
+        """Returns an independent copy of the template workbook that can be freely modified."""
+        return clone_workbook(self.workbook)
+
+
+def clone_workbook(workbook: "openpyxl.Workbook") -> "openpyxl.Workbook":
+    """
+    Returns a deep copy of `workbook`. The cells, which make up most of a template, are copied attribute
+    by attribute instead of through `copy.deepcopy`, the much smaller rest of the workbook is deep-copied.
+    """
+    from openpyxl.cell import MergedCell
+    from openpyxl.utils.indexed_list import IndexedList
+
+    # `copy.deepcopy` restores the internal dict of an `IndexedList` before its items and then
+    # skips every item as a duplicate, so the style lists have to be copied explicitly.
+    memo = {}
+    for value in vars(workbook).values():
+        if isinstance(value, IndexedList):
+            memo[id(value)] = IndexedList(value)
+
+    # the copied cells are bound to their new worksheet once it exists, the memo hands them
+    # to everything referencing the cells, such as the top-left cells of the merged ranges
+    copied_cells = []
+    for sheet in workbook.worksheets:
+        cells = {}
+        for key, cell in sheet._cells.items():
+            copied = cell.__class__.__new__(cell.__class__)
+            copied.row = cell.row
+            copied.column = cell.column
+            copied._style = cell._style.__copy__() if cell._style is not None else None
+            if cell.__class__ is not MergedCell:
+                copied._value = cell._value
+                copied.data_type = cell.data_type
+                copied._hyperlink = copy.copy(cell._hyperlink) if cell._hyperlink is not None else None
+                copied._comment = cell._comment
+            memo[id(cell)] = cells[key] = copied
+        memo[id(sheet._cells)] = cells
+        copied_cells.append(cells)
+
+    clone = copy.deepcopy(workbook, memo)
+    for sheet, cells in zip(clone.worksheets, copied_cells):
+        for cell in cells.values():
+            cell.parent = sheet
+            if cell.__class__ is not MergedCell and cell._comment is not None:
+                cell._comment = copy.copy(cell._comment)
+                cell._comment.bind(cell)
+    return clone
@@ -0,0 +1,145 @@
+import re
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Callable, Mapping, Optional, Union
+
+from openpyxl.formula.tokenizer import Token, Tokenizer, TokenizerError
+
+AREA_PIECE_RE = re.compile(r"^(?:\$?[A-Z]{1,3}(?:\$?\d+)?|\$?\d+)$")
+ROW_PIECE_RE = re.compile(r"^(\$?[A-Z]{0,3}\$?)(\d+)$")
+
+# maps the row numbers of a worksheet to their new rows, or to `None` for rows that were removed
+RowMap = Callable[[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class FormulaReference:
+    """
+    A reference to a cell, a range or rows, split into the part before the row number of each of
+    its one or two corners and the row number itself, which is `None` for corners without a row.
+    `sheet` is the title of the referenced worksheet, `None` for the worksheet of the formula.
+    """
+    text: str
+    sheet: Optional[str]
+    prefix: str
+    pieces: tuple[tuple[str, Optional[int]], ...]
+
+    def render(self, row_map: RowMap) -> str:
+        """
+        Returns the reference with the rows returned by `row_map`. Like in Excel, a range shrinks to the rows
+        that remain when rows at its ends are removed, and a reference to removed rows only becomes `#REF!`.
+        """
+        rows = [row_map(row) if row is not None else None for _, row in self.pieces]
+        if len(self.pieces) == 2 and all(row is not None for _, row in self.pieces):
+            (_, first), (_, last) = self.pieces
+            if rows[0] is None:
+                rows[0] = _first_remaining_row(row_map, range(first + 1, last + 1))
+            if rows[1] is None:
+                rows[1] = _first_remaining_row(row_map, range(last - 1, first - 1, -1))
+            if rows[0] is None or rows[1] is None:
+                return f"{self.prefix}#REF!"
+        elif any(row is None and piece_row is not None for row, (_, piece_row) in zip(rows, self.pieces)):
+            return f"{self.prefix}#REF!"
+
+        return self.prefix + ":".join(
+            piece if row is None else f"{piece}{row}" for (piece, _), row in zip(self.pieces, rows)
+        )
+
+
+@dataclass(frozen=True)
+class FormulaTemplate:
+    """A formula split into literal text and its references to cells and rows."""
+    formula: str
+    segments: tuple[Union[str, FormulaReference], ...]
+
+    @cached_property
+    def has_references(self) -> bool:
+        return any(isinstance(segment, FormulaReference) and segment.sheet is None for segment in self.segments)
+
+    @cached_property
+    def referenced_sheets(self) -> frozenset[str]:
+        """Titles of the other worksheets the formula references."""
+        return frozenset(
+            segment.sheet for segment in self.segments
+            if isinstance(segment, FormulaReference) and segment.sheet is not None
+        )
+
+    def render(self, row_map: RowMap, sheet_row_maps: Optional[Mapping[str, RowMap]] = None) -> str:
+        """
+        Joins the literal text with the references, whose rows are moved by `row_map`, or by the row map
+        of the referenced worksheet in `sheet_row_maps`. References to other worksheets are kept otherwise.
+        """
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+            elif segment.sheet is None:
+                parts.append(segment.render(row_map))
+            elif sheet_row_maps is not None and segment.sheet in sheet_row_maps:
+                parts.append(segment.render(sheet_row_maps[segment.sheet]))
+            else:
+                parts.append(segment.text)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=8192)
+def compile_formula(formula: str, sheet_title: Optional[str] = None) -> FormulaTemplate:
+    """
+    Parses a formula with openpyxl's tokenizer. The references to cells and rows are templated,
+    text, function names and defined names are not. References qualified with the title of
+    the formula's own worksheet `sheet_title` are treated as unqualified ones.
+    A formula that can't be parsed is kept as it is.
+    """
+    if not formula.startswith("="):
+        return FormulaTemplate(formula, (formula,))
+
+    try:
+        tokens = Tokenizer(formula).items
+    except TokenizerError:
+        return FormulaTemplate(formula, (formula,))
+
+    segments = ["="]
+    for token in tokens:
+        if token.type == Token.OPERAND and token.subtype == Token.RANGE:
+            segments.append(_split_reference(token.value, sheet_title))
+        else:
+            segments.append(token.value)
+
+    merged = []
+    for segment in segments:
+        if isinstance(segment, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += segment
+        else:
+            merged.append(segment)
+    return FormulaTemplate(formula, tuple(merged))
+
+
+def _first_remaining_row(row_map: RowMap, rows: range) -> Optional[int]:
+    for row in rows:
+        new_row = row_map(row)
+        if new_row is not None:
+            return new_row
+    return None
+
+
+def _split_reference(reference: str, sheet_title: Optional[str]) -> Union[str, FormulaReference]:
+    sheet, separator, area = reference.rpartition("!")
+    pieces = area.split(":")
+    if len(pieces) > 2 or not all(AREA_PIECE_RE.match(piece) for piece in pieces):
+        return reference
+
+    sheet_name = _unquote_sheet_name(sheet) if separator else None
+    if sheet_name is not None and (sheet_title is None or sheet_name == sheet_title):
+        sheet_name = None
+
+    split_pieces = []
+    for piece in pieces:
+        match = ROW_PIECE_RE.match(piece)
+        split_pieces.append((match.group(1), int(match.group(2))) if match else (piece, None))
+    return FormulaReference(reference, sheet_name, sheet + separator, tuple(split_pieces))
+
+
+def _unquote_sheet_name(sheet: str) -> str:
+    if sheet.startswith("'") and sheet.endswith("'"):
+        return sheet[1:-1].replace("''", "'")
+    return sheet
@@ -0,0 +1,110 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass
+class ReportStats:
+    """Timings, in seconds, and counters of a single `generate_report` call."""
+    template: str
+    generator: str
+    duration: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    tag_durations: dict[str, float] = field(default_factory=dict)
+    tag_calls: dict[str, int] = field(default_factory=dict)
+    rows: int = 0
+    cells: int = 0
+    merges: int = 0
+    bytes_written: int = 0
+    cached: bool = False
+    error: Optional[BaseException] = None
+
+    def add_phase(self, phase: str, duration: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    def add_tag(self, tag: str, duration: float, calls: int = 1) -> None:
+        self.tag_durations[tag] = self.tag_durations.get(tag, 0.0) + duration
+        self.tag_calls[tag] = self.tag_calls.get(tag, 0) + calls
+
+    def slowest_tags(self, count: int = 5) -> list[tuple[str, float]]:
+        return sorted(self.tag_durations.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+class ReportInstrumentation:
+    """
+    Receives the timings of a report generator. The phases are reported as they finish, including the ones
+    outside of `generate_report` such as loading and validating the template, and the `ReportStats`
+    of every report once it is generated or failed. Subclasses override the hooks they need.
+    """
+    def phase_finished(self, phase: str, template: str, duration: float) -> None:
+        pass
+
+    def report_finished(self, stats: ReportStats) -> None:
+        pass
+
+
+class LoggingInstrumentation(ReportInstrumentation):
+    """Logs a summary of every report, and each phase at the DEBUG level."""
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO, slowest_tags: int = 5):
+        self.logger = logger or logging.getLogger("ieasyreports")
+        self.level = level
+        self.slowest_tags = slowest_tags
+
+    def phase_finished(self, phase: str, template: str, duration: float) -> None:
+        self.logger.debug("%s: %s took %.4fs", template, phase, duration)
+
+    def report_finished(self, stats: ReportStats) -> None:
+        phases = ", ".join(f"{phase}={duration:.4f}s" for phase, duration in stats.phases.items())
+        tags = ", ".join(f"{tag}={duration:.4f}s" for tag, duration in stats.slowest_tags(self.slowest_tags))
+        level = logging.ERROR if stats.error is not None else self.level
+        if stats.error is not None:
+            outcome = "failed"
+        else:
+            outcome = "read from the cache" if stats.cached else "generated"
+        self.logger.log(
+            level, "%s report %s in %.4fs (%s); rows=%d cells=%d merges=%d bytes=%d; slowest tags: %s",
+            stats.template, outcome, stats.duration, phases,
+            stats.rows, stats.cells, stats.merges, stats.bytes_written, tags or "-"
+        )
+
+
+class SpanInstrumentation(ReportInstrumentation):
+    """
+    Exports every phase and report as a span of an OpenTelemetry tracer, or any tracer with the same
+    `start_span(name, attributes=..., start_time=...)` / `span.end(end_time=...)` interface.
+    The spans are created once their duration is known, as children of the span that is current at that time.
+    """
+    def __init__(self, tracer: Any, prefix: str = "ieasyreports"):
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def _export_span(self, name: str, duration: float, attributes: dict[str, Any]) -> Any:
+        end_time = time.time_ns()
+        span = self.tracer.start_span(
+            f"{self.prefix}.{name}", attributes=attributes, start_time=end_time - int(duration * 1e9)
+        )
+        return span, end_time
+
+    def phase_finished(self, phase: str, template: str, duration: float) -> None:
+        span, end_time = self._export_span(phase, duration, {f"{self.prefix}.template": template})
+        span.end(end_time=end_time)
+
+    def report_finished(self, stats: ReportStats) -> None:
+        attributes = {
+            f"{self.prefix}.template": stats.template,
+            f"{self.prefix}.generator": stats.generator,
+            f"{self.prefix}.rows": stats.rows,
+            f"{self.prefix}.cells": stats.cells,
+            f"{self.prefix}.merges": stats.merges,
+            f"{self.prefix}.bytes": stats.bytes_written,
+            f"{self.prefix}.cached": stats.cached,
+        }
+        for tag, duration in stats.tag_durations.items():
+            attributes[f"{self.prefix}.tag.{tag}.duration"] = duration
+            attributes[f"{self.prefix}.tag.{tag}.calls"] = stats.tag_calls[tag]
+
+        span, end_time = self._export_span("generate_report", stats.duration, attributes)
+        if stats.error is not None and hasattr(span, "record_exception"):
+            span.record_exception(stats.error)
+        span.end(end_time=end_time)
@@ -0,0 +1,50 @@
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+from openpyxl.worksheet.cell_range import CellRange
+
+
+class MergedRangeIndex:
+    """
+    Index over the merged ranges of a worksheet.
+
+    Ranges are looked up by their top-left cell in constant time, and the ranges reaching
+    a given row or any row below it are found with a binary search over their last rows.
+    """
+    def __init__(self, ranges: Iterable[CellRange] = ()):
+        self._by_top_left: dict[tuple[int, int], CellRange] = {}
+        self._by_max_row: list[tuple[int, int, int]] = []
+        for merged_range in ranges:
+            self.add(merged_range)
+
+    def add(self, merged_range: CellRange) -> None:
+        top_left = (merged_range.min_row, merged_range.min_col)
+        if top_left in self._by_top_left:
+            self.remove(self._by_top_left[top_left])
+        self._by_top_left[top_left] = merged_range
+        insort(self._by_max_row, (merged_range.max_row, *top_left))
+
+    def remove(self, merged_range: CellRange) -> None:
+        top_left = (merged_range.min_row, merged_range.min_col)
+        if self._by_top_left.get(top_left) is not merged_range:
+            return
+        del self._by_top_left[top_left]
+        idx = bisect_left(self._by_max_row, (merged_range.max_row, *top_left))
+        del self._by_max_row[idx]
+
+    def starting_at(self, row: int, column: int) -> Optional[CellRange]:
+        return self._by_top_left.get((row, column))
+
+    def intersecting_rows_from(self, row: int) -> list[CellRange]:
+        """Returns the ranges that cover `row` or any of the rows below it."""
+        idx = bisect_left(self._by_max_row, (row,))
+        return [self._by_top_left[(min_row, min_col)] for _, min_row, min_col in self._by_max_row[idx:]]
+
+    def contains(self, cell_range: CellRange) -> bool:
+        """Checks whether `cell_range` lies completely inside one of the indexed ranges."""
+        return any(
+            cell_range.issubset(merged_range) for merged_range in self.intersecting_rows_from(cell_range.max_row)
+        )
+
+    def __len__(self) -> int:
+        return len(self._by_top_left)
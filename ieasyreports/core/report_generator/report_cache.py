@@ -0,0 +1,316 @@
+import datetime
+import decimal
+import enum
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import types
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, Set
+from typing import Any, Iterable, NamedTuple, Optional
+
+from ieasyreports.core.report_generator.columnar import ColumnarData, is_columnar
+from ieasyreports.exceptions import ReportCacheException
+
+SCALAR_TYPES = (
+    type(None), bool, int, float, complex, str, bytes,
+    datetime.date, datetime.time, datetime.timedelta, decimal.Decimal
+)
+
+
+class ReportCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    max_entries: int
+    max_bytes: int
+    entries: int
+    bytes: int
+
+
+class ReportCache:
+    """
+    Thread-safe LRU cache of rendered reports, holding the bytes of each xlsx file in memory.
+
+    The reports are keyed by a digest of everything they are rendered from, see `fingerprint`. Entries are
+    bounded both by count and by a byte budget, and entries older than `ttl` seconds are treated as missing.
+    """
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                self._bytes -= len(self._entries.pop(key)[0])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = (data, time.monotonic())
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def cache_info(self) -> ReportCacheInfo:
+        with self._lock:
+            return ReportCacheInfo(
+                self.hits, self.misses, self.evictions, self.max_entries, self.max_bytes,
+                len(self._entries), self._bytes
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskReportCache(ReportCache):
+    """
+    Cache of rendered reports stored as files in `directory`, which can be shared by several processes
+    and outlives them. The files are written atomically. The file's access time is its last use for
+    the LRU eviction, and its modification time its creation for the `ttl`.
+    """
+    SUFFIX = ".xlsx"
+
+    def __init__(
+        self, directory: str, max_entries: int = 1024, max_bytes: int = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None
+    ):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._read(self._path(key))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _entry_stats(self) -> list[tuple[float, int, str]]:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entry_stats())
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self) -> None:
+        for _, _, path in self._entry_stats():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def cache_info(self) -> ReportCacheInfo:
+        entries = self._entry_stats()
+        with self._lock:
+            return ReportCacheInfo(
+                self.hits, self.misses, self.evictions, self.max_entries, self.max_bytes,
+                len(entries), sum(size for _, size, _ in entries)
+            )
+
+    def __len__(self) -> int:
+        return len(self._entry_stats())
+
+
+def materialize(objects: Optional[Iterable[Any]]) -> Optional[Iterable[Any]]:
+    """Turns one-shot iterables, such as generators and cursors, into lists so that they can be fingerprinted."""
+    if objects is None or is_columnar(objects) or isinstance(objects, (Sequence, Set, Mapping)):
+        return objects
+    return list(objects)
+
+
+def fingerprint(*values: Any) -> str:
+    """
+    Returns a digest of the values, which is the same across processes for equal values. Scalars, containers,
+    pandas DataFrames, pyarrow Tables and plain objects are fingerprinted by their contents, classes by their name,
+    and functions by their name, code and the state they carry, such as their closure. Raises
+    `ReportCacheException` for values that can't be fingerprinted.
+    """
+    digest = hashlib.sha256()
+    for value in values:
+        _update(digest, value, set())
+    return digest.hexdigest()
+
+
+def _update(digest: Any, value: Any, path: set[int]) -> None:
+    cls = type(value)
+    if isinstance(value, SCALAR_TYPES) or isinstance(value, enum.Enum):
+        digest.update(f"{cls.__qualname__}:{value!r};".encode())
+        return
+
+    if isinstance(value, type):
+        digest.update(f"{value.__module__}.{value.__qualname__};".encode())
+        return
+
+    is_function = callable(value) and hasattr(value, "__qualname__")
+    if id(value) in path:
+        if is_function:
+            # a function whose closure references itself
+            digest.update(f"recursive:{value.__qualname__};".encode())
+            return
+        raise ReportCacheException(f"Can't fingerprint a recursive {cls.__qualname__}.")
+    path.add(id(value))
+    try:
+        if isinstance(value, functools.partial):
+            digest.update(b"partial(")
+            _update(digest, (value.func, value.args, value.keywords), path)
+        elif is_function:
+            digest.update(b"function(")
+            _update_callable(digest, value, path)
+        elif is_columnar(value):
+            digest.update(b"columnar(")
+            _update(digest, ColumnarData.from_table(value).columns, path)
+        elif isinstance(value, Mapping):
+            digest.update(b"mapping(")
+            items = sorted(((fingerprint(key), item) for key, item in value.items()), key=lambda entry: entry[0])
+            for key_digest, item in items:
+                digest.update(key_digest.encode())
+                _update(digest, item, path)
+        elif isinstance(value, Set):
+            digest.update(b"set(")
+            for item_digest in sorted(fingerprint(item) for item in value):
+                digest.update(item_digest.encode())
+        elif isinstance(value, Sequence):
+            digest.update(b"sequence(")
+            for item in value:
+                _update(digest, item, path)
+        elif hasattr(value, "__dict__") or hasattr(cls, "__slots__"):
+            digest.update(f"{cls.__module__}.{cls.__qualname__}(".encode())
+            _update(digest, _get_attributes(value), path)
+        else:
+            raise ReportCacheException(
+                f"Can't fingerprint objects of type {cls.__qualname__}, pass a `data_fingerprint` instead."
+            )
+        digest.update(b")")
+    finally:
+        path.discard(id(value))
+
+
+def _update_callable(digest: Any, value: Any, path: set[int]) -> None:
+    """
+    Fingerprints a function or method by its name and code, and by the state it carries: the contents of its
+    closure, its default arguments and the object it's bound to.
+    """
+    digest.update(f"{getattr(value, '__module__', '')}.{value.__qualname__};".encode())
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        _update_code(digest, code)
+
+    try:
+        closure = [cell.cell_contents for cell in getattr(value, "__closure__", None) or ()]
+    except ValueError:
+        raise ReportCacheException(f"Can't fingerprint {value.__qualname__}, a variable of its closure isn't set.")
+    _update(digest, closure, path)
+    _update(digest, getattr(value, "__defaults__", None), path)
+    _update(digest, getattr(value, "__kwdefaults__", None), path)
+
+    bound_to = getattr(value, "__self__", None)
+    # built-in functions are bound to their module
+    if bound_to is not None and not isinstance(bound_to, types.ModuleType):
+        _update(digest, bound_to, path)
+
+
+def _update_code(digest: Any, code: types.CodeType) -> None:
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            # the code of nested functions and lambdas
+            _update_code(digest, const)
+        elif isinstance(const, (*SCALAR_TYPES, tuple)):
+            digest.update(f"{const!r};".encode())
+
+
+def _get_attributes(value: Any) -> dict[str, Any]:
+    attributes = dict(getattr(value, "__dict__", {}))
+    for cls in type(value).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name not in ("__dict__", "__weakref__") and hasattr(value, name):
+                attributes[name] = getattr(value, name)
+    return attributes
@@ -1,59 +1,312 @@
+import bisect
+import hashlib
 import io
+import itertools
 import re
+import time
+from contextlib import contextmanager
 from copy import copy
-from typing import Any, Callable, Dict, List, Optional
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Union
 import openpyxl
-from openpyxl.cell import Cell, MergedCell
-from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.cell import Cell
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.merge import MergedCellRange
 from openpyxl.worksheet.worksheet import Worksheet
 import os
 
+from ieasyreports.core.report_generator.columnar import ColumnarData, is_columnar
+from ieasyreports.core.report_generator.compiled_template import (
+    CompiledCell, CompiledSheet, CompiledTemplate, TagPosition, TagSlot
+)
+from ieasyreports.core.report_generator.formula import FormulaTemplate, RowMap, compile_formula
+from ieasyreports.core.report_generator.instrumentation import ReportInstrumentation, ReportStats
+from ieasyreports.core.report_generator.merged_range_index import MergedRangeIndex
+from ieasyreports.core.report_generator.report_cache import ReportCache, fingerprint, materialize
+from ieasyreports.core.report_generator.row_template import RowTemplate, RowTemplateCell
+from ieasyreports.core.report_generator.template_cache import TemplateCache, get_default_template_cache
+from ieasyreports.core.report_generator.template_scanner import decode_tag, get_tag_regex, scan_template_sheets
+from ieasyreports.core.report_generator.template_store import TemplateData, TemplateReader, TemplateStore
+from ieasyreports.core.tags.resolver import TagResolver
 from ieasyreports.core.tags.tag import Tag
-from ieasyreports.settings import TagSettings
 from ieasyreports.exceptions import (
     InvalidTagException, TemplateNotValidatedException, MultipleHeaderTagsException, MissingHeaderTagException,
-    TemplateNotFoundException, MissingDataTagException
+    TemplateNotFoundException, MissingDataTagException, ReportCacheException
 )
 
+if TYPE_CHECKING:
+    from ieasyreports.settings import TagSettings
+
 
 class DefaultReportGenerator:
     def __init__(
         self,
         tags: List[Tag],
-        template: str,
+        template: Union[str, TemplateData],
         templates_directory_path: str,
         reports_directory_path: str,
-        tag_settings: TagSettings,
-        requires_header: bool = False
+        tag_settings: "TagSettings",
+        requires_header: bool = False,
+        template_cache: Optional[TemplateCache] = None,
+        validate_only: bool = False,
+        instrumentation: Optional[ReportInstrumentation] = None,
+        report_cache: Optional[ReportCache] = None,
+        template_store: Optional[TemplateStore] = None,
+        template_name: Optional[str] = None
     ):
+        """
+        `template` is the file name of the template in `templates_directory_path`, or the content of the template
+        as bytes, a memoryview or an mmap, which is read without being copied. `template_name` then names the
+        template in the saved reports and the instrumentation. With a `template_store`, template files are
+        memory-mapped through the store instead of being read from disk by every generator.
+
+        With `validate_only` the template is never loaded into openpyxl. `validate()` then only scans
+        the template for tags and checks them, which is much cheaper, but no reports can be generated.
+
+        `instrumentation` receives the duration of every phase and the `ReportStats` of every report.
+
+        With a `report_cache`, reports rendered from the same template, tags, context and data are
+        returned from the cache instead of being rendered again.
+        """
         self.tags = {tag.name: tag for tag in tags}
-        self.template_filename = template
+        if isinstance(template, str):
+            self.template_filename = template
+            self.template_data: Optional[TemplateData] = None
+        else:
+            self.template_filename = template_name or "template.xlsx"
+            self.template_data = template
+        self.template_store = template_store
         self.templates_directory_path = templates_directory_path
         self.reports_directory_path = reports_directory_path
-        self.template = self.open_template_file()
         self.tag_settings = tag_settings
-        self.sheet = self.template.worksheets[0]
+        self.template_cache = template_cache if template_cache is not None else get_default_template_cache()
+        self.validate_only = validate_only
+        self.instrumentation = instrumentation
+        self.report_cache = report_cache
+        self._stats: Optional[ReportStats] = None
+
+        self.compiled_template: Optional[CompiledTemplate] = None
+        self._template_version: Optional[tuple[str, int, int]] = None
+        self._template_cache_key, self._template_size = None, 0
+        if not validate_only:
+            self._template_version = self._get_template_version()
+            self._template_cache_key, self._template_size = self._get_template_cache_key()
+        if self._template_cache_key is not None:
+            self.compiled_template = self.template_cache.get(self._template_cache_key)
+
+        if validate_only:
+            self.template = None
+            self.sheet = None
+        elif self.compiled_template is not None:
+            self.template = self.compiled_template.workbook
+            self.sheet = self.template.worksheets[0]
+        else:
+            with self._phase("load"):
+                self.template = self.open_template_file()
+            self.sheet = self.template.worksheets[0]
 
         self.validated = False
+        self._merged_range_index: Optional[MergedRangeIndex] = None
+        self._merged_range_index_source: Optional[set] = None
 
         self.requires_header_tag = requires_header
         self.header_tag_info = {}
         self.data_tags_info = []
+        self.tables: dict[Optional[str], dict[str, Any]] = {}
+        self.table_name: Optional[str] = None
         self.general_tags = {}
+        self._prefetched: dict[tuple[Optional[str], str], Any] = {}
+        self._tag_specials: dict[str, str] = {}
+        self._resolver = TagResolver()
+        self.tag_positions: list[TagPosition] = []
+        self.compiled_cells: dict[tuple[int, int], CompiledCell] = {}
+        self.compiled_sheet: Optional[CompiledSheet] = None
+        self.general_cells: list[tuple[Cell, CompiledCell]] = []
 
     def validate(self):
+        """
+        Checks the tags of every worksheet of the template. The `requires_header` rules apply
+        to the first worksheet, and to every other worksheet which has a HEADER tag.
+        """
+        with self._phase("validation"):
+            self._validate()
+
+    def _validate(self) -> None:
         self._check_tags()
-        self._check_template_tags()
-        self._validate_header_and_data_tags()
+        if self.validate_only:
+            self._scan_template_tags()
+            self.validated = True
+            return
+
+        if self.compiled_template is None:
+            self.compiled_template = self._compile_template()
+            if self._template_cache_key is not None:
+                self.template_cache.put(self._template_cache_key, self.compiled_template, self._template_size)
+        else:
+            for compiled_sheet in self.compiled_template.sheets:
+                self._check_compiled_template_tags(compiled_sheet)
+                self._validate_header_and_data_tags(first_sheet=compiled_sheet.sheet_index == 0)
+
+        self._select_sheet(self.compiled_template.sheets[0], self.template.worksheets[0])
         self.validated = True
 
+    def _get_template_version(self) -> Optional[tuple[str, int, int]]:
+        """
+        Returns the path, modification time and size of the template file, or `None` if it can't be read.
+        Templates given as bytes are identified by a digest of their content instead of the path.
+        """
+        if self.template_data is not None:
+            data = memoryview(self.template_data)
+            return f"sha256:{hashlib.sha256(data).hexdigest()}", 0, data.nbytes
+
+        template_path = os.path.abspath(self._get_template_full_path())
+        try:
+            stat = os.stat(template_path)
+        except OSError:
+            return None
+        return template_path, stat.st_mtime_ns, stat.st_size
+
+    def _get_template_cache_key(self) -> tuple[Optional[Hashable], int]:
+        if not self.template_cache.enabled or self._template_version is None:
+            return None, 0
+
+        tag_settings = tuple(sorted(self.tag_settings.model_dump().items()))
+        return (type(self), *self._template_version, tag_settings), self._template_version[2]
+
+    def _compile_template(self) -> CompiledTemplate:
+        compiled_sheets = []
+        for sheet_index, sheet in enumerate(self.template.worksheets):
+            self.sheet = sheet
+            self._check_template_tags()
+            self._validate_header_and_data_tags(first_sheet=sheet_index == 0)
+            compiled_sheets.append(self._compile_sheet(sheet_index))
+        return CompiledTemplate(workbook=self.template, sheets=tuple(compiled_sheets))
+
+    def _compile_sheet(self, sheet_index: int) -> CompiledSheet:
+        return CompiledSheet(
+            sheet_index=sheet_index,
+            tag_positions=tuple(self.tag_positions),
+            header_tag_type=self.tag_settings.header_tag,
+            data_tag_type=self.tag_settings.data_tag,
+            merged_ranges=tuple(merged_range.bounds for merged_range in self.sheet.merged_cells.ranges),
+            max_column=self._find_last_column_with_value() or 0,
+            cells=self.compiled_cells,
+            formulas={
+                (cell.row, cell.column): self._compile_formula(cell.value)
+                for cell in self.iter_cells()
+                if cell.data_type == 'f' and isinstance(cell.value, str)
+            }
+        )
+
+    def _load_compiled_template(self) -> None:
+        """
+        Points the generator to a fresh copy of the compiled template, so that every call to
+        `generate_report` starts from the pristine template without reparsing the file.
+        """
+        with self._phase("load"):
+            self.template = self.compiled_template.new_workbook()
+        self._select_sheet(self.compiled_template.sheets[0], self.template.worksheets[0])
+
+    def _select_sheet(self, compiled_sheet: CompiledSheet, sheet: Optional[Worksheet]) -> None:
+        """Points the generator to one of the worksheets, the tag info then refers to the cells of `sheet`."""
+        self.compiled_sheet = compiled_sheet
+        self.sheet = sheet
+        self._merged_range_index = None
+        self._prefetched = {}
+        self.tag_positions = list(compiled_sheet.tag_positions)
+        self._categorize_tag_positions(compiled_sheet.tag_positions)
+        # header and data cells are rendered for each object, the remaining tagged cells only once
+        self.general_cells = [
+            (self.sheet.cell(row=row, column=column), compiled_cell)
+            for (row, column), compiled_cell in compiled_sheet.cells.items()
+            if not any(self._is_object_slot(slot) for slot in compiled_cell.slots)
+        ]
+
+    def _scan_template_tags(self) -> None:
+        """Same as `_check_template_tags`, but reads the tags of every worksheet straight from the xlsx file."""
+        try:
+            sheets = scan_template_sheets(self._open_template(), self.tag_settings)
+        except FileNotFoundError:
+            raise TemplateNotFoundException(
+                f"Cannot find {self.template_filename} in the {self.templates_directory_path} folder."
+            )
+
+        for sheet_index, positions in enumerate(sheets):
+            self._reset_tag_info()
+            self.tag_positions = positions
+            for position in positions:
+                if position.tag not in self.tags.keys():
+                    raise InvalidTagException(f"The following tag is not supported: {position.tag}")
+                # the positions stand in for the cells, the validation only needs their row and column
+                self._categorize_tag_by_type(
+                    {"tag": position.tag, "tag_type": position.tag_type, "table": position.table}, position
+                )
+            self._validate_header_and_data_tags(first_sheet=sheet_index == 0)
+
+    def _check_compiled_template_tags(self, compiled_sheet: CompiledSheet) -> None:
+        """Same as `_check_template_tags`, but based on the tag positions of an already compiled worksheet."""
+        self.sheet = self.template.worksheets[compiled_sheet.sheet_index]
+        self.tag_positions = list(compiled_sheet.tag_positions)
+        for position in self.tag_positions:
+            if position.tag not in self.tags.keys():
+                raise InvalidTagException(f"The following tag is not supported: {position.tag}")
+
+        self._categorize_tag_positions(self.tag_positions)
+
+    def _categorize_tag_positions(self, positions: Iterable[TagPosition]) -> None:
+        self._reset_tag_info()
+        for position in positions:
+            cell = self.sheet.cell(row=position.row, column=position.column)
+            self._categorize_tag_by_type(
+                {"tag": position.tag, "tag_type": position.tag_type, "table": position.table}, cell
+            )
+
+    def _reset_tag_info(self) -> None:
+        self.header_tag_info = {}
+        self.data_tags_info = []
+        self.tables = {}
+        self.table_name = None
+        self.general_tags = {}
+
+    def _get_table(self, name: Optional[str]) -> dict[str, Any]:
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = {"header": {}, "data": []}
+            if len(self.tables) == 1:
+                self._select_table(name)
+        return table
+
+    def _select_table(self, name: Optional[str]) -> None:
+        """
+        Points `header_tag_info` and `data_tags_info` to one of the HEADER / DATA tables of the worksheet,
+        and restores the values its tags prefetched.
+        """
+        table = self.tables.get(name, {"header": {}, "data": []})
+        self.table_name = name
+        self.header_tag_info = table["header"]
+        self.data_tags_info = table["data"]
+        for (table_name, tag_name), value in self._prefetched.items():
+            if table_name == name:
+                self._resolver.update_tag_context(tag_name, {"prefetched": value})
+
     def _get_template_full_path(self) -> str:
         return os.path.join(self.templates_directory_path, self.template_filename)
 
+    def _get_template_data(self) -> Optional[TemplateData]:
+        """Returns the content of the template if it was given as bytes or is read through the `template_store`."""
+        if self.template_data is not None:
+            return self.template_data
+        if self.template_store is not None:
+            return self.template_store.get(self._get_template_full_path())
+        return None
+
+    def _open_template(self) -> Union[str, IO[bytes]]:
+        """Returns the path of the template file, or a file reading the content of the template in place."""
+        data = self._get_template_data()
+        return TemplateReader(data) if data is not None else self._get_template_full_path()
+
     def open_template_file(self) -> openpyxl.Workbook:
-        template_path = self._get_template_full_path()
         try:
-            workbook = openpyxl.load_workbook(template_path)
+            workbook = openpyxl.load_workbook(self._open_template())
         except FileNotFoundError as e:
             raise TemplateNotFoundException(
                 f"Cannot find {self.template_filename} in the {self.templates_directory_path} folder."
@@ -61,24 +314,27 @@ class DefaultReportGenerator:
         return workbook
 
     def iter_cells(self):
-        for row in self.sheet.iter_rows():
-            for cell in row:
-                yield cell
+        """Yields the cells of the sheet by row. Unlike `iter_rows`, it doesn't create the missing cells."""
+        for _, cell in sorted(self.sheet._cells.items()):
+            yield cell
 
     def _categorize_tag_by_type(self, tag, cell):
         tag_object = self.tags[tag["tag"]]
 
         if tag["tag_type"] == self.tag_settings.header_tag:
-            if not self.header_tag_info:
-                tag_object.set_context({"special": self.tag_settings.header_tag})
-                self.header_tag_info["tag"] = tag_object
-                self.header_tag_info["cell"] = cell
+            header_tag_info = self._get_table(tag.get("table"))["header"]
+            if not header_tag_info:
+                self._set_tag_special(tag_object, self.tag_settings.header_tag)
+                header_tag_info["tag"] = tag_object
+                header_tag_info["cell"] = cell
+            elif tag.get("table") is not None:
+                raise MultipleHeaderTagsException(f"Multiple header tags found for table {tag['table']}.")
             else:
                 raise MultipleHeaderTagsException("Multiple header tags found.")
 
         elif tag["tag_type"] == self.tag_settings.data_tag:
-            tag_object.set_context({"special": self.tag_settings.data_tag})
-            self.data_tags_info.append({"tag": tag_object, "cell": cell})
+            self._set_tag_special(tag_object, self.tag_settings.data_tag)
+            self._get_table(tag.get("table"))["data"].append({"tag": tag_object, "cell": cell})
 
         else:
             if tag_object not in self.general_tags:
@@ -87,40 +343,166 @@ class DefaultReportGenerator:
             self.general_tags[tag_object].append(cell)
 
     def _decode_template_tag(self, tag: str) -> Dict[str, str]:
-        parts = tag.split(self.tag_settings.split_symbol)
+        name, tag_type, table = decode_tag(tag, self.tag_settings)
         return {
-            'tag': parts.pop(-1),
-            'tag_type': parts.pop(-1) if parts else None
+            'tag': name,
+            'tag_type': tag_type,
+            'table': table
         }
 
+    def _get_tag_regex(self) -> re.Pattern:
+        return get_tag_regex(self.tag_settings.tag_start_symbol, self.tag_settings.tag_end_symbol)
+
     def _parse_template_tag(self, template_tag: str) -> list:
         try:
-            tag_regex = rf"{self.tag_settings.tag_start_symbol}(.*?){self.tag_settings.tag_end_symbol}"
-            return re.findall(tag_regex, template_tag)
+            return self._get_tag_regex().findall(template_tag)
         except TypeError:
             return []
 
+    def _compile_cell(self, content: Any) -> Optional[CompiledCell]:
+        """Splits the content of a cell into literal text and tag slots, or returns `None` if it has no tags."""
+        if not isinstance(content, str):
+            return None
+
+        segments = []
+        position = 0
+        for match in self._get_tag_regex().finditer(content):
+            if match.start() > position:
+                segments.append(content[position:match.start()])
+            tag_info = self._decode_template_tag(match.group(1))
+            segments.append(TagSlot(tag_info["tag"], tag_info["tag_type"], tag_info["table"]))
+            position = match.end()
+
+        if not segments:
+            return None
+        if position < len(content):
+            segments.append(content[position:])
+        return CompiledCell(tuple(segments))
+
     def _check_template_tags(self) -> None:
+        self._reset_tag_info()
+        self.tag_positions = []
+        self.compiled_cells = {}
         for cell in self.iter_cells():
-            if cell.value is None:
+            compiled_cell = self._compile_cell(cell.value)
+            if compiled_cell is None:
                 continue
 
-            for tag in self._parse_template_tag(cell.value):
-                tag_info = self._decode_template_tag(tag)
+            for slot in compiled_cell.slots:
+                tag_info = {"tag": slot.tag, "tag_type": slot.tag_type, "table": slot.table}
                 if tag_info["tag"] not in self.tags.keys():
                     raise InvalidTagException(f"The following tag is not supported: {tag_info['tag']}")
 
                 self._categorize_tag_by_type(tag_info, cell)
+                self.tag_positions.append(
+                    TagPosition(tag_info["tag"], tag_info["tag_type"], cell.row, cell.column, tag_info["table"])
+                )
+
+            self.compiled_cells[(cell.row, cell.column)] = compiled_cell
+
+    def _is_object_slot(self, slot: TagSlot) -> bool:
+        """Header and data tags are evaluated for the current object, all other tags are global."""
+        return slot.tag_type is not None and slot.tag_type in (self.tag_settings.header_tag, self.tag_settings.data_tag)
+
+    def _get_compiled_cell(self, row: int, column: int) -> CompiledCell:
+        return self.compiled_sheet.cells[(row, column)]
+
+    def _render_cell(self, compiled_cell: CompiledCell, obj: Any = None) -> Any:
+        """
+        Renders a compiled cell in a single pass. Every tag in the cell is evaluated once,
+        the header and data tags with `obj` as their current object.
+        """
+        values = {}
+        for slot in compiled_cell.slots:
+            if slot.tag in values:
+                continue
+            tag = self.tags[slot.tag]
+            if self._is_object_slot(slot):
+                value = self._get_object_tag_value(tag, obj)
+            else:
+                value = self._get_general_tag_value(tag)
+            values[slot.tag] = tag.get_custom_format(value)
+        return compiled_cell.render(values)
+
+    def _get_general_tag_value(self, tag: Tag) -> Any:
+        return self._get_tag_value(tag)
 
-    def _validate_header_and_data_tags(self) -> None:
+    def _get_object_tag_value(self, tag: Tag, obj: Any) -> Any:
+        return self._get_tag_value(tag, obj=obj)
+
+    def _get_tag_value(self, tag: Tag, **context: Any) -> Any:
+        if self._stats is None:
+            return self._resolver.get_value(tag, **context)
+
+        start = time.perf_counter()
+        try:
+            return self._resolver.get_value(tag, **context)
+        finally:
+            self._stats.add_tag(tag.name, time.perf_counter() - start)
+
+    @contextmanager
+    def _phase(self, phase: str) -> Iterator[None]:
+        """Times a phase of the generator for the `instrumentation`, the phases of a report are added up."""
+        if self.instrumentation is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if self._stats is not None:
+                self._stats.add_phase(phase, duration)
+            self.instrumentation.phase_finished(phase, self.template_filename, duration)
+
+    @contextmanager
+    def _instrument_report(self) -> Iterator[None]:
+        """Collects the `ReportStats` of a report and passes them to the `instrumentation` once it's done."""
+        if self.instrumentation is None:
+            yield
+            return
+
+        self._stats = stats = ReportStats(template=self.template_filename, generator=type(self).__name__)
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            stats.error = e
+            raise
+        finally:
+            stats.duration = time.perf_counter() - start
+            self._stats = None
+            self.instrumentation.report_finished(stats)
+
+    def _validate_header_and_data_tags(self, first_sheet: bool = True) -> None:
         if self.requires_header_tag:
-            self._validate_header_tag()
-            self._validate_data_tags()
+            if first_sheet:
+                self._validate_header_tag()
+            for name in self.tables:
+                self._select_table(name)
+                if self.header_tag_info:
+                    self._validate_data_tags()
+                elif name is not None:
+                    raise MissingHeaderTagException(f"Header tag is missing for table {name}.")
+            self._select_table(next(iter(self.tables), None))
+        self._validate_table_rows()
 
     def _validate_header_tag(self) -> None:
-        if not self.header_tag_info:
+        if not any(table["header"] for table in self.tables.values()):
             raise MissingHeaderTagException("Header tag is missing in the template.")
 
+    def _validate_table_rows(self) -> None:
+        """Rows are inserted below the DATA row of every table, so the HEADER and DATA rows can't be shared."""
+        table_rows = set()
+        for table in self.tables.values():
+            if not table["header"]:
+                continue
+            header_row = table["header"]["cell"].row
+            if table_rows & {header_row, header_row + 1}:
+                raise InvalidTagException("The HEADER and DATA rows of different tables must not overlap.")
+            table_rows.update((header_row, header_row + 1))
+
     def _validate_data_tags(self) -> None:
         header_row = self.header_tag_info["cell"].row
 
@@ -144,7 +526,12 @@ class DefaultReportGenerator:
                     "All elements in the `tags` list must be a `Tag` instance."
                 )
 
-    def save_report(self, name: str, output_path: str):
+    def save_report(self, name: str, output_path: str) -> str:
+        report_path = self._get_report_path(name, output_path)
+        self.template.save(report_path)
+        return report_path
+
+    def _get_report_path(self, name: Optional[str], output_path: Optional[str]) -> str:
         if output_path is None:
             output_path = self.reports_directory_path
         os.makedirs(output_path, exist_ok=True)
@@ -152,132 +539,246 @@ class DefaultReportGenerator:
         if name is None:
             name = f"{self.template_filename.split('.xlsx')[0]}.xlsx"
 
-        self.template.save(os.path.join(output_path, name))
+        return os.path.join(output_path, name)
 
     def _handle_general_tags(self):
-        for tag, cells in self.general_tags.items():
-            for cell in cells:
-                try:
-                    cell.value = tag.replace(cell.value)
-                except Exception as e:
-                    raise InvalidTagException(f"Error replacing tag {tag} in cell {cell.coordinate}: {e}")
-
-    def _handle_header_and_data_tags(self, grouped_data: dict[str, list[Any]]) -> None:
+        with self._phase("tag_replacement"):
+            self._replace_general_tags()
+
+    def _replace_general_tags(self) -> None:
+        for cell, compiled_cell in self.general_cells:
+            try:
+                cell.value = self._render_cell(compiled_cell)
+            except Exception as e:
+                tags = ", ".join(slot.tag for slot in compiled_cell.slots)
+                raise InvalidTagException(f"Error replacing tags {tags} in cell {cell.coordinate}: {e}")
+
+    def _get_data_cells(self) -> dict[int, CompiledCell]:
+        """Returns the compiled DATA row cells, by column."""
+        return {
+            data_tag["cell"].column: self._get_compiled_cell(data_tag["cell"].row, data_tag["cell"].column)
+            for data_tag in self.data_tags_info
+        }
+
+    def _handle_header_and_data_tags(self, grouped_rows: dict[str, list[dict[int, Any]]]) -> None:
+        """Writes the header values and the rendered DATA rows of the selected table, once its rows are inserted."""
+        with self._phase("tag_replacement"):
+            self._write_table_rows(grouped_rows)
+
+    def _write_table_rows(self, grouped_rows: dict[str, list[dict[int, Any]]]) -> None:
         original_header_cell = self.header_tag_info["cell"]
         original_header_row = original_header_cell.row
         original_header_col = original_header_cell.col_idx
         current_row = original_header_row
-        for header_value, item_group in grouped_data.items():
+        for header_value, rows in grouped_rows.items():
             cell = self.sheet.cell(
                 row=current_row,
                 column=original_header_col
             )
             cell.value = header_value
             current_row += 1
-            for item in item_group:
-                for idx, data_tag in enumerate(self.data_tags_info):
-                    tag = data_tag["tag"]
-                    tag.set_context({"obj": item})
-                    data_cell = self.sheet.cell(row=current_row, column=data_tag["cell"].column)
-                    data_cell.value = tag.replace(data_cell.value)
+            for values in rows:
+                for column, value in values.items():
+                    self.sheet.cell(row=current_row, column=column).value = value
                 current_row += 1
 
-    def _prepare_structure(self, grouped_data: dict[str, list[Any]]) -> None:
-        original_header_cell = self.header_tag_info["cell"]
-        original_header_row = original_header_cell.row
-        original_header_col = original_header_cell.col_idx
-        first_data_row = original_header_row + 1
+    def _get_tag_column_values(self, tag: Tag, data: ColumnarData) -> list[Any]:
+        """
+        Returns the raw values of a tag for every row of the columnar data. Tags without
+        a `column` or a `vectorized_fn` are evaluated row by row, with the row passed as `obj`.
+        """
+        if tag.column is not None:
+            try:
+                return data.columns[tag.column]
+            except KeyError:
+                raise InvalidTagException(f"Column {tag.column} of tag {tag} is missing from the data.")
+
+        if tag.vectorized_fn is not None:
+            start = time.perf_counter()
+            values = list(tag.vectorized_fn(data.table, **self._resolver.get_context(tag)))
+            if self._stats is not None:
+                self._stats.add_tag(tag.name, time.perf_counter() - start)
+            if len(values) != data.num_rows:
+                raise InvalidTagException(
+                    f"Vectorized function of tag {tag} returned {len(values)} values for {data.num_rows} rows."
+                )
+            return values
 
-        self._insert_empty_rows_for_data(grouped_data, original_header_row)
-        header_dest_ranges, data_dest_ranges = self._get_cell_copy_ranges(
-            grouped_data, original_header_row, original_header_col, first_data_row
-        )
+        return [self._get_object_tag_value(tag, data.row(idx)) for idx in range(data.num_rows)]
 
-        self._copy_cell_range(
-            (original_header_row, original_header_col),
-            (original_header_row, original_header_col),
-            header_dest_ranges
-        )
+    def _render_columnar_cell(self, compiled_cell: CompiledCell, data: ColumnarData) -> list[Any]:
+        """Renders a compiled cell for every row of the columnar data, evaluating each tag once per column."""
+        column_values = {}
+        global_values = {}
+        for slot in compiled_cell.slots:
+            tag = self.tags[slot.tag]
+            if slot.tag in column_values or slot.tag in global_values:
+                continue
+            if self._is_object_slot(slot):
+                column_values[slot.tag] = [
+                    tag.get_custom_format(value) for value in self._get_tag_column_values(tag, data)
+                ]
+            else:
+                global_values[slot.tag] = tag.get_custom_format(self._get_general_tag_value(tag))
 
-        self._copy_cell_range(
-            (first_data_row, 1),
-            (first_data_row, 25),
-            data_dest_ranges
-        )
+        rendered = []
+        for idx in range(data.num_rows):
+            values = dict(global_values)
+            for tag_name, tag_values in column_values.items():
+                values[tag_name] = tag_values[idx]
+            rendered.append(compiled_cell.render(values))
+        return rendered
 
-    def _get_cell_copy_ranges(
-        self, grouped_data: dict[str, list[Any]], original_header_row: int, original_header_col: int, first_data_row: int
-    ) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
-        header_tags_dest_ranges = []
-        data_tags_dest_ranges = []
-        current_row = original_header_row
+    def _create_columnar_header_grouping(self, data: ColumnarData) -> dict[str, list[int]]:
+        with self._phase("grouping"):
+            return self._group_columnar_rows(data)
+
+    def _group_columnar_rows(self, data: ColumnarData) -> dict[str, list[int]]:
+        header_cell = self.header_tag_info["cell"]
+        header_values = self._render_columnar_cell(self._get_compiled_cell(header_cell.row, header_cell.column), data)
+
+        grouped_data = {}
+        for idx, header_value in enumerate(header_values):
+            grouped_data.setdefault(header_value, []).append(idx)
+
+        return grouped_data
+
+    def _render_columnar_data_cells(self, data: ColumnarData) -> dict[int, list[Any]]:
+        """Returns the rendered content of every DATA cell for each row of the columnar data, by column."""
+        return {
+            column: self._render_columnar_cell(compiled_cell, data)
+            for column, compiled_cell in self._get_data_cells().items()
+        }
 
-        for header_value, header_items in grouped_data.items():
-            if current_row != original_header_row:
-                header_tags_dest_ranges.append((current_row, original_header_col))
+    def _render_table(self, sorted_list_objects: Iterable[Any]) -> dict[str, list[dict[int, Any]]]:
+        """Groups the objects of the selected table and renders its DATA cells, by header value."""
+        if is_columnar(sorted_list_objects):
+            data = ColumnarData.from_table(sorted_list_objects)
+            if self._get_prefetch_tags():
+                self._prefetch_tag_values([data.row(idx) for idx in range(data.num_rows)])
+            grouped_data = self._create_columnar_header_grouping(data)
+            with self._phase("tag_replacement"):
+                rendered_cells = self._render_columnar_data_cells(data)
+                return {
+                    header_value: [
+                        {column: values[idx] for column, values in rendered_cells.items()} for idx in indices
+                    ]
+                    for header_value, indices in grouped_data.items()
+                }
+
+        if self._get_prefetch_tags():
+            sorted_list_objects = list(sorted_list_objects)
+            self._prefetch_tag_values(sorted_list_objects)
+        grouped_data = self._create_header_grouping(sorted_list_objects)
+        data_cells = self._get_data_cells()
+        with self._phase("tag_replacement"):
+            return {
+                header_value: [
+                    {column: self._render_cell(compiled_cell, item) for column, compiled_cell in data_cells.items()}
+                    for item in items
+                ]
+                for header_value, items in grouped_data.items()
+            }
+
+    def _prepare_structure(self, tables: dict[Optional[str], dict[str, list[Any]]]) -> None:
+        """
+        Inserts the rows of all tables of the worksheet in a single pass, then copies the HEADER
+        and DATA cells of every table to its inserted rows.
+        """
+        insertions = []
+        for name, grouped_data in tables.items():
+            self._select_table(name)
+            num_of_new_rows = sum(len(objs) for objs in grouped_data.values()) + len(grouped_data) - 2
+            insertions.append((self.header_tag_info["cell"].row + 1, num_of_new_rows))
+        self._insert_row_blocks(insertions)
+
+        with self._phase("cell_copy"):
+            for name, grouped_data in tables.items():
+                self._select_table(name)
+                self._copy_table_cells(grouped_data)
+
+    def _copy_table_cells(self, grouped_data: dict[str, list[Any]]) -> None:
+        """
+        Stamps the HEADER cell of the selected table onto its header rows and the whole DATA row onto its
+        data rows, as row templates captured once from the template rows.
+        """
+        header_cell = self.header_tag_info["cell"]
+        header_rows, data_rows = self._get_table_copy_rows(grouped_data, header_cell.row)
+
+        header_template = self._capture_row_template(header_cell.row, [header_cell.col_idx], merges=True)
+        self._stamp_row_template(header_template, header_rows)
+
+        data_template = self._capture_row_template(
+            header_cell.row + 1, range(1, self.sheet.max_column + 1), merges=True
+        )
+        self._stamp_row_template(data_template, data_rows)
 
+    @staticmethod
+    def _get_table_copy_rows(grouped_data: dict[str, list[Any]], header_row: int) -> tuple[list[int], list[int]]:
+        """Returns the rows below the template rows which the HEADER and the DATA row are copied to."""
+        header_rows = []
+        data_rows = []
+        current_row = header_row
+        for header_items in grouped_data.values():
+            if current_row != header_row:
+                header_rows.append(current_row)
             current_row += 1
-            for _ in header_items:
-                if current_row != first_data_row:
-                    data_tags_dest_ranges.append((current_row, 1))
 
+            for _ in header_items:
+                if current_row != header_row + 1:
+                    data_rows.append(current_row)
                 current_row += 1
 
-        return header_tags_dest_ranges, data_tags_dest_ranges
+        return header_rows, data_rows
 
-    def _copy_cell_range(
-        self, range_start: tuple[int, int], range_end: tuple[int, int], dest_ranges: list[tuple[int, int]]
-    ) -> None:
-        for dest_range_start in dest_ranges:
-            dest_row, dest_col = dest_range_start
-            for col in range(range_start[1], range_end[1] + 1):
-                src_cell = self.sheet.cell(row=range_start[0], column=col)
-                self._move_cell(src_cell, dest_row, col, True, True)
-
-    def _move_cell(
-        self, src_cell: Cell, dest_row: int, dest_col: int, preserve_original: bool = False, move_merged: bool = False
-    ):
-        def get_new_cell_position(src_end_cell: Cell, row_diff: int, col_diff: int) -> Cell:
-            new_row_idx = src_end_cell.row + row_diff
-            new_col_idx = src_end_cell.column + col_diff
-            return self.sheet.cell(row=new_row_idx, column=new_col_idx)
-
-        if src_cell.data_type == 'f':
-            dest_cell = self.sheet.cell(row=dest_row, column=dest_col)
-            self._copy_cell_style(src_cell, dest_cell)
-            return  # we already handled the formulas
-
-        dest_cell = self.sheet.cell(row=dest_row, column=dest_col, value=src_cell.value)
-        if preserve_original:
-            self._copy_cell_style(src_cell, dest_cell)
-
-        merges_in_range = []
-        new_merged_ranges = []
-        if move_merged:
-            for merged_range in self.sheet.merged_cells.ranges:
-                start_cell, end_cell = str(merged_range).split(":")
-                if src_cell.coordinate == start_cell:
-                    src_end_cell = self.sheet[end_cell]
-                    row_diff = dest_row - src_cell.row
-                    col_diff = dest_col - src_cell.col_idx
-
-                    new_end_cell = get_new_cell_position(src_end_cell, row_diff, col_diff)
-                    new_range = f"{get_column_letter(dest_col)}{dest_row}:{get_column_letter(new_end_cell.column)}{new_end_cell.row}"
-                    new_merged_ranges.append(new_range)
-
-            for new_range in new_merged_ranges:
-                self.sheet.merge_cells(new_range)
-
-        if not preserve_original:
-            for merged_range in merges_in_range:
-                self.sheet.unmerge_cells(merged_range)
-            del self.sheet[src_cell.coordinate]
-
-    def _create_header_grouping(self, list_objects: list[Any]) -> dict[str, list[Any]]:
+    def _capture_row_template(
+        self, row: int, columns: Iterable[int], values: bool = True, styles: bool = True,
+        formulas: bool = False, merges: bool = False, template_row: Optional[int] = None
+    ) -> RowTemplate:
+        """
+        Captures the cells of `row` in `columns`, and optionally the merged ranges which start in them.
+        `template_row` is the row of the template the row comes from, to reuse its compiled formulas.
+        """
+        merged_range_index = self._get_merged_range_index() if merges else None
+        cells = []
+        merged_ranges = []
+        for column in columns:
+            cell = self.sheet._cells.get((row, column))
+            if cell is None:
+                continue
+
+            if merged_range_index is not None:
+                merged_range = merged_range_index.starting_at(row, column)
+                if merged_range is not None:
+                    merged_ranges.append((column, merged_range.max_row - row, merged_range.max_col))
+
+            is_formula = cell.data_type == 'f' and isinstance(cell.value, str)
+            value = cell.value if values and cell.data_type != 'f' else None
+            style = copy(cell._style) if styles and cell.has_style else None
+            formula = self._compile_formula(cell.value, template_row, column) if formulas and is_formula else None
+            if value is not None or style is not None or formula is not None:
+                cells.append(RowTemplateCell(column, value, style, formula))
+
+        return RowTemplate(row, tuple(cells), tuple(merged_ranges))
+
+    def _stamp_row_template(self, row_template: RowTemplate, rows: Iterable[int]) -> None:
+        for row in rows:
+            for min_col, row_span, max_col in row_template.merges:
+                self._merge_cells(row, min_col, row + row_span, max_col)
+            row_template.stamp(self.sheet, row)
+
+    def _get_header_value(self, obj: Any) -> str:
+        header_cell = self.header_tag_info["cell"]
+        return self._render_cell(self._get_compiled_cell(header_cell.row, header_cell.column), obj)
+
+    def _create_header_grouping(self, list_objects: Iterable[Any]) -> dict[str, list[Any]]:
+        with self._phase("grouping"):
+            return self._group_objects(list_objects)
+
+    def _group_objects(self, list_objects: Iterable[Any]) -> dict[str, list[Any]]:
         grouped_data = {}
         for obj in list_objects:
-            self.header_tag_info["tag"].set_context({"obj": obj})
-            header_value = self.header_tag_info["tag"].replace(self.header_tag_info["cell"].value)
+            header_value = self._get_header_value(obj)
 
             if header_value not in grouped_data:
                 grouped_data[header_value] = []
@@ -286,167 +787,504 @@ class DefaultReportGenerator:
 
         return grouped_data
 
-    def prepare_list_objects(self, list_objects: list[Any]) -> list[Any]:
+    def _iter_header_groups(self, list_objects: Iterable[Any]) -> Iterator[tuple[str, Iterator[Any]]]:
+        """
+        Lazily groups objects which are already sorted by their header value. Each group has
+        to be consumed before moving to the next one, but the objects are never all held in memory.
+        """
+        return itertools.groupby(list_objects, key=self._get_header_value)
+
+    def prepare_list_objects(self, list_objects: Iterable[Any]) -> Iterable[Any]:
         """
         Can be used to do any required manipulations on the list of objects for the grouping
         before the grouping occurs.
         """
         return list_objects
 
-    def _insert_empty_rows_for_data(
-        self, grouped_data: dict[str, list[Any]], original_header_row: int
-    ):
-        # calculate the number of rows that need to be inserted
-        num_of_new_rows = sum(len(objs) for objs in grouped_data.values()) + len(grouped_data) - 2
-        data_tags_row = original_header_row + 1
-        self._insert_rows(data_tags_row, num_of_new_rows)
+    def _compile_formula(
+        self, formula: str, row: Optional[int] = None, column: Optional[int] = None
+    ) -> FormulaTemplate:
+        """Returns the formula of a template cell as parsed during validation, or parses it."""
+        if self.compiled_sheet is not None and row is not None:
+            formula_template = self.compiled_sheet.formulas.get((row, column))
+            if formula_template is not None and formula_template.formula == formula:
+                return formula_template
+        return compile_formula(formula, self.sheet.title)
+
+    def _get_merged_range_index(self) -> MergedRangeIndex:
+        """
+        Returns the index of the sheet's merged ranges. The index is rebuilt whenever
+        the merged ranges were changed without going through the generator.
+        """
+        ranges = self.sheet.merged_cells.ranges
+        if (
+            self._merged_range_index is None
+            or self._merged_range_index_source is not ranges
+            or len(self._merged_range_index) != len(ranges)
+        ):
+            self._merged_range_index = MergedRangeIndex(ranges)
+            self._merged_range_index_source = ranges
+        return self._merged_range_index
+
+    def _merge_cells(self, min_row: int, min_col: int, max_row: int, max_col: int) -> None:
+        """
+        Same as `Worksheet.merge_cells`, but uses the merged range index instead of
+        comparing the new range against every existing merged range.
+        """
+        index = self._get_merged_range_index()
+        merged_range = MergedCellRange(
+            self.sheet, CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row).coord
+        )
+        if index.contains(merged_range):
+            return
 
-    @staticmethod
-    def _get_cell_regular_expression() -> re.Pattern:
-        return re.compile("(?P<col>\$?[A-Z]+)(?P<row>\$?\d+)")
-
-    def _unmerge_cells(self, row_idx: int) -> list[tuple[int, int, int, int]]:
-        merged_cells_to_shift = []
-        for merged_range in list(self.sheet.merged_cells.ranges):
-            min_col, min_row, max_col, max_row = range_boundaries(str(merged_range))
-            if min_row >= row_idx or max_row >= row_idx:
-                merged_cells_to_shift.append((min_col, min_row, max_col, max_row))
-                self.sheet.unmerge_cells(str(merged_range))
-
-        return merged_cells_to_shift
-
-    def _shift_cells(self, row_idx: int, count: int, replace: Callable) -> None:
-        cell_re = self._get_cell_regular_expression()
-        old_cells = set()
+        self.sheet.merged_cells.ranges.add(merged_range)
+        index.add(merged_range)
+        self.sheet._clean_merge_range(merged_range)
+
+    def _unmerge_range(self, merged_range: CellRange) -> None:
+        index = self._get_merged_range_index()
+        self.sheet.merged_cells.ranges.discard(merged_range)
+        index.remove(merged_range)
+
+        cells = merged_range.cells
+        next(cells)  # the top-left cell keeps its value
+        for coordinate in cells:
+            self.sheet._cells.pop(coordinate, None)
+
+    def _unmerge_cells(self, row_idx: int, row_shift: Callable[[int], int]) -> list[tuple[int, int, int, int]]:
+        """
+        Unmerges and returns the merged ranges below `row_idx` that span across a row after which rows are inserted.
+        """
+        merged_cells_to_extend = []
+        for merged_range in self._get_merged_range_index().intersecting_rows_from(row_idx + 1):
+            min_row, max_row = merged_range.min_row, merged_range.max_row
+            if row_shift(max_row) - row_shift(min_row) != max_row - min_row:
+                merged_cells_to_extend.append(merged_range.bounds)
+                self._unmerge_range(merged_range)
+
+        return merged_cells_to_extend
+
+    def _delete_rows(
+        self, insertions: list[tuple[int, int]]
+    ) -> tuple[set[int], list[tuple[int, int, int, int]]]:
+        """
+        Removes the cells and the dimensions of the rows removed by negative counts, and returns the removed rows.
+        The merged ranges across removed rows are unmerged and returned as well, shrunk to their remaining rows
+        like in Excel, unless nothing but a single cell remains.
+        """
+        rows = {row for row_idx, count in insertions if count < 0 for row in range(row_idx + count + 1, row_idx + 1)}
+        merged_cells_to_shrink = []
+        if not rows:
+            return rows, merged_cells_to_shrink
+
+        for merged_range in list(self._get_merged_range_index().intersecting_rows_from(min(rows))):
+            min_col, min_row, max_col, max_row = merged_range.bounds
+            if not any(min_row <= row <= max_row for row in rows):
+                continue
+            self._unmerge_range(merged_range)
+            # only a few rows are removed, so the remaining rows are found by stepping over them
+            while min_row <= max_row and min_row in rows:
+                min_row += 1
+            while max_row >= min_row and max_row in rows:
+                max_row -= 1
+            if min_row < max_row or (min_row == max_row and min_col != max_col):
+                merged_cells_to_shrink.append((min_col, min_row, max_col, max_row))
+        self.sheet._cells = {key: cell for key, cell in self.sheet._cells.items() if key[0] not in rows}
+        for row in rows:
+            self.sheet.row_dimensions.pop(row, None)
+        return rows, merged_cells_to_shrink
+
+    def _shift_merged_cells(self, row_idx: int, row_shift: Callable[[int], int]) -> None:
+        """Moves the merged ranges below `row_idx` to their new rows, together with their cells."""
+        for merged_range in self._get_merged_range_index().intersecting_rows_from(row_idx + 1):
+            count = row_shift(merged_range.min_row) - merged_range.min_row
+            if count:
+                merged_range.shift(row_shift=count)
+
+        # the ranges are hashed by their boundaries, so the set has to be rebuilt after shifting
+        self.sheet.merged_cells.ranges = set(self.sheet.merged_cells.ranges)
+        self._merged_range_index = None
+
+    def _shift_cells(self, row_shift: Callable[[int], int], formula_row_map: RowMap) -> None:
         new_cells = dict()
-        for c in self.sheet._cells.values():
-            if c.data_type == 'f':
-                c.value = cell_re.sub(replace, c.value)
-
-            if c.row > row_idx:
-                col_idx = c.col_idx if isinstance(c, Cell) else c.column  # handles MergedCell
-                old_cells.add((c.row, col_idx))
-                c.row += count
-                new_cells[(c.row, col_idx)] = c
-
-        for coordinate in old_cells:
-            del self.sheet._cells[coordinate]
-        self.sheet._cells.update(new_cells)
-
-
-    def _shift_row_dimensions(self, row_idx: int, count: int) -> None:
-        for row in range(len(self.sheet.row_dimensions) - 1 + count, row_idx + count, -1):
-            new_rd = copy(self.sheet.row_dimensions[row - count])
-            new_rd.index = row
-            self.sheet.row_dimensions[row] = new_rd
-            del self.sheet.row_dimensions[row - count]
-
-    def _remerge_cells(self, merged_cells_to_shift: list[tuple[int, int, int, int]], row_idx: int, count: int) -> None:
-        new_merged_ranges = []
-        for min_col, min_row, max_col, max_row in merged_cells_to_shift:
-            if min_row >= row_idx:
-                min_row += count
-                max_row += count
-            new_merged_ranges.append(f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}")
-
-        for merged_range in new_merged_ranges:
-            self.sheet.merge_cells(str(merged_range))
+        for (row, col_idx), c in self.sheet._cells.items():
+            if c.data_type == 'f' and isinstance(c.value, str):
+                formula_template = self._compile_formula(c.value, row, col_idx)
+                if formula_template.has_references:
+                    c.value = formula_template.render(formula_row_map)
+
+            new_row = row_shift(row)
+            if new_row != row:
+                row = new_row
+                c.row = row
+            new_cells[(row, col_idx)] = c
+
+        self.sheet._cells = new_cells
+
+    def _shift_sheet_references(self, formula_row_map: RowMap) -> None:
+        """Moves the references of the formulas of the other worksheets to the rows of the selected worksheet."""
+        sheet_row_maps = {self.sheet.title: formula_row_map}
+        for sheet in self.template.worksheets:
+            if sheet is self.sheet:
+                continue
+            for c in sheet._cells.values():
+                if c.data_type == 'f' and isinstance(c.value, str) and "!" in c.value:
+                    formula_template = compile_formula(c.value, sheet.title)
+                    if self.sheet.title in formula_template.referenced_sheets:
+                        c.value = formula_template.render(lambda row: row, sheet_row_maps)
 
-    def _find_last_column_with_value(self):
-        max_col = self.sheet.max_column
-        max_row = self.sheet.max_row
+    def _shift_row_dimensions(self, insertions: list[tuple[int, int]], row_shift: Callable[[int], int]) -> None:
+        """
+        Moves the dimensions of all rows to their new rows and gives the rows inserted
+        after each row the dimensions of that row.
+        """
+        row_dimensions = self.sheet.row_dimensions
+        source_rds = {row_idx: row_dimensions.get(row_idx) for row_idx, _ in insertions}
+
+        shifted_rds = {}
+        for row, rd in row_dimensions.items():
+            new_row = row_shift(row)
+            if new_row != row:
+                row = new_row
+                rd.index = row
+            shifted_rds[row] = rd
+
+        for row_idx, count in insertions:
+            source_rd = source_rds[row_idx]
+            if source_rd is None:
+                continue
+            source_row = row_shift(row_idx)
+            for row in range(source_row + 1, source_row + count + 1):
+                new_rd = copy(source_rd)
+                new_rd.index = row
+                shifted_rds[row] = new_rd
 
-        for col in range(max_col, 0, -1):
-            for row in range(1, max_row + 1):
-                if self.sheet.cell(row=row, column=col).value is not None:
-                    return col
+        row_dimensions.clear()
+        row_dimensions.update(shifted_rds)
 
-        return None
+    def _remerge_cells(
+        self, merged_cells_to_extend: list[tuple[int, int, int, int]], row_shift: Callable[[int], int]
+    ) -> None:
+        for min_col, min_row, max_col, max_row in merged_cells_to_extend:
+            self._merge_cells(row_shift(min_row), min_col, row_shift(max_row), max_col)
+
+    def _find_last_column_with_value(self):
+        return max(
+            (column for (_, column), cell in self.sheet._cells.items() if cell.value is not None), default=None
+        )
 
     def _insert_rows(
         self, row_idx: int, count: int, copy_style: bool = True, fill_formulae: bool = True
     ):
-        initial_row_idx = row_idx
-        max_column = self._find_last_column_with_value()
-
-        def replace(m):
-            current_row = m.group('row')
-            prefix = "$" if current_row.find("$") != -1 else ""
-            current_row = int(current_row.replace("$", ""))
-            current_row += count if current_row > initial_row_idx else 0
-            return m.group('col') + prefix + str(current_row)
-
-        # Unmerge cells that will be shifted
-        merged_cells_to_shift = self._unmerge_cells(row_idx)
-
-        # Shift cells and rows
-        self._shift_cells(row_idx, count, replace)
-
-        row_idx += 1
-        for row in range(row_idx, row_idx + count):
-            new_rd = copy(self.sheet.row_dimensions[row - 1])
-            new_rd.index = row
-            self.sheet.row_dimensions[row] = new_rd
-            for col in range(1, max_column + 1):
-                cell = self.sheet.cell(row=row, column=col)
-                cell.value = None
-                source = self.sheet.cell(row=row - 1, column=col)
-
-                if copy_style:
-                    self._copy_cell_style(cell, source)
-                if fill_formulae and source.data_type == 'f':
-                    cell.value = re.sub(
-                        "(\$?[A-Z]{1,3}\$?)%d" % (row - 1), lambda m: m.group(1) + str(row), source.value
-                    )
-                    cell.data_type = 'f'
-
-        # Re-merge cells
-        self._remerge_cells(merged_cells_to_shift, row_idx, count)
+        """Inserts `count` empty rows after `row_idx`."""
+        self._insert_row_blocks([(row_idx, count)], copy_style, fill_formulae)
 
-    @staticmethod
-    def _copy_cell_style(src: Cell, dest: Cell):
-        if src.has_style:
-            dest.font = copy(src.font)
-            dest.border = copy(src.border)
-            dest.fill = copy(src.fill)
-            dest.number_format = copy(src.number_format)
-            dest.protection = copy(src.protection)
-            dest.alignment = copy(src.alignment)
+    def _insert_row_blocks(
+        self, insertions: Iterable[tuple[int, int]], copy_style: bool = True, fill_formulae: bool = True
+    ):
+        """
+        Inserts `count` empty rows after `row_idx` for each `(row_idx, count)` of `insertions`,
+        the row indexes refer to the rows before any insertion. A negative `count` removes the
+        `-count` rows ending with `row_idx` instead, e.g. the HEADER and DATA rows of a table without objects.
+
+        The new position of every row is known upfront, so the cells, merged ranges and row dimensions
+        are each moved in a single pass, however many tables the rows are inserted for.
+        """
+        insertions = sorted((row_idx, count) for row_idx, count in insertions if count != 0)
+        if not insertions:
+            return
+
+        with self._phase("row_insertion"):
+            self._shift_and_fill_rows(insertions, copy_style, fill_formulae)
+
+    def _shift_and_fill_rows(self, insertions: list[tuple[int, int]], copy_style: bool, fill_formulae: bool) -> None:
+        if self.compiled_sheet is not None:
+            max_column = self.compiled_sheet.max_column
+        else:
+            max_column = self._find_last_column_with_value()
+
+        row_indexes = [row_idx for row_idx, _ in insertions]
+        offsets = [0, *itertools.accumulate(count for _, count in insertions)]
+
+        def row_shift(row: int) -> int:
+            return row + offsets[bisect.bisect_left(row_indexes, row)]
+
+        deleted_rows, merged_cells_to_shrink = self._delete_rows(insertions)
+
+        def formula_row_map(row: int) -> Optional[int]:
+            return None if row in deleted_rows else row_shift(row)
+
+        merged_cells_to_extend = self._unmerge_cells(row_indexes[0], row_shift)
+        self._shift_merged_cells(row_indexes[0], row_shift)
+        self._shift_cells(row_shift, formula_row_map)
+        self._shift_sheet_references(formula_row_map)
+        self._shift_row_dimensions(insertions, row_shift)
+
+        for row_idx, count in insertions:
+            if count < 0:
+                continue
+            # the source row is captured once, the inserted rows share its style ids and reference
+            # their own row in its formulas
+            source_row = row_shift(row_idx)
+            row_template = self._capture_row_template(
+                source_row, range(1, max_column + 1), values=False, styles=copy_style,
+                formulas=fill_formulae, template_row=row_idx
+            )
+            for row in range(source_row + 1, source_row + count + 1):
+                row_template.stamp(self.sheet, row)
+
+        self._remerge_cells(merged_cells_to_shrink + merged_cells_to_extend, row_shift)
 
     def _add_global_tag_context(self, context: Dict[str, Any]):
-        self.header_tag_info["tag"].set_context(context)
-        for tag_info in self.data_tags_info:
-            tag_info["tag"].set_context(context)
-        for tag in self.general_tags:
-            tag.set_context(context)
+        self._resolver.update_context(context)
+
+    def _set_tag_special(self, tag: Tag, special: str) -> None:
+        """Passes the HEADER / DATA type a tag is used with in the template to its value function, as `special`."""
+        self._tag_specials[tag.name] = special
+        self._resolver.update_tag_context(tag.name, {"special": special})
+
+    def _reset_tag_resolver(self) -> None:
+        """
+        Starts the evaluation of the tags for a new report, without the context, prefetched values
+        and values cached per render of the previous one.
+        """
+        self._resolver = TagResolver(
+            tag_contexts={name: {"special": special} for name, special in self._tag_specials.items()}
+        )
+
+    def _get_template_tags(self) -> tuple[set[str], set[str]]:
+        """Returns the names of the general and the header / data tags used in the template."""
+        general_tags = set()
+        object_tags = set()
+        for compiled_cell in self.compiled_sheet.cells.values():
+            for slot in compiled_cell.slots:
+                (object_tags if self._is_object_slot(slot) else general_tags).add(slot.tag)
+        return general_tags, object_tags
+
+    def _get_table_tags(self) -> set[str]:
+        """Returns the names of the header and data tags used in the selected table."""
+        cells = [info["cell"] for info in (self.header_tag_info, *self.data_tags_info) if info]
+        return {
+            slot.tag
+            for cell in cells
+            for slot in self.compiled_sheet.cells.get((cell.row, cell.column), CompiledCell(())).slots
+            if self._is_object_slot(slot)
+        }
+
+    def _get_prefetch_tags(self, header: bool = True) -> list[Tag]:
+        """Returns the header and data tags of the selected table which have a prefetch function."""
+        header_tag = self.header_tag_info["tag"].name if self.header_tag_info else None
+        return [
+            self.tags[name] for name in sorted(self._get_table_tags())
+            if self.tags[name].has_prefetch_fn() and (header or name != header_tag)
+        ]
+
+    def _prefetch_tag_values(self, objs: list[Any], header: bool = True) -> None:
+        """Passes all objects to the prefetch functions of the tags, before their values are requested."""
+        with self._phase("prefetch"):
+            for tag in self._get_prefetch_tags(header):
+                value = self._prefetched[(self.table_name, tag.name)] = self._resolver.prefetch(tag, objs)
+                self._resolver.update_tag_context(tag.name, {"prefetched": value})
+
+    def _render_report(
+        self, list_objects: Optional[Iterable[Any]], context: Optional[Dict[str, Any]], presorted: bool = False,
+        data_sources: Optional[Dict[str, Iterable[Any]]] = None
+    ) -> None:
+        # the rows for all objects are inserted upfront, so the objects are always grouped in memory
+        self._load_compiled_template()
+        for compiled_sheet, table_objects in self._get_sheet_data_sources(list_objects, data_sources):
+            self._select_sheet(compiled_sheet, self.template.worksheets[compiled_sheet.sheet_index])
+            table_objects = {name: self.prepare_list_objects(objects) for name, objects in table_objects.items()}
+
+            if context:
+                self._add_global_tag_context(context)
+
+            self._render_objects(table_objects)
+
+    def _get_sheet_data_sources(
+        self, list_objects: Iterable[Any], data_sources: Optional[Dict[str, Iterable[Any]]]
+    ) -> list[tuple[CompiledSheet, dict[Optional[str], Iterable[Any]]]]:
+        """
+        Pairs every worksheet with tags with the objects of each of its tables. Named tables take their objects
+        from `data_sources` by table name, the unnamed table by the title of the worksheet, and both
+        use `list_objects` otherwise. Objects shared by several tables are read only once.
+        """
+        data_sources = data_sources or {}
+        sheets = [compiled_sheet for compiled_sheet in self.compiled_template.sheets if compiled_sheet.tag_positions]
+
+        sources = []
+        for sheet in sheets:
+            title = self.compiled_template.workbook.worksheets[sheet.sheet_index].title
+            sources.append({name: name if name is not None else title for name in sheet.table_names})
+
+        shared = sum(key not in data_sources for tables in sources for key in tables.values())
+        if shared > 1 and not is_columnar(list_objects):
+            list_objects = list(list_objects)
+
+        return [
+            (sheet, {name: data_sources.get(key, list_objects) for name, key in tables.items()})
+            for sheet, tables in zip(sheets, sources)
+        ]
+
+    def _render_objects(self, table_objects: Dict[Optional[str], Iterable[Any]]) -> None:
+        """
+        Renders the tables of the selected worksheet. The rows of every table are rendered first,
+        so the rows of all tables are inserted in a single pass before the rendered values are written.
+        """
+        tables = {}
+        for name, sorted_list_objects in table_objects.items():
+            self._select_table(name)
+            if self.header_tag_info:
+                tables[name] = self._render_table(sorted_list_objects)
+
+        if tables:
+            self._prepare_structure(tables)
+        for name, grouped_rows in tables.items():
+            self._select_table(name)
+            self._handle_header_and_data_tags(grouped_rows)
+
+        self._handle_general_tags()
 
     def generate_report(
-        self, list_objects: Optional[List[Any]] = None,
+        self, list_objects: Optional[Iterable[Any]] = None,
         output_path: Optional[str] = None, output_filename: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
-        as_stream: bool = False
-    ) -> io.BytesIO | None:
+        as_stream: bool = False,
+        presorted: bool = False,
+        data_sources: Optional[Dict[str, Iterable[Any]]] = None,
+        data_fingerprint: Optional[str] = None
+    ) -> io.BytesIO | str:
+        """
+        Renders the report for the given objects. `list_objects` can be any iterable, for example
+        a database cursor, or a pandas DataFrame / pyarrow Table whose columns are read by the tags.
+        Setting `presorted` declares that the objects are already sorted by their header value, which
+        lets generators that support it group the objects without holding them all in memory.
+
+        Every worksheet of the template is rendered. `data_sources` maps worksheet titles to the objects of
+        their HEADER / DATA tables, and table names to the objects of named tables such as
+        `{{HEADER:discharge.REGION}}`. Worksheets and tables without an entry use `list_objects`.
+
+        With a `report_cache`, the report is looked up by the template, the tags, `context` and a fingerprint
+        of the objects, which is computed from `list_objects` and `data_sources` unless a `data_fingerprint`
+        is given. Computing it reads all objects, so one-shot iterables are materialized first.
+
+        Returns the report as a stream if `as_stream` is set, otherwise the path of the saved report.
+        """
+        if self.validate_only:
+            raise TemplateNotValidatedException(
+                "The template was only scanned for tags. "
+                "Create the generator without `validate_only` to generate reports."
+            )
         if not self.validated:
             raise TemplateNotValidatedException(
                 "Template must be validated first. Did you forget to call the `.validate()` method?"
             )
 
-        sorted_list_objects = self.prepare_list_objects(list_objects)
-
-        if context:
-            self._add_global_tag_context(context)
+        with self._instrument_report():
+            cache_key = None
+            if self.report_cache is not None:
+                if data_fingerprint is None:
+                    list_objects = materialize(list_objects)
+                    data_sources = {name: materialize(objects) for name, objects in (data_sources or {}).items()}
+                cache_key = self._get_report_cache_key(list_objects, context, presorted, data_sources, data_fingerprint)
+                output = self._read_cached_report(cache_key, output_path, output_filename, as_stream)
+                if output is not None:
+                    return output
+
+            self._reset_tag_resolver()
+            self._render_report(list_objects if list_objects is not None else [], context, presorted, data_sources)
+            output = self._write_report(output_path, output_filename, as_stream)
+            self._cache_report(cache_key, output)
+            return output
 
-        if self.header_tag_info:
-            grouped_data = self._create_header_grouping(sorted_list_objects)
-            self._prepare_structure(grouped_data)
-            self._handle_header_and_data_tags(grouped_data)
+    def _get_report_cache_key(
+        self, list_objects: Optional[Iterable[Any]], context: Optional[Dict[str, Any]], presorted: bool,
+        data_sources: Optional[Dict[str, Iterable[Any]]], data_fingerprint: Optional[str]
+    ) -> Optional[str]:
+        """
+        Returns the key of the report in the `report_cache`, or `None` if the template file can't be read or
+        the objects or tags can't be fingerprinted, in which case the report is rendered without the cache.
+        The tags are identified by everything that affects their rendered value, with their functions
+        identified by their name, code and the state they carry, see `fingerprint`.
+        """
+        if self._template_version is None:
+            return None
+
+        with self._phase("report_cache"):
+            tags = [
+                (
+                    tag.name, tag.header, tag.data, tag.column, tag.get_value_fn, tag.value_fn_args,
+                    tag.custom_number_format_fn, tag.settings.model_dump(), tag.vectorized_fn, tag.prefetch_fn
+                )
+                for tag in self.tags.values()
+            ]
+            try:
+                if data_fingerprint is None:
+                    data_fingerprint = fingerprint(list_objects, data_sources)
+                return fingerprint(
+                    type(self), self._template_version, self.tag_settings.model_dump(), self.requires_header_tag,
+                    tags, context, presorted, data_fingerprint
+                )
+            except ReportCacheException:
+                return None
+
+    def _read_cached_report(
+        self, cache_key: Optional[str], output_path: Optional[str], output_filename: Optional[str], as_stream: bool
+    ) -> Optional[io.BytesIO | str]:
+        if cache_key is None:
+            return None
+
+        with self._phase("report_cache"):
+            data = self.report_cache.get(cache_key)
+            if data is None:
+                return None
+
+            if as_stream:
+                output = io.BytesIO(data)
+            else:
+                output = self._get_report_path(output_filename, output_path)
+                with open(output, "wb") as f:
+                    f.write(data)
+
+        if self._stats is not None:
+            self._stats.cached = True
+            self._stats.bytes_written = len(data)
+        return output
+
+    def _cache_report(self, cache_key: Optional[str], output: io.BytesIO | str) -> None:
+        if cache_key is None:
+            return
+
+        with self._phase("report_cache"):
+            if isinstance(output, io.BytesIO):
+                self.report_cache.put(cache_key, output.getvalue())
+            else:
+                with open(output, "rb") as f:
+                    self.report_cache.put(cache_key, f.read())
+
+    def _write_report(
+        self, output_path: Optional[str], output_filename: Optional[str], as_stream: bool
+    ) -> io.BytesIO | str:
+        if self._stats is not None:
+            self._count_report_contents(self._stats)
+
+        with self._phase("serialization"):
+            if as_stream:
+                output = io.BytesIO()
+                self.template.save(output)
+                output.seek(0)
+            else:
+                output = self.save_report(output_filename, output_path)
 
-        self._handle_general_tags()
+        if self._stats is not None:
+            self._stats.bytes_written = (
+                output.getbuffer().nbytes if isinstance(output, io.BytesIO) else os.path.getsize(output)
+            )
+        return output
 
-        if as_stream:
-            output = io.BytesIO()
-            self.template.save(output)
-            output.seek(0)
-            return output
-        else:
-            self.save_report(output_filename, output_path)
+    def _count_report_contents(self, stats: ReportStats) -> None:
+        for sheet in self.template.worksheets:
+            stats.rows += sheet.max_row
+            stats.cells += len(sheet._cells)
+            stats.merges += len(sheet.merged_cells.ranges)
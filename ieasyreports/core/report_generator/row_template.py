@@ -0,0 +1,55 @@
+from copy import copy
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from openpyxl.cell import Cell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.worksheet import Worksheet
+
+from ieasyreports.core.report_generator.formula import FormulaTemplate
+
+
+@dataclass(frozen=True)
+class RowTemplateCell:
+    column: int
+    value: Any = None
+    style: Optional[StyleArray] = None
+    formula: Optional[FormulaTemplate] = None
+
+
+@dataclass(frozen=True)
+class RowTemplate:
+    """
+    A worksheet row captured once, to be stamped onto any number of rows of the same worksheet: the value,
+    style id and formula of its cells, and the merged ranges starting in it as `(min_col, row_span, max_col)`.
+    """
+    row: int
+    cells: tuple[RowTemplateCell, ...]
+    merges: tuple[tuple[int, int, int], ...] = ()
+
+    def stamp(self, sheet: Worksheet, row: int) -> None:
+        """
+        Writes the captured cells onto `row`. The styles are shared by id, and the formulas reference `row`
+        where they referenced the captured row. Cells without a captured value keep their current one.
+        """
+        def row_map(formula_row: int) -> int:
+            return row if formula_row == self.row else formula_row
+
+        cells = sheet._cells
+        for template_cell in self.cells:
+            value = template_cell.value
+            if template_cell.formula is not None:
+                value = template_cell.formula.render(row_map)
+            style = copy(template_cell.style) if template_cell.style is not None else None
+
+            cell = cells.get((row, template_cell.column))
+            if cell is None:
+                cells[(row, template_cell.column)] = Cell(
+                    sheet, row=row, column=template_cell.column, value=value, style_array=style
+                )
+                continue
+
+            if style is not None:
+                cell._style = style
+            if value is not None:
+                cell.value = value
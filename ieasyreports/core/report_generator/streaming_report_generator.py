@@ -0,0 +1,351 @@
+import bisect
+import functools
+from copy import copy
+from typing import Any, Dict, Iterable, Optional
+
+import openpyxl
+from openpyxl.cell import Cell, MergedCell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.dimensions import ColumnDimension, RowDimension
+from openpyxl.worksheet.worksheet import Worksheet
+
+from ieasyreports.core.report_generator.columnar import ColumnarData, is_columnar
+from ieasyreports.core.report_generator.compiled_template import CompiledSheet
+from ieasyreports.core.report_generator.instrumentation import ReportStats
+from ieasyreports.core.report_generator.report_generator import DefaultReportGenerator
+from ieasyreports.exceptions import InvalidTagException
+
+
+class StreamingReportGenerator(DefaultReportGenerator):
+    """
+    Report generator that writes the report through openpyxl's write-only workbook.
+
+    The compiled template is only read, never modified. The rows above the HEADER tag are written first,
+    followed by the grouped HEADER and DATA rows and finally the rows below the DATA row, so the number
+    of cells held in memory doesn't depend on the number of rendered rows. Worksheets with several
+    tables are written the same way, one table after the other. The objects of all worksheets are grouped
+    before the first row is written, so references to the rows of other worksheets are moved as well.
+
+    Column widths, row heights, merged ranges, cell styles and formulas are carried over to the report.
+    Images, charts, comments, conditional formatting and data validations of the template are not.
+
+    When the objects are `presorted` by their header value, they are grouped while they are being written,
+    so neither the objects nor the rendered rows are held in memory. The number of rendered rows is then
+    unknown while the rows above the HEADER tag are written, so formulas in those rows that reference
+    rows below the DATA row are left as they are, as are references to rows below the tables that follow
+    and references to the worksheet from the worksheets written before it.
+    Prefetch functions of the data tags are then called for each group of objects, and the header tag
+    isn't prefetched.
+    """
+
+    def _render_report(
+        self, list_objects: Optional[Iterable[Any]], context: Optional[Dict[str, Any]], presorted: bool = False,
+        data_sources: Optional[Dict[str, Iterable[Any]]] = None
+    ) -> None:
+        sheet_tables = {
+            compiled_sheet.sheet_index: table_objects
+            for compiled_sheet, table_objects in self._get_sheet_data_sources(list_objects, data_sources)
+        }
+
+        # the objects of all worksheets are grouped before any row is written, so that the rows
+        # of every worksheet are known to the formulas referencing them from other worksheets
+        self.template = self._create_report_workbook()
+        self._sheet_insertions: dict[str, tuple[list[int], list[int]]] = {}
+        sheets = [
+            self._group_sheet_tables(
+                compiled_sheet, sheet_tables.get(compiled_sheet.sheet_index, {}), context, presorted
+            )
+            for compiled_sheet in self.compiled_template.sheets
+        ]
+        for compiled_sheet, tables, prefetched in sheets:
+            self._write_sheet(compiled_sheet, tables, prefetched, presorted)
+
+    def _create_report_workbook(self) -> Any:
+        return openpyxl.Workbook(write_only=True)
+
+    def _group_sheet_tables(
+        self, compiled_sheet: CompiledSheet, table_objects: Dict[Optional[str], Iterable[Any]],
+        context: Optional[Dict[str, Any]], presorted: bool
+    ) -> tuple[CompiledSheet, list[tuple], dict[tuple[Optional[str], str], Any]]:
+        """Groups the objects of every table of a worksheet, and returns them with the values its tags prefetched."""
+        template_sheet = self.compiled_template.workbook.worksheets[compiled_sheet.sheet_index]
+        self._select_sheet(compiled_sheet, template_sheet)
+        table_objects = {name: self.prepare_list_objects(objects) for name, objects in table_objects.items()}
+
+        if context:
+            self._add_global_tag_context(context)
+
+        self._insertion_rows, self._insertion_counts = self._sheet_insertions[template_sheet.title] = [], []
+        tables = []
+        for name, sorted_list_objects in table_objects.items():
+            self._select_table(name)
+            if self.header_tag_info:
+                header_groups = self._group_table_objects(sorted_list_objects, presorted)
+                tables.append((self.header_tag_info["cell"].row, name, header_groups, self._columnar_cells))
+        tables.sort(key=lambda table: table[0])
+        return compiled_sheet, tables, self._prefetched
+
+    def _write_sheet(
+        self, compiled_sheet: CompiledSheet, tables: list[tuple],
+        prefetched: dict[tuple[Optional[str], str], Any], presorted: bool
+    ) -> None:
+        template_sheet = self.compiled_template.workbook.worksheets[compiled_sheet.sheet_index]
+        self._select_sheet(compiled_sheet, template_sheet)
+        self._prefetched = prefetched
+        self._insertion_rows, self._insertion_counts = self._sheet_insertions[template_sheet.title]
+        self._sheet_row_maps = {
+            title: functools.partial(self._map_formula_row, sheet_title=title)
+            for title, (rows, _) in self._sheet_insertions.items() if rows and title != template_sheet.title
+        }
+
+        self._start_sheet(template_sheet)
+        self._prepare_template_rows(template_sheet)
+        self._data_rows = {header_row + 1 for header_row, *_ in tables}
+
+        with self._phase("row_writing"):
+            self._write_rows(tables, template_sheet.max_row, presorted)
+        self._finish_sheet()
+
+    def _start_sheet(self, template_sheet: Worksheet) -> None:
+        self.sheet = self.template.create_sheet(template_sheet.title)
+        self._copy_sheet_layout(template_sheet)
+
+    def _finish_sheet(self) -> None:
+        # the write-only worksheet is written to its file as the rows are appended
+        pass
+
+    def _write_rows(self, tables: list[tuple], max_row: int, presorted: bool) -> None:
+        row = 1
+        for header_row, name, header_groups, columnar_cells in tables:
+            for template_row in range(row, header_row):
+                self._write_template_row(template_row, self._map_row(template_row))
+            self._select_table(name)
+            self._columnar_cells = columnar_cells
+            self._data_cells = self._get_data_cells()
+            self._write_table(header_groups, presorted and columnar_cells is None)
+            row = header_row + 2
+
+        for template_row in range(row, max_row + 1):
+            self._write_template_row(template_row, self._map_row(template_row))
+
+    def _group_table_objects(self, sorted_list_objects: Iterable[Any], presorted: bool) -> Iterable[tuple[str, Any]]:
+        """
+        Groups the objects of the selected table by their header value. Unless the objects are
+        `presorted`, the number of rows of the table is known upfront and recorded as an insertion.
+        """
+        data_row = self.header_tag_info["cell"].row + 1
+        self._columnar_cells = None
+        if is_columnar(sorted_list_objects):
+            data = ColumnarData.from_table(sorted_list_objects)
+            if self._get_prefetch_tags():
+                self._prefetch_tag_values([data.row(idx) for idx in range(data.num_rows)])
+            grouped_data = self._create_columnar_header_grouping(data)
+            self._columnar_cells = self._render_columnar_data_cells(data)
+        elif presorted:
+            return self._iter_header_groups(sorted_list_objects)
+        else:
+            if self._get_prefetch_tags():
+                sorted_list_objects = list(sorted_list_objects)
+                self._prefetch_tag_values(sorted_list_objects)
+            grouped_data = self._create_header_grouping(sorted_list_objects)
+
+        # rows below the DATA row move by the number of rendered rows, minus the HEADER and DATA rows themselves
+        self._add_insertion(data_row, sum(len(items) + 1 for items in grouped_data.values()) - 2)
+        return grouped_data.items()
+
+    def _write_table(self, header_groups: Iterable[tuple[str, Any]], prefetch_groups: bool) -> None:
+        header_row = self.header_tag_info["cell"].row
+        header_col = self.header_tag_info["cell"].column
+        data_row = header_row + 1
+
+        prefetch_groups = prefetch_groups and self._get_prefetch_tags(header=False)
+        start_row = current_row = self._map_row(header_row)
+        for header_value, item_group in header_groups:
+            self._write_template_row(header_row, current_row, values={header_col: header_value})
+            current_row += 1
+            if prefetch_groups:
+                # only the current group is held in memory, so the data tags prefetch one group at a time
+                item_group = list(item_group)
+                self._prefetch_tag_values(item_group, header=False)
+            for item in item_group:
+                self._write_template_row(data_row, current_row, values=self._get_data_values(item))
+                current_row += 1
+
+        if data_row not in self._insertion_rows:
+            self._add_insertion(data_row, current_row - start_row - 2)
+
+    def _add_insertion(self, data_row: int, count: int) -> None:
+        """Records that `count` rows are rendered after `data_row`, which moves the template rows below it."""
+        idx = bisect.bisect_left(self._insertion_rows, data_row)
+        self._insertion_rows.insert(idx, data_row)
+        self._insertion_counts.insert(idx, count)
+
+    def _copy_sheet_layout(self, template_sheet: Worksheet) -> None:
+        for key, dimension in template_sheet.column_dimensions.items():
+            self.sheet.column_dimensions[key] = ColumnDimension(
+                self.sheet, index=key, width=dimension.width, bestFit=dimension.bestFit, hidden=dimension.hidden,
+                outlineLevel=dimension.outlineLevel, collapsed=dimension.collapsed,
+                min=dimension.min, max=dimension.max
+            )
+
+        self.sheet.sheet_format = copy(template_sheet.sheet_format)
+        self.sheet.sheet_properties = copy(template_sheet.sheet_properties)
+        self.sheet.page_margins = copy(template_sheet.page_margins)
+        self.sheet.print_options = copy(template_sheet.print_options)
+        for attr in ("orientation", "paperSize", "scale", "fitToWidth", "fitToHeight"):
+            setattr(self.sheet.page_setup, attr, getattr(template_sheet.page_setup, attr))
+        self.sheet.freeze_panes = template_sheet.freeze_panes
+
+    def _prepare_template_rows(self, template_sheet: Worksheet) -> None:
+        self._template_sheet = template_sheet
+        self._data_rows: set[int] = set()
+        self._style_cache: dict[tuple, StyleArray] = {}
+        self._columnar_cells: Optional[dict[int, list[Any]]] = None
+
+        self._template_rows: dict[int, list[Cell]] = {}
+        for (row, _), cell in sorted(template_sheet._cells.items()):
+            self._template_rows.setdefault(row, []).append(cell)
+
+        self._merged_ranges_by_row: dict[int, list[tuple[int, int, int, int]]] = {}
+        for merged_range in template_sheet.merged_cells.ranges:
+            min_col, min_row, max_col, max_row = merged_range.bounds
+            # ranges across the HEADER and DATA rows of tables without objects shrink to their remaining rows
+            while min_row <= max_row and self._map_formula_row(min_row) is None:
+                min_row += 1
+            while max_row >= min_row and self._map_formula_row(max_row) is None:
+                max_row -= 1
+            if min_row < max_row or (min_row == max_row and min_col != max_col):
+                self._merged_ranges_by_row.setdefault(min_row, []).append((min_col, min_row, max_col, max_row))
+
+        self._data_cells = {}
+
+    def _get_data_values(self, item: Any) -> dict[int, Any]:
+        if self._columnar_cells is not None:
+            # the item is a row index of the columnar data, whose cells are already rendered
+            return {column: values[item] for column, values in self._columnar_cells.items()}
+
+        return {column: self._render_cell(compiled_cell, item) for column, compiled_cell in self._data_cells.items()}
+
+    def _map_row(self, row: int) -> int:
+        """
+        Returns the report row of a template row that isn't part of the HEADER and DATA rows,
+        as far as the number of rows of the tables above it is known.
+        """
+        return row + sum(self._insertion_counts[:bisect.bisect_left(self._insertion_rows, row)])
+
+    def _map_formula_row(self, row: int, sheet_title: Optional[str] = None) -> Optional[int]:
+        """
+        Same as `_map_row`, but returns `None` for the HEADER and DATA rows of tables without objects.
+        With a `sheet_title`, maps the rows of that worksheet instead of the one being written.
+        """
+        if sheet_title is None:
+            rows, counts = self._insertion_rows, self._insertion_counts
+        else:
+            rows, counts = self._sheet_insertions[sheet_title]
+
+        idx = bisect.bisect_left(rows, row)
+        if idx < len(rows) and counts[idx] < 0 and row > rows[idx] + counts[idx]:
+            return None
+        return row + sum(counts[:idx])
+
+    def _shift_formula(
+        self, formula: str, current_row: int, data_row: Optional[int], template_cell: Optional[Cell] = None
+    ) -> str:
+        """
+        Moves the references to rows below the DATA rows by the number of rendered rows, on this and the other
+        worksheets. Formulas of rendered DATA rows reference their own row instead of `data_row`.
+        """
+        if not isinstance(formula, str) or not (self._data_rows or self._sheet_row_maps):
+            return formula
+
+        position = (template_cell.row, template_cell.column) if template_cell is not None else (None, None)
+        return self._compile_formula(formula, *position).render(
+            lambda row: current_row if row == data_row else self._map_formula_row(row), self._sheet_row_maps
+        )
+
+    def _get_style(self, template_cell: Cell) -> StyleArray:
+        key = tuple(template_cell._style)
+        style = self._style_cache.get(key)
+        if style is None:
+            # styles have to be registered in the report workbook, which has its own style tables
+            prototype = WriteOnlyCell(self.sheet)
+            if template_cell.has_style:
+                prototype.font = copy(template_cell.font)
+                prototype.border = copy(template_cell.border)
+                prototype.fill = copy(template_cell.fill)
+                prototype.number_format = template_cell.number_format
+                prototype.protection = copy(template_cell.protection)
+                prototype.alignment = copy(template_cell.alignment)
+            style = self._style_cache[key] = prototype._style
+        return copy(style)
+
+    def _get_cell_value(self, template_cell: Cell, current_row: int) -> Any:
+        if isinstance(template_cell, MergedCell):
+            return None
+
+        value = template_cell.value
+        compiled_cell = self.compiled_sheet.cells.get((template_cell.row, template_cell.column))
+        if compiled_cell is not None:
+            try:
+                value = self._render_cell(compiled_cell)
+            except Exception as e:
+                tags = ", ".join(slot.tag for slot in compiled_cell.slots)
+                raise InvalidTagException(f"Error replacing tags {tags} in cell {template_cell.coordinate}: {e}")
+
+        if template_cell.data_type == 'f':
+            data_row = template_cell.row if template_cell.row in self._data_rows else None
+            value = self._shift_formula(value, current_row, data_row, template_cell)
+        return value
+
+    def _write_template_row(self, template_row: int, current_row: int, values: Optional[dict[int, Any]] = None) -> None:
+        row = []
+        for template_cell in self._template_rows.get(template_row, ()):
+            if values is not None and template_cell.column in values:
+                value = values[template_cell.column]
+            else:
+                value = self._get_cell_value(template_cell, current_row)
+
+            if value is None and not template_cell.has_style:
+                continue
+
+            cell = WriteOnlyCell(self.sheet, value)
+            cell._style = self._get_style(template_cell)
+            row.extend([None] * (template_cell.column - len(row) - 1))
+            row.append(cell)
+
+        template_rd = self._template_sheet.row_dimensions.get(template_row)
+        if template_rd is not None:
+            self.sheet.row_dimensions[current_row] = RowDimension(
+                self.sheet, index=current_row, ht=template_rd.ht, hidden=template_rd.hidden,
+                outlineLevel=template_rd.outlineLevel, collapsed=template_rd.collapsed
+            )
+
+        self._write_merged_ranges(template_row, current_row)
+        self.sheet.append(row)
+        if self._stats is not None:
+            self._stats.rows += 1
+            self._stats.cells += sum(cell is not None for cell in row)
+        # the row is already written to the stream, its dimensions are no longer needed
+        self.sheet.row_dimensions.pop(current_row, None)
+
+    def _write_merged_ranges(self, template_row: int, current_row: int) -> None:
+        table_row = template_row in self._data_rows or template_row + 1 in self._data_rows
+        for min_col, min_row, max_col, max_row in self._merged_ranges_by_row.get(template_row, ()):
+            if table_row:
+                max_row = current_row + max_row - min_row
+            else:
+                max_row = self._map_row(max_row)
+            self._add_merged_range(min_col, current_row, max_col, max_row)
+            if self._stats is not None:
+                self._stats.merges += 1
+
+    def _add_merged_range(self, min_col: int, min_row: int, max_col: int, max_row: int) -> None:
+        # merged ranges are only written at the end of the sheet, so they can be added without any checks
+        self.sheet.merged_cells.ranges.add(
+            CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row)
+        )
+
+    def _count_report_contents(self, stats: ReportStats) -> None:
+        # the rows, cells and merged ranges are counted while they are written
+        pass
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+from ieasyreports.core.report_generator.compiled_template import CompiledTemplate
+
+
+class TemplateCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    max_entries: int
+    max_bytes: int
+    entries: int
+    bytes: int
+
+
+class TemplateCache:
+    """
+    Thread-safe LRU cache of compiled templates.
+
+    Entries are bounded both by count and by a byte budget. The size of an entry is approximated by
+    the size of its template file. Renders never modify a cached template, they work on a copy
+    obtained through `CompiledTemplate.new_workbook()`.
+    """
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[CompiledTemplate, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[CompiledTemplate]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, compiled_template: CompiledTemplate, size: int) -> None:
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (compiled_template, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def cache_info(self) -> TemplateCacheInfo:
+        with self._lock:
+            return TemplateCacheInfo(
+                self.hits, self.misses, self.evictions, self.max_entries, self.max_bytes,
+                len(self._entries), self._bytes
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_template_cache: Optional[TemplateCache] = None
+_default_template_cache_lock = threading.Lock()
+
+
+def get_default_template_cache() -> TemplateCache:
+    """Returns the process-wide template cache, configured through `ReportGeneratorSettings`."""
+    global _default_template_cache
+    if _default_template_cache is None:
+        with _default_template_cache_lock:
+            if _default_template_cache is None:
+                from ieasyreports.settings import ReportGeneratorSettings
+
+                settings = ReportGeneratorSettings()
+                _default_template_cache = TemplateCache(
+                    max_entries=settings.template_cache_max_entries,
+                    max_bytes=settings.template_cache_max_bytes
+                )
+    return _default_template_cache
@@ -0,0 +1,163 @@
+import posixpath
+import re
+import zipfile
+from functools import lru_cache
+from typing import IO, TYPE_CHECKING, Iterable, Iterator, Optional, Union
+from xml.etree.ElementTree import iterparse, parse
+
+from ieasyreports.core.report_generator.compiled_template import TagPosition
+
+if TYPE_CHECKING:
+    from ieasyreports.settings import TagSettings
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+CELL_REFERENCE_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+@lru_cache(maxsize=None)
+def get_tag_regex(tag_start_symbol: str, tag_end_symbol: str) -> re.Pattern:
+    return re.compile(rf"{re.escape(tag_start_symbol)}(.*?){re.escape(tag_end_symbol)}")
+
+
+def decode_tag(tag: str, tag_settings: "TagSettings") -> tuple[str, Optional[str], Optional[str]]:
+    """Splits the content of a tag, e.g. `HEADER:discharge.REGION`, into its name, type and table."""
+    parts = tag.split(tag_settings.split_symbol)
+    name = parts.pop(-1)
+    tag_type = parts.pop(-1) if parts else None
+    table = None
+    if tag_type is not None and tag_settings.table_symbol in tag_type:
+        tag_type, table = tag_type.split(tag_settings.table_symbol, 1)
+    return name, tag_type, table
+
+
+def scan_template_tags(
+    template: Union[str, IO[bytes]], tag_settings: "TagSettings", sheet_index: int = 0
+) -> list[TagPosition]:
+    """
+    Finds the tags of a worksheet of an xlsx template without loading it into openpyxl.
+
+    Only the shared strings and the XML of the worksheet are read, with a streaming parser,
+    so neither the styles nor the cells of the template are kept in memory. The positions are
+    returned in the same order as the cells are visited by `DefaultReportGenerator.iter_cells`.
+    """
+    return scan_template_sheets(template, tag_settings, sheet_indexes=[sheet_index])[0]
+
+
+def scan_template_sheets(
+    template: Union[str, IO[bytes]], tag_settings: "TagSettings", sheet_indexes: Optional[Iterable[int]] = None
+) -> list[list[TagPosition]]:
+    """Same as `scan_template_tags`, for each of the given worksheets or all of them."""
+    tag_regex = get_tag_regex(tag_settings.tag_start_symbol, tag_settings.tag_end_symbol)
+    sheets = []
+    with zipfile.ZipFile(template) as archive:
+        sheet_paths, shared_strings_path = _get_part_paths(archive)
+        shared_strings = _read_shared_strings(archive, shared_strings_path)
+        if sheet_indexes is not None:
+            sheet_paths = [sheet_paths[sheet_index] for sheet_index in sheet_indexes]
+
+        for sheet_path in sheet_paths:
+            positions = []
+            for row, column, value in _iter_string_cells(archive, sheet_path, shared_strings):
+                for tag in tag_regex.findall(value):
+                    name, tag_type, table = decode_tag(tag, tag_settings)
+                    positions.append(TagPosition(name, tag_type, row, column, table))
+            sheets.append(positions)
+    return sheets
+
+
+def _get_part_paths(archive: zipfile.ZipFile) -> tuple[list[str], Optional[str]]:
+    with archive.open("xl/_rels/workbook.xml.rels") as f:
+        relationships = {
+            rel.get("Id"): (rel.get("Type", "").rsplit("/", 1)[-1], _resolve_target(rel.get("Target")))
+            for rel in parse(f).getroot().iter(f"{PKG_REL_NS}Relationship")
+        }
+
+    with archive.open("xl/workbook.xml") as f:
+        sheet_ids = [sheet.get(f"{REL_NS}id") for sheet in parse(f).getroot().iter(f"{MAIN_NS}sheet")]
+
+    worksheets = [relationships[rel_id][1] for rel_id in sheet_ids if relationships[rel_id][0] == "worksheet"]
+    shared_strings = next((target for rel_type, target in relationships.values() if rel_type == "sharedStrings"), None)
+    return worksheets, shared_strings
+
+
+def _resolve_target(target: str) -> str:
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def _read_shared_strings(archive: zipfile.ZipFile, path: Optional[str]) -> list[str]:
+    if path is None or path not in archive.namelist():
+        return []
+
+    shared_strings = []
+    with archive.open(path) as f:
+        for _, element in iterparse(f):
+            if element.tag == f"{MAIN_NS}si":
+                shared_strings.append(_get_text(element))
+                element.clear()
+    return shared_strings
+
+
+def _get_text(element) -> str:
+    """Returns the text of a string item, without the phonetic runs, like openpyxl does."""
+    texts = element.findall(f"{MAIN_NS}t") + element.findall(f"{MAIN_NS}r/{MAIN_NS}t")
+    return "".join(text.text or "" for text in texts)
+
+
+def _iter_string_cells(
+    archive: zipfile.ZipFile, sheet_path: str, shared_strings: list[str]
+) -> Iterator[tuple[int, int, str]]:
+    """Yields the row, column and value of every cell holding a string or a formula."""
+    row, column = 0, 0
+    with archive.open(sheet_path) as f:
+        for event, element in iterparse(f, events=("start", "end")):
+            if event == "start":
+                if element.tag == f"{MAIN_NS}row":
+                    row = int(element.get("r", row + 1))
+                    column = 0
+                continue
+
+            if element.tag == f"{MAIN_NS}c":
+                reference = element.get("r")
+                if reference:
+                    letters, row_number = CELL_REFERENCE_RE.match(reference).groups()
+                    row, column = int(row_number), _column_index(letters)
+                else:
+                    column += 1
+
+                value = _get_cell_value(element, shared_strings)
+                if value:
+                    yield row, column, value
+                element.clear()
+            elif element.tag == f"{MAIN_NS}row":
+                element.clear()
+
+
+def _get_cell_value(element, shared_strings: list[str]) -> Optional[str]:
+    formula = element.find(f"{MAIN_NS}f")
+    if formula is not None:
+        return f"={formula.text}" if formula.text else None
+
+    cell_type = element.get("t")
+    if cell_type == "s":
+        value = element.find(f"{MAIN_NS}v")
+        return shared_strings[int(value.text)] if value is not None else None
+    if cell_type == "inlineStr":
+        inline_string = element.find(f"{MAIN_NS}is")
+        return _get_text(inline_string) if inline_string is not None else None
+    if cell_type == "str":
+        value = element.find(f"{MAIN_NS}v")
+        return value.text if value is not None else None
+    return None
+
+
+@lru_cache(maxsize=None)
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
@@ -0,0 +1,142 @@
+import glob
+import io
+import mmap
+import os
+import threading
+from typing import Optional, Union
+
+TemplateData = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class TemplateReader(io.RawIOBase):
+    """
+    Read-only, seekable file over the bytes of a template, e.g. an mmap. Reads copy only the requested
+    slice, so zipfile and openpyxl can open a template without a copy of the whole file.
+    """
+    def __init__(self, data: TemplateData):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            # releasing the view lets the owner of an mmap close it
+            self._view.release()
+        super().close()
+
+
+class TemplateStore:
+    """
+    Thread-safe store of memory-mapped template files, shared by all generators of a process.
+
+    Each template is mapped read-only once, and mapped again if its file is modified, which closes the previous
+    map. The pages of a mapped file live in the page cache of the host, so they are shared by all processes reading
+    the template, and worker processes forked after `preload` inherit the maps without reading the templates again.
+    Closing the store, or leaving it as a context manager, closes all maps.
+    """
+    def __init__(self):
+        self._maps: dict[str, tuple[Union[mmap.mmap, bytes], int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Union[mmap.mmap, bytes]:
+        """Returns the mapped template at `path`. Raises `FileNotFoundError` if there's no such file."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._maps.get(path)
+        if entry is not None and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+            return entry[0]
+
+        with self._lock:
+            entry = self._maps.get(path)
+            if entry is None or entry[1:] != (stat.st_mtime_ns, stat.st_size):
+                if entry is not None:
+                    self._close_map(entry[0])
+                entry = self._maps[path] = (self._map(path), stat.st_mtime_ns, stat.st_size)
+            return entry[0]
+
+    @staticmethod
+    def _map(path: str) -> Union[mmap.mmap, bytes]:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be mapped
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _close_map(data: Union[mmap.mmap, bytes]) -> None:
+        if isinstance(data, mmap.mmap):
+            try:
+                data.close()
+            except BufferError:
+                # a generator is still reading the map, it's closed once it's no longer referenced
+                pass
+
+    def preload(self, directory: str, pattern: str = "*.xlsx") -> list[str]:
+        """
+        Maps all templates of `directory` matching `pattern`, e.g. before forking workers, and returns their paths.
+        """
+        paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        for path in paths:
+            self.get(path)
+        return paths
+
+    def clear(self) -> None:
+        """Closes all maps. Templates requested afterwards are mapped again."""
+        with self._lock:
+            for data, _, _ in self._maps.values():
+                self._close_map(data)
+            self._maps.clear()
+
+    def close(self) -> None:
+        self.clear()
+
+    def __enter__(self) -> "TemplateStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self._maps
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+
+_default_template_store: Optional[TemplateStore] = None
+_default_template_store_lock = threading.Lock()
+
+
+def get_default_template_store() -> TemplateStore:
+    """Returns the process-wide template store."""
+    global _default_template_store
+    if _default_template_store is None:
+        with _default_template_store_lock:
+            if _default_template_store is None:
+                _default_template_store = TemplateStore()
+    return _default_template_store
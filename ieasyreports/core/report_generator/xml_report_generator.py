@@ -0,0 +1,493 @@
+import datetime
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+from typing import IO, Any, Optional, Sequence, Union
+from xml.etree import ElementTree
+
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE
+from openpyxl.compat.numbers import NUMERIC_TYPES
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.worksheet.formula import ArrayFormula
+from openpyxl.worksheet.worksheet import Worksheet
+
+from ieasyreports.core.report_generator.streaming_report_generator import StreamingReportGenerator
+from ieasyreports.core.report_generator.template_store import TemplateData, TemplateReader
+from ieasyreports.exceptions import TemplateNotFoundException, UnsupportedTemplateException
+
+RELATIONSHIPS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_RELATIONSHIPS_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_TYPE = f"{OFFICE_RELATIONSHIPS_NS}/worksheet"
+SHARED_STRINGS_TYPE = f"{OFFICE_RELATIONSHIPS_NS}/sharedStrings"
+STYLES_TYPE = f"{OFFICE_RELATIONSHIPS_NS}/styles"
+CALC_CHAIN_TYPE = f"{OFFICE_RELATIONSHIPS_NS}/calcChain"
+OFFICE_DOCUMENT_TYPE = f"{OFFICE_RELATIONSHIPS_NS}/officeDocument"
+SPREADSHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+# elements that follow <mergeCells> in a worksheet and <calcPr> in a workbook, in schema order
+MERGE_CELLS_FOLLOWERS = (
+    "phoneticPr", "conditionalFormatting", "dataValidations", "hyperlinks", "printOptions", "pageMargins",
+    "pageSetup", "headerFooter", "rowBreaks", "colBreaks", "customProperties", "cellWatches", "ignoredErrors",
+    "smartTags", "drawing", "legacyDrawing", "legacyDrawingHF", "drawingHF", "picture", "oleObjects", "controls",
+    "webPublishItems", "tableParts", "extLst",
+)
+# elements of a worksheet whose ranges and anchors would have to move with the rendered rows
+ROW_ANCHORED_ELEMENTS = (
+    "conditionalFormatting", "conditionalFormattings", "dataValidations", "hyperlinks", "rowBreaks", "drawing",
+    "legacyDrawing", "oleObjects", "controls", "tableParts", "sparklineGroups",
+)
+CALC_PR_FOLLOWERS = (
+    "oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing",
+    "fileRecoveryPr", "webPublishObjects", "extLst",
+)
+# built-in number formats given to dates written into cells formatted as General, like openpyxl does
+TIME_FORMAT_IDS = ((datetime.datetime, 22), (datetime.date, 14), (datetime.time, 21), (datetime.timedelta, 46))
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+CELL_RE = re.compile(r"<(?:\w+:)?c\b([^>]*)>")
+CELL_REF_RE = re.compile(r'\br="([A-Z]+)(\d+)"')
+CELL_STYLE_RE = re.compile(r'\bs="(\d+)"')
+XF_RE = re.compile(r"<(?:\w+:)?xf\b[^>]*?(?:/>|>.*?</(?:\w+:)?xf>)", re.DOTALL)
+ROW_ANCHORED_RE = re.compile(rf"<(?:\w+:)?({'|'.join(ROW_ANCHORED_ELEMENTS)})\b")
+NUM_FMT_RE = re.compile(r"<(?:\w+:)?numFmt\b[^>]*?\bnumFmtId=\"(\d+)\"[^>]*?\bformatCode=\"([^\"]*)\"")
+
+
+def _escape(value: str) -> str:
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    return value
+
+
+def _element_re(prefix: str, name: str) -> re.Pattern:
+    return re.compile(rf"<{prefix}{name}\b[^>]*?(?:/>|>.*?</{prefix}{name}>)", re.DOTALL)
+
+
+def _insert_element(xml: str, element: str, prefix: str, followers: Sequence[str], end_tag: str) -> str:
+    """Inserts `element` before the first of the `followers` elements, or before `end_tag` if there's none."""
+    positions = [
+        match.start() for match in (re.search(rf"<{prefix}{name}\b", xml) for name in followers) if match
+    ]
+    position = min(positions) if positions else xml.rindex(end_tag)
+    return xml[:position] + element + xml[position:]
+
+
+class XlsxSheetPart:
+    """
+    The XML of a template worksheet around its `<sheetData>`, which is replaced by the rendered rows
+    together with the `<dimension>` and `<mergeCells>` elements, the style ids of its cells and the
+    elements anchored to its rows, such as conditional formatting and drawings.
+    """
+    def __init__(self, name: str, xml: str):
+        self.name = name
+        match = re.search(
+            r"<(?P<prefix>(?:\w+:)?)sheetData\b[^>]*?(?:/>|>.*?</(?P=prefix)sheetData>)", xml, re.DOTALL
+        )
+        if match is None:
+            raise ValueError(f"The worksheet {name} has no sheetData.")
+
+        self.prefix = match.group("prefix")
+        self.style_ids: dict[tuple[int, int], int] = {}
+        for attributes in CELL_RE.findall(match.group(0)):
+            ref, style = CELL_REF_RE.search(attributes), CELL_STYLE_RE.search(attributes)
+            if ref is not None and style is not None:
+                self.style_ids[(int(ref.group(2)), column_index_from_string(ref.group(1)))] = int(style.group(1))
+
+        self.head = xml[:match.start()]
+        tail = xml[match.end():]
+        self.row_anchored_elements = sorted(set(ROW_ANCHORED_RE.findall(tail)))
+        merge_cells = _element_re(self.prefix, "mergeCells").search(tail)
+        if merge_cells is not None:
+            tail = tail[:merge_cells.start()] + "\0" + tail[merge_cells.end():]
+        else:
+            tail = _insert_element(tail, "\0", self.prefix, MERGE_CELLS_FOLLOWERS, f"</{self.prefix}worksheet>")
+        self.merge_cells_head, self.merge_cells_tail = tail.split("\0")
+
+    def render(self, dimension: str, merged_ranges: list[str]) -> tuple[bytes, bytes]:
+        """Returns the XML before and after the rows of the worksheet."""
+        p = self.prefix
+        head = re.sub(rf'(<{p}dimension\b[^>]*?\bref=")[^"]*"', rf'\g<1>{dimension}"', self.head, count=1)
+        merge_cells = ""
+        if merged_ranges:
+            merge_cells = "".join(
+                [f'<{p}mergeCells count="{len(merged_ranges)}">']
+                + [f'<{p}mergeCell ref="{ref}"/>' for ref in merged_ranges]
+                + [f"</{p}mergeCells>"]
+            )
+        head = f"{head}<{p}sheetData>"
+        tail = f"</{p}sheetData>{self.merge_cells_head}{merge_cells}{self.merge_cells_tail}"
+        return head.encode("utf-8"), tail.encode("utf-8")
+
+
+class XlsxTemplate:
+    """
+    The package of an xlsx template, read once to find the parts of its workbook, worksheets,
+    shared strings and styles. The parts are read again from `data` whenever a report is saved.
+    """
+    def __init__(self, data: TemplateData):
+        self.data = data
+        with TemplateReader(data) as reader, zipfile.ZipFile(reader) as archive:
+            self.names = archive.namelist()
+            self.workbook_part = self._get_related_parts(archive, "", OFFICE_DOCUMENT_TYPE)[0][1]
+            workbook_rels = self._get_related_parts(archive, self.workbook_part)
+            self.workbook_rels_part = self._get_rels_part(self.workbook_part)
+            parts_by_type = {type_: part for _, part, type_ in reversed(workbook_rels)}
+            self.shared_strings_part = parts_by_type.get(SHARED_STRINGS_TYPE)
+            self.styles_part = parts_by_type.get(STYLES_TYPE)
+            self.calc_chain_part = parts_by_type.get(CALC_CHAIN_TYPE)
+
+            worksheet_parts = {rel_id: part for rel_id, part, type_ in workbook_rels if type_ == WORKSHEET_TYPE}
+            workbook = ElementTree.fromstring(archive.read(self.workbook_part))
+            self.sheets: dict[str, XlsxSheetPart] = {}
+            for sheet in workbook.iter(f"{{{SPREADSHEET_NS}}}sheet"):
+                part = worksheet_parts.get(sheet.get(f"{{{OFFICE_RELATIONSHIPS_NS}}}id"))
+                if part is not None:
+                    self.sheets[sheet.get("name")] = XlsxSheetPart(part, archive.read(part).decode("utf-8"))
+
+            self.styles_xml = archive.read(self.styles_part).decode("utf-8") if self.styles_part else None
+        self.cell_xfs = XF_RE.findall(self._get_cell_xfs()[1]) if self.styles_xml else []
+        self.num_formats = dict(NUM_FMT_RE.findall(self.styles_xml)) if self.styles_xml else {}
+
+    @staticmethod
+    def _get_rels_part(part: str) -> str:
+        directory, name = posixpath.split(part)
+        return posixpath.join(directory, "_rels", f"{name}.rels")
+
+    def _get_related_parts(self, archive: zipfile.ZipFile, part: str, rel_type: Optional[str] = None) -> list[tuple]:
+        """Returns the id, part name and type of the relationships of `part`, "" being the package itself."""
+        rels_part = self._get_rels_part(part) if part else "_rels/.rels"
+        if rels_part not in self.names:
+            return []
+
+        related = []
+        for rel in ElementTree.fromstring(archive.read(rels_part)).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+            if rel.get("TargetMode") == "External" or (rel_type is not None and rel.get("Type") != rel_type):
+                continue
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+            related.append((rel.get("Id"), target, rel.get("Type")))
+        return related
+
+    def _get_cell_xfs(self) -> tuple[re.Match, str]:
+        match = re.search(r"(<(?:\w+:)?cellXfs\b[^>]*>)(.*?)(</(?:\w+:)?cellXfs>)", self.styles_xml, re.DOTALL)
+        return match, match.group(2) if match else ""
+
+    def is_date_style(self, style_id: int) -> bool:
+        if style_id >= len(self.cell_xfs):
+            return False
+        match = re.search(r'\bnumFmtId="(\d+)"', self.cell_xfs[style_id])
+        fmt_id = int(match.group(1)) if match else 0
+        return is_date_format(self.num_formats.get(str(fmt_id)) or BUILTIN_FORMATS.get(fmt_id, "General"))
+
+    def get_styles_xml(self, extra_xfs: list[str]) -> str:
+        """Returns the styles part with `extra_xfs` appended to its cell formats."""
+        match, xfs = self._get_cell_xfs()
+        start_tag = re.sub(r'\bcount="\d+"', f'count="{len(self.cell_xfs) + len(extra_xfs)}"', match.group(1))
+        return "".join((
+            self.styles_xml[:match.start()], start_tag, xfs, *extra_xfs, match.group(3), self.styles_xml[match.end():]
+        ))
+
+
+class XlsxPackage:
+    """
+    The package of a report, made of the parts of its `XlsxTemplate`. Parts are replaced by bytes or by
+    a sequence of bytes and files, which are written one after the other, and the other parts are copied as they are.
+    The files are closed once the package is saved.
+    """
+    def __init__(self, template: XlsxTemplate):
+        self.xlsx_template = template
+        self.parts: dict[str, Sequence[Union[bytes, IO[bytes]]]] = {}
+        self.removed: set[str] = set()
+
+    def read(self, name: str) -> bytes:
+        with TemplateReader(self.xlsx_template.data) as reader, zipfile.ZipFile(reader) as archive:
+            return archive.read(name)
+
+    def replace(self, name: str, data: Union[bytes, Sequence[Union[bytes, IO[bytes]]]]) -> None:
+        self.parts[name] = [data] if isinstance(data, bytes) else data
+
+    def remove(self, name: str) -> None:
+        self.removed.add(name)
+
+    def save(self, target: Union[str, IO[bytes]]) -> None:
+        try:
+            self._write(target)
+        finally:
+            self.close()
+
+    def _write(self, target: Union[str, IO[bytes]]) -> None:
+        with TemplateReader(self.xlsx_template.data) as reader, zipfile.ZipFile(reader) as archive, \
+                zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as report:
+            for info in archive.infolist():
+                if info.filename in self.removed:
+                    continue
+                if info.filename not in self.parts:
+                    report.writestr(info, archive.read(info), compress_type=zipfile.ZIP_DEFLATED)
+                    continue
+
+                part_info = zipfile.ZipInfo(info.filename, info.date_time)
+                part_info.compress_type = zipfile.ZIP_DEFLATED
+                with report.open(part_info, "w", force_zip64=True) as part:
+                    for chunk in self.parts[info.filename]:
+                        if isinstance(chunk, bytes):
+                            part.write(chunk)
+                        else:
+                            chunk.seek(0)
+                            shutil.copyfileobj(chunk, part)
+
+    def close(self) -> None:
+        """Closes the files of the replaced parts, e.g. the spooled rows of the worksheets."""
+        for chunks in self.parts.values():
+            for chunk in chunks:
+                if not isinstance(chunk, bytes):
+                    chunk.close()
+
+
+class XmlReportGenerator(StreamingReportGenerator):
+    """
+    Report generator that writes the xlsx package of the report directly. The parts of the template
+    that don't depend on the data, such as styles, themes, drawings and the worksheet layouts, are copied
+    as they are, and only the rows of the worksheets and the shared strings are generated, along with new
+    cell formats for dates written into cells formatted as General. The rows are streamed like with the
+    `StreamingReportGenerator`, with the style ids of the template cells, so no styles are created.
+
+    Worksheets with HEADER / DATA tables can't have conditional formatting, data validations, hyperlinks,
+    drawings, comments or Excel tables, whose ranges and anchors would have to move with the rendered rows,
+    an `UnsupportedTemplateException` is raised instead. Rich text is written as plain text.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._xlsx_template: Optional[XlsxTemplate] = None
+
+    def _read_template_data(self) -> TemplateData:
+        try:
+            data = self._get_template_data()
+            if data is not None:
+                return data
+            with open(self._get_template_full_path(), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise TemplateNotFoundException(
+                f"Cannot find {self.template_filename} in the {self.templates_directory_path} folder."
+            )
+
+    def _create_report_workbook(self) -> XlsxPackage:
+        if self._xlsx_template is None or self.template_store is not None:
+            # the store maps a modified template again and closes the map the package was read from
+            data = self._read_template_data()
+            if self._xlsx_template is None or data is not self._xlsx_template.data:
+                self._xlsx_template = XlsxTemplate(data)
+        self._strings: dict[str, int] = {}
+        self._string_count = 0
+        self._extra_xfs: list[str] = []
+        self._date_styles: dict[tuple[int, int], int] = {}
+        self._epoch = self.compiled_template.workbook.epoch
+        return XlsxPackage(self._xlsx_template)
+
+    def _render_report(self, *args, **kwargs) -> None:
+        self._rows_file = None
+        try:
+            super()._render_report(*args, **kwargs)
+        except BaseException:
+            # the package is never saved, so the spooled rows of its worksheets are closed here
+            if isinstance(self.template, XlsxPackage):
+                self.template.close()
+            if self._rows_file is not None:
+                self._rows_file.close()
+            raise
+        xlsx_template = self._xlsx_template
+        package = self.template
+        if xlsx_template.shared_strings_part is not None:
+            package.replace(xlsx_template.shared_strings_part, self._get_shared_strings_xml())
+        if self._extra_xfs:
+            package.replace(xlsx_template.styles_part, xlsx_template.get_styles_xml(self._extra_xfs).encode("utf-8"))
+        self._request_full_calculation(package)
+
+    def _request_full_calculation(self, package: XlsxPackage) -> None:
+        """Drops the calculation chain of the template, whose cells have moved, and recalculates formulas on load."""
+        xlsx_template = self._xlsx_template
+        calc_chain = xlsx_template.calc_chain_part
+        if calc_chain is not None:
+            package.remove(calc_chain)
+            content_types = package.read("[Content_Types].xml").decode("utf-8")
+            package.replace("[Content_Types].xml", re.sub(
+                rf'<Override\b[^>]*?PartName="/{re.escape(calc_chain)}"[^>]*?/>', "", content_types
+            ).encode("utf-8"))
+            rels = package.read(xlsx_template.workbook_rels_part).decode("utf-8")
+            package.replace(xlsx_template.workbook_rels_part, re.sub(
+                rf'<Relationship\b[^>]*?Type="{re.escape(CALC_CHAIN_TYPE)}"[^>]*?/>', "", rels
+            ).encode("utf-8"))
+
+        workbook = package.read(xlsx_template.workbook_part).decode("utf-8")
+        match = re.search(r"<(?P<prefix>(?:\w+:)?)workbook\b", workbook)
+        prefix = match.group("prefix") if match else ""
+        calc_pr = re.search(rf"<{prefix}calcPr\b[^>]*?/?>", workbook)
+        if calc_pr is None:
+            workbook = _insert_element(
+                workbook, f'<{prefix}calcPr fullCalcOnLoad="1"/>', prefix, CALC_PR_FOLLOWERS, f"</{prefix}workbook>"
+            )
+        elif "fullCalcOnLoad=" not in calc_pr.group(0):
+            tag = f"<{prefix}calcPr"
+            workbook = workbook[:calc_pr.start()] + f'{tag} fullCalcOnLoad="1"' + workbook[calc_pr.start() + len(tag):]
+        package.replace(xlsx_template.workbook_part, workbook.encode("utf-8"))
+
+    def _start_sheet(self, template_sheet: Worksheet) -> None:
+        self._sheet_part = self._xlsx_template.sheets[template_sheet.title]
+        if self._sheet_part.row_anchored_elements and any(table["header"] for table in self.tables.values()):
+            raise UnsupportedTemplateException(
+                f"The worksheet {template_sheet.title} has {', '.join(self._sheet_part.row_anchored_elements)} "
+                f"elements, which the {type(self).__name__} can't move with the rendered rows."
+            )
+        self._rows_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._rows_buffer: list[str] = []
+        self._merged_range_refs: list[str] = []
+        self._max_row = self._max_column = 0
+
+    def _prepare_template_rows(self, template_sheet: Worksheet) -> None:
+        super()._prepare_template_rows(template_sheet)
+        # the style ids of the template cells are written as they are, merged cells keep their borders
+        style_ids = self._sheet_part.style_ids
+        self._template_cells: dict[int, list[tuple[int, str, int, Any]]] = {
+            row: [
+                (cell.column, get_column_letter(cell.column), style_ids.get((row, cell.column), 0), cell)
+                for cell in cells
+            ]
+            for row, cells in self._template_rows.items()
+        }
+        self._row_attributes: dict[int, str] = {}
+        for row, dimension in template_sheet.row_dimensions.items():
+            attributes = []
+            if dimension.ht is not None:
+                attributes.append(f' ht="{dimension.ht}" customHeight="1"')
+            if dimension.hidden:
+                attributes.append(' hidden="1"')
+            if dimension.outlineLevel:
+                attributes.append(f' outlineLevel="{dimension.outlineLevel}"')
+            if dimension.collapsed:
+                attributes.append(' collapsed="1"')
+            if attributes:
+                self._row_attributes[row] = "".join(attributes)
+
+    def _write_template_row(self, template_row: int, current_row: int, values: Optional[dict[int, Any]] = None) -> None:
+        p = self._sheet_part.prefix
+        cells = []
+        for column, letter, style_id, template_cell in self._template_cells.get(template_row, ()):
+            if values is not None and column in values:
+                value = values[column]
+            else:
+                value = self._get_cell_value(template_cell, current_row)
+
+            if value is None:
+                if not style_id:
+                    continue
+                cells.append(f'<{p}c r="{letter}{current_row}" s="{style_id}"/>')
+            else:
+                cells.append(self._get_cell_xml(f"{letter}{current_row}", value, style_id))
+            self._max_column = max(self._max_column, column)
+
+        attributes = self._row_attributes.get(template_row, "")
+        if cells:
+            self._rows_buffer.append(f'<{p}row r="{current_row}"{attributes}>{"".join(cells)}</{p}row>')
+            self._max_row = current_row
+        elif attributes:
+            self._rows_buffer.append(f'<{p}row r="{current_row}"{attributes}/>')
+        if len(self._rows_buffer) >= 1000:
+            self._flush_rows()
+
+        self._write_merged_ranges(template_row, current_row)
+        if self._stats is not None:
+            self._stats.rows += 1
+            self._stats.cells += len(cells)
+
+    def _get_cell_xml(self, ref: str, value: Any, style_id: int) -> str:
+        p = self._sheet_part.prefix
+        style = f' s="{style_id}"' if style_id else ""
+        if isinstance(value, str):
+            value = value[:32767]
+            if ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+            if len(value) > 1 and value.startswith("="):
+                return f'<{p}c r="{ref}"{style}><{p}f>{_escape(value[1:])}</{p}f></{p}c>'
+            if value in ERROR_CODES:
+                return f'<{p}c r="{ref}"{style} t="e"><{p}v>{value}</{p}v></{p}c>'
+            return self._get_string_cell_xml(ref, value, style)
+        if isinstance(value, bool):
+            return f'<{p}c r="{ref}"{style} t="b"><{p}v>{int(value)}</{p}v></{p}c>'
+        if isinstance(value, NUMERIC_TYPES):
+            number = repr(value) if isinstance(value, float) else str(value)
+            return f'<{p}c r="{ref}"{style}><{p}v>{number}</{p}v></{p}c>'
+        if isinstance(value, (datetime.date, datetime.time, datetime.timedelta)):
+            style_id = self._get_date_style_id(style_id, value)
+            return f'<{p}c r="{ref}" s="{style_id}"><{p}v>{to_excel(value, self._epoch)}</{p}v></{p}c>'
+        if isinstance(value, ArrayFormula):
+            text = value.text[1:] if value.text.startswith("=") else value.text
+            return f'<{p}c r="{ref}"{style}><{p}f t="array" ref="{value.ref}">{_escape(text)}</{p}f></{p}c>'
+        raise ValueError("Cannot convert {0!r} to Excel".format(value))
+
+    def _get_string_cell_xml(self, ref: str, value: str, style: str) -> str:
+        p = self._sheet_part.prefix
+        if self._xlsx_template.shared_strings_part is None:
+            space = ' xml:space="preserve"' if value.strip() != value else ""
+            return f'<{p}c r="{ref}"{style} t="inlineStr"><{p}is><{p}t{space}>{_escape(value)}</{p}t></{p}is></{p}c>'
+
+        idx = self._strings.get(value)
+        if idx is None:
+            idx = self._strings[value] = len(self._strings)
+        self._string_count += 1
+        return f'<{p}c r="{ref}"{style} t="s"><{p}v>{idx}</{p}v></{p}c>'
+
+    def _get_date_style_id(self, style_id: int, value: Any) -> int:
+        """Returns the style id of a date cell, adding a date format to the style of a cell formatted as General."""
+        if self._xlsx_template.is_date_style(style_id):
+            return style_id
+
+        fmt_id = next(fmt_id for time_type, fmt_id in TIME_FORMAT_IDS if isinstance(value, time_type))
+        key = (style_id, fmt_id)
+        date_style_id = self._date_styles.get(key)
+        if date_style_id is None:
+            xf = self._xlsx_template.cell_xfs[style_id]
+            for name, attribute_value in (("numFmtId", fmt_id), ("applyNumberFormat", 1)):
+                xf, count = re.subn(rf'\b{name}="[^"]*"', f'{name}="{attribute_value}"', xf, count=1)
+                if not count:
+                    xf = re.sub(r"^(<(?:\w+:)?xf)\b", rf'\g<1> {name}="{attribute_value}"', xf)
+            self._extra_xfs.append(xf)
+            date_style_id = self._date_styles[key] = len(self._xlsx_template.cell_xfs) + len(self._extra_xfs) - 1
+        return date_style_id
+
+    def _add_merged_range(self, min_col: int, min_row: int, max_col: int, max_row: int) -> None:
+        self._merged_range_refs.append(f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}")
+
+    def _flush_rows(self) -> None:
+        self._rows_file.write("".join(self._rows_buffer).encode("utf-8"))
+        self._rows_buffer.clear()
+
+    def _finish_sheet(self) -> None:
+        self._flush_rows()
+        if self._max_row:
+            dimension = f"A1:{get_column_letter(max(self._max_column, 1))}{self._max_row}"
+        else:
+            dimension = "A1"
+        head, tail = self._sheet_part.render(dimension, self._merged_range_refs)
+        self.template.replace(self._sheet_part.name, [head, self._rows_file, tail])
+
+    def _get_shared_strings_xml(self) -> bytes:
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+            f'<sst xmlns="{SPREADSHEET_NS}" count="{self._string_count}" uniqueCount="{len(self._strings)}">'
+        ]
+        for value in self._strings:
+            space = ' xml:space="preserve"' if value.strip() != value else ""
+            parts.append(f"<si><t{space}>{_escape(value)}</t></si>")
+        parts.append("</sst>")
+        return "".join(parts).encode("utf-8")
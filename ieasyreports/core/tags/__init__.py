@@ -1,2 +1,32 @@
-from .tag import Tag
-from .data_manager import DefaultDataManager
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# the exports are imported on first access (PEP 562), so importing the package doesn't load their dependencies
+_EXPORTS = {
+    "Tag": ".tag",
+    "DefaultDataManager": ".data_manager",
+    "CachePolicy": ".tag_cache",
+    "TagValueCache": ".tag_cache",
+    "TagResolver": ".resolver",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(importlib.import_module(module, __name__), name)
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .tag import Tag
+    from .data_manager import DefaultDataManager
+    from .tag_cache import CachePolicy, TagValueCache
+    from .resolver import TagResolver
@@ -0,0 +1,68 @@
+from typing import Any, Mapping, Optional
+
+from ieasyreports.core.tags.tag import Tag
+from ieasyreports.core.tags.tag_cache import CachePolicy, TagCacheInfo, TagValueCache
+
+
+class TagResolver:
+    """
+    Evaluates tags for a single report. The global context of the report, the context of each tag set by the
+    generator, such as its HEADER / DATA type and its prefetched values, and the values of tags cached per
+    render live in the resolver, so the tags are never modified and can be shared across threads.
+
+    The context a value function is called with is made of the tag's `value_fn_args`, the global context,
+    the tag's context and the arguments of the call, such as the current `obj`, each overriding the previous.
+    """
+    def __init__(
+        self, context: Optional[Mapping[str, Any]] = None,
+        tag_contexts: Optional[Mapping[str, Mapping[str, Any]]] = None
+    ):
+        self.context: dict[str, Any] = dict(context) if context else {}
+        self.tag_contexts: dict[str, dict[str, Any]] = {
+            name: dict(tag_context) for name, tag_context in (tag_contexts or {}).items()
+        }
+        self._contexts: dict[str, dict[str, Any]] = {}
+        self._render_caches: dict[str, TagValueCache] = {}
+
+    def update_context(self, context: Mapping[str, Any]) -> None:
+        self.context.update(context)
+        self._contexts.clear()
+
+    def update_tag_context(self, tag_name: str, context: Mapping[str, Any]) -> None:
+        self.tag_contexts.setdefault(tag_name, {}).update(context)
+        self._contexts.pop(tag_name, None)
+
+    def get_context(self, tag: Tag, **context: Any) -> dict[str, Any]:
+        base = self._contexts.get(tag.name)
+        if base is None:
+            base = self._get_base_context(tag)
+        return {**base, **context}
+
+    def _get_base_context(self, tag: Tag) -> dict[str, Any]:
+        base = self._contexts[tag.name] = {**tag.value_fn_args, **self.context, **self.tag_contexts.get(tag.name, {})}
+        return base
+
+    def get_cache(self, tag: Tag) -> Optional[TagValueCache]:
+        """Returns the cache of the tag's values, which is owned by the resolver for tags cached per render."""
+        if tag.cache_policy != CachePolicy.RENDER:
+            return tag.value_cache
+
+        cache = self._render_caches.get(tag.name)
+        if cache is None:
+            cache = self._render_caches[tag.name] = TagValueCache(max_entries=tag.value_cache.max_entries)
+        return cache
+
+    def get_value(self, tag: Tag, **context: Any) -> Any:
+        base = self._contexts.get(tag.name)
+        if base is None:
+            base = self._get_base_context(tag)
+        cache = tag.value_cache if tag.cache_policy is not CachePolicy.RENDER else self.get_cache(tag)
+        return tag.get_value({**base, **context}, cache)
+
+    def prefetch(self, tag: Tag, objs: list[Any]) -> Any:
+        return tag.prefetch(objs, self.get_context(tag))
+
+    def cache_info(self, tag: Tag) -> Optional[TagCacheInfo]:
+        """Returns the statistics of the tag's cache, for the current render if the tag is cached per render."""
+        cache = self.get_cache(tag)
+        return cache.cache_info() if cache is not None else None
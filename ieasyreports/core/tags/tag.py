@@ -1,31 +1,98 @@
-from typing import Any, Callable, Dict, Optional, Union
+import threading
+import warnings
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Mapping, Optional, Union
 
-from ieasyreports.settings import TagSettings
+from ieasyreports.core.tags.tag_cache import MISSING, CachePolicy, TagCacheInfo, TagValueCache
 from ieasyreports.exceptions import InvalidSpecialParameterException
 
+if TYPE_CHECKING:
+    from ieasyreports.settings import TagSettings
+
 
 class Tag:
+    """
+    Immutable description of a tag. The context a tag is evaluated with, such as the current object or the
+    values prefetched for a report, is passed to `get_value` by the caller, usually through a `TagResolver`,
+    so the same tags can be shared by report generators running in several threads.
+    """
+    __slots__ = (
+        "name", "get_value_fn", "description", "value_fn_args", "custom_number_format_fn", "settings",
+        "data", "header", "general", "column", "vectorized_fn", "cache_policy", "cache_key_args",
+        "prefetch_fn", "value_cache", "_callable_value_fn", "_local"
+    )
+
     def __init__(
         self,
         name: str,
         get_value_fn: Union[Callable, str],
-        tag_settings: TagSettings,
+        tag_settings: "TagSettings",
         description: str = None,
         value_fn_args: Optional[Dict[Any, Any]] = None,
         custom_number_format_fn: Optional[Callable] = None,
         header: bool = False,
-        data: bool = False
+        data: bool = False,
+        column: Optional[str] = None,
+        vectorized_fn: Optional[Callable] = None,
+        cache_policy: Union[CachePolicy, str] = CachePolicy.NONE,
+        cache_key_args: Optional[Iterable[str]] = None,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: int = 1024,
+        prefetch_fn: Optional[Callable] = None
     ):
-        self.name = name
-        self.get_value_fn = get_value_fn
-        self.description = description
-        self.value_fn_args = value_fn_args if value_fn_args else {}
-        self.custom_number_format_fn = custom_number_format_fn
-        self.settings = tag_settings
-        self.context = self.value_fn_args
-        self.data = data
-        self.header = header
-        self.general = not self.data and not self.header
+        cache_policy = CachePolicy(cache_policy)
+        value_cache = None
+        if cache_policy != CachePolicy.NONE:
+            value_cache = TagValueCache(
+                max_entries=cache_max_entries,
+                ttl=cache_ttl if cache_policy == CachePolicy.PROCESS else None
+            )
+
+        self._set_attributes(
+            name=name,
+            get_value_fn=get_value_fn,
+            description=description,
+            value_fn_args=MappingProxyType(dict(value_fn_args) if value_fn_args else {}),
+            custom_number_format_fn=custom_number_format_fn,
+            settings=tag_settings,
+            data=data,
+            header=header,
+            general=not data and not header,
+            column=column,
+            vectorized_fn=vectorized_fn,
+            cache_policy=cache_policy,
+            cache_key_args=tuple(sorted(cache_key_args)) if cache_key_args is not None else None,
+            prefetch_fn=prefetch_fn,
+            value_cache=value_cache,
+            _callable_value_fn=isinstance(get_value_fn, Callable),
+            _local=threading.local()
+        )
+
+    def _set_attributes(self, **attributes: Any) -> None:
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Tag {self.name} is immutable, can't set {name}.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Tag {self.name} is immutable, can't delete {name}.")
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = {name: getattr(self, name) for name in self.__slots__ if name not in ("_local", "value_cache")}
+        state["value_fn_args"] = dict(self.value_fn_args)
+        if self.value_cache is not None:
+            state["value_cache"] = (self.value_cache.max_entries, self.value_cache.ttl)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        value_cache = state.pop("value_cache", None)
+        self._set_attributes(**{
+            **state,
+            "value_fn_args": MappingProxyType(state["value_fn_args"]),
+            "value_cache": TagValueCache(*value_cache) if value_cache is not None else None,
+            "_local": threading.local()
+        })
 
     def __repr__(self):
         return self.name
@@ -36,29 +103,105 @@ class Tag:
     def __hash__(self):
         return hash(self.name)
 
+    @property
+    def context(self) -> Mapping[str, Any]:
+        """
+        Read-only arguments of the value function, updated with the context set through `set_context` in this thread.
+        Use `set_context`, or pass the context to `get_value`, to change them.
+        """
+        return MappingProxyType({**self.value_fn_args, **getattr(self._local, "context", {})})
+
     def set_context(self, context: Dict[str, Any]):
-        """Sets the context for the tag."""
-        self.context.update(context)
+        """
+        Sets the context the tag is evaluated with when no context is passed, for the current thread only.
+        Deprecated, pass the context to `get_value` or evaluate the tag through a `TagResolver` instead.
+        """
+        warnings.warn(
+            "Tag.set_context is deprecated, pass the context to Tag.get_value or use a TagResolver.",
+            DeprecationWarning, stacklevel=2
+        )
+        self._local.context = {**getattr(self._local, "context", {}), **context}
 
-    def replace(self, content):
-        if "special" in self.context:
-            full_tag = self.full_tag(special=self.context.get("special"))
-        else:
-            full_tag = self.full_tag()
+    def replace(self, content, context: Optional[Mapping[str, Any]] = None):
+        if context is None:
+            context = self.context
+        full_tag = self._get_context_full_tag(context)
         if full_tag in content:
-            if self.has_callable_value_fn():
-                replacement_value = self.get_value_fn(**self.context)
-            else:
-                replacement_value = self.get_value_fn
-            if self.has_custom_format():
-                replacement_value = self.custom_number_format_fn(replacement_value)
-
-            content = content.replace(full_tag, str(replacement_value)) if replacement_value is not None else None
+            content = self._substitute(content, full_tag, self.get_value(context))
 
         return content
 
+    def get_value(self, context: Optional[Mapping[str, Any]] = None, cache: Optional[TagValueCache] = None):
+        """
+        Returns the value of the tag, calling the value function with `context` as its keyword arguments.
+        Without a context the tag's `context` is used. `cache` replaces the tag's own cache of values,
+        a `TagResolver` passes the cache of the current render for tags cached per render.
+        """
+        if self.has_callable_value_fn():
+            if context is None:
+                context = self.context
+            key = self.get_cache_key(context)
+            if key is None:
+                return self.get_value_fn(**context)
+
+            cache = cache if cache is not None else self.value_cache
+            value = cache.get(key)
+            if value is MISSING:
+                value = self.get_value_fn(**context)
+                cache.put(key, value)
+            return value
+        return self.get_value_fn
+
+    def prefetch(self, objs: list[Any], context: Optional[Mapping[str, Any]] = None) -> Any:
+        """
+        Calls the prefetch function with all objects of a report at once. The generator passes
+        its result to the value function as the `prefetched` context entry.
+        """
+        return self.prefetch_fn(objs, **(context if context is not None else self.context))
+
+    def has_prefetch_fn(self):
+        return self.prefetch_fn is not None
+
+    def get_cache_key(self, context: Mapping[str, Any]) -> Optional[Hashable]:
+        """
+        Returns the key of the value for the given context, built from the `cache_key_args` entries or from
+        the whole context. Returns `None` if the tag isn't cached or the context entries aren't hashable.
+        """
+        if self.value_cache is None:
+            return None
+
+        names = self.cache_key_args if self.cache_key_args is not None else sorted(context)
+        key = tuple((name, context.get(name)) for name in names)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def clear_render_cache(self):
+        """
+        Drops the values of a tag cached per render which were cached by calling `get_value` directly.
+        The report generators keep the values cached per render in their `TagResolver` instead.
+        """
+        if self.cache_policy == CachePolicy.RENDER:
+            self.value_cache.clear()
+
+    def cache_info(self) -> Optional[TagCacheInfo]:
+        return self.value_cache.cache_info() if self.value_cache is not None else None
+
+    def _substitute(self, content, full_tag, value):
+        if self.has_custom_format():
+            value = self.custom_number_format_fn(value)
+
+        return content.replace(full_tag, str(value)) if value is not None else None
+
+    def _get_context_full_tag(self, context: Mapping[str, Any]):
+        if "special" in context:
+            return self.full_tag(special=context.get("special"))
+        return self.full_tag()
+
     def has_callable_value_fn(self):
-        return isinstance(self.get_value_fn, Callable)
+        return self._callable_value_fn
 
     def has_custom_format(self):
         return self.custom_number_format_fn is not None
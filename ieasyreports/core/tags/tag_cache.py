@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Hashable, NamedTuple, Optional
+
+
+class CachePolicy(str, Enum):
+    """How long the values returned by a tag's value function are reused."""
+    NONE = "none"
+    RENDER = "render"
+    PROCESS = "process"
+
+
+class TagCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    max_entries: int
+    entries: int
+
+
+MISSING = object()
+
+
+class TagValueCache:
+    """
+    Thread-safe LRU cache of tag values, keyed by the context the value function is called with.
+
+    Entries older than `ttl` seconds are treated as missing. Without a `ttl` the entries
+    stay in the cache until they are evicted or the cache is cleared.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the cached value, or `MISSING` if there is none."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def cache_info(self) -> TagCacheInfo:
+        with self._lock:
+            return TagCacheInfo(self.hits, self.misses, self.evictions, self.max_entries, len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -45,3 +45,15 @@ class InvalidSettingsException(Exception):
     """
     Raised when an invalid type is passed for the custom settings argument to the report generator class.
     """
+
+
+class UnsupportedTemplateException(Exception):
+    """
+    Raised when a template uses features the selected report generator can't render.
+    """
+
+
+class ReportCacheException(Exception):
+    """
+    Raised when the data of a report can't be fingerprinted for the report cache.
+    """
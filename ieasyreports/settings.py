@@ -1,13 +1,12 @@
 from typing import Any, Callable
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from importlib.resources import path
+from importlib.resources import files
 
 from pydantic import Field, ImportString
 
 
 def get_templates_directory_path() -> str:
-    with path('ieasyreports', 'templates') as p:
-        return str(p)
+    return str(files('ieasyreports').joinpath('templates'))
 
 
 class ReportGeneratorSettings(BaseSettings):
@@ -23,8 +22,10 @@ class ReportGeneratorSettings(BaseSettings):
         'ieasyreports.core.tags.DefaultDataManager'
     template_generator_class:  ImportString[Callable[[Any], Any]] = \
         'ieasyreports.core.report_generator.DefaultReportGenerator'
-    templates_directory_path: str = Field(get_templates_directory_path())
+    templates_directory_path: str = Field(default_factory=get_templates_directory_path)
     report_output_path: str = Field('reports')
+    template_cache_max_entries: int = Field(64)
+    template_cache_max_bytes: int = Field(64 * 1024 * 1024)
 
 
 class TagSettings(BaseSettings):
@@ -38,5 +39,6 @@ class TagSettings(BaseSettings):
     header_tag: str = Field('HEADER')
     data_tag: str = Field('DATA')
     split_symbol: str = Field('.')
+    table_symbol: str = Field(':')
     tag_start_symbol: str = Field('{{')
     tag_end_symbol: str = Field('}}')
@@ -0,0 +1,1002 @@
+#!/usr/bin/env python
+
+"""Tests for the report generators of `ieasyreports`."""
+
+import asyncio
+import datetime
+import functools
+import logging
+import mmap
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import openpyxl
+import pytest
+from openpyxl.comments import Comment
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Border, Font, PatternFill, Side
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.datavalidation import DataValidation
+
+import ieasyreports.core.report_generator as report_generator_package
+import ieasyreports.core.tags as tags_package
+from ieasyreports.core.report_generator import (
+    AsyncReportGenerator, CompiledTemplate, DefaultReportGenerator, LoggingInstrumentation, ReportCache,
+    ReportInstrumentation, ReportJob, ReportStats, SpanInstrumentation, StreamingReportGenerator, TemplateCache,
+    TemplateStore, XmlReportGenerator, generate_reports, get_default_template_cache, scan_template_sheets,
+    scan_template_tags
+)
+from ieasyreports.core.report_generator import template_cache as template_cache_module
+from ieasyreports.core.report_generator.compiled_template import TagPosition
+from ieasyreports.core.report_generator.merged_range_index import MergedRangeIndex
+from ieasyreports.core.report_generator.template_cache import TemplateCacheInfo
+from ieasyreports.core.tags import Tag
+from ieasyreports.exceptions import (
+    TemplateNotFoundException, TemplateNotValidatedException, UnsupportedTemplateException
+)
+from ieasyreports.settings import TagSettings
+
+GENERATORS = [DefaultReportGenerator, StreamingReportGenerator, XmlReportGenerator]
+
+
+class Station:
+    def __init__(self, idx):
+        self.code = f"S{idx:03d}"
+        self.name = f"Station {idx}"
+        self.discharge = idx * 1.5
+        self.region = f"R{idx % 2}"
+
+
+@pytest.fixture
+def tag_settings():
+    return TagSettings()
+
+
+@pytest.fixture
+def templates_directory(tmp_path):
+    """A template with a HEADER / DATA table between merged cells, formulas and general tags."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "Report {{TITLE}}"
+    ws.merge_cells("A1:E1")
+    ws["A1"].font = Font(bold=True)
+    ws["A2"] = "Station"
+    ws["D2"] = "Q"
+    ws["A3"] = "{{HEADER.REGION}}"
+    ws.merge_cells("A3:E3")
+    ws["A3"].fill = PatternFill("solid", fgColor="FFFF00")
+    ws["A4"] = "{{DATA.CODE}}"
+    ws["B4"] = "{{DATA.NAME}}"
+    ws.merge_cells("B4:C4")
+    ws["D4"] = "{{DATA.Q}}"
+    ws["D4"].number_format = "0.00"
+    ws["E4"] = "=D4*2"
+    for column in "ABCDE":
+        ws[f"{column}4"].border = Border(left=Side(style="thin"))
+    ws.row_dimensions[4].height = 22
+    ws["A6"] = "Total"
+    ws["D6"] = "=SUM(D4:D4)"
+    ws.merge_cells("A6:C6")
+    ws["A7"] = "Author: {{AUTHOR}}"
+    ws.merge_cells("A7:B8")
+    ws.row_dimensions[7].height = 30
+    wb.save(tmp_path / "stations.xlsx")
+    return tmp_path
+
+
+@pytest.fixture
+def tags(tag_settings):
+    return [
+        Tag("TITLE", "Discharge", tag_settings),
+        Tag("AUTHOR", "me", tag_settings),
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+        Tag("NAME", lambda obj, **kwargs: obj.name, tag_settings, data=True),
+        Tag("Q", lambda obj, **kwargs: obj.discharge, tag_settings, data=True),
+    ]
+
+
+def make_generator(generator_class, tags, templates_directory, tag_settings, **kwargs):
+    kwargs.setdefault("requires_header", True)
+    generator = generator_class(
+        tags=tags, template="stations.xlsx", templates_directory_path=str(templates_directory),
+        reports_directory_path=str(templates_directory), tag_settings=tag_settings, **kwargs
+    )
+    generator.validate()
+    return generator
+
+
+def read_report(stream):
+    """Returns the values, number formats, merged ranges and row heights of the first sheet of a report."""
+    ws = openpyxl.load_workbook(stream).active
+    return {
+        "values": {
+            cell.coordinate: cell.value for row in ws.iter_rows() for cell in row if cell.value is not None
+        },
+        "number_formats": {
+            cell.coordinate: cell.number_format
+            for row in ws.iter_rows() for cell in row if cell.number_format != "General"
+        },
+        "merged": sorted(str(merged_range) for merged_range in ws.merged_cells.ranges),
+        "heights": {row: dimension.height for row, dimension in ws.row_dimensions.items() if dimension.height},
+    }
+
+
+def test_generator_renders_the_template_many_times(tags, templates_directory, tag_settings):
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+    # the template is compiled by `validate`, rendering doesn't read the file again
+    os.remove(templates_directory / "stations.xlsx")
+
+    first = read_report(generator.generate_report(list_objects=[Station(0), Station(2)], as_stream=True))
+    second = read_report(generator.generate_report(list_objects=[Station(1)], as_stream=True))
+    third = read_report(generator.generate_report(list_objects=[Station(0), Station(2)], as_stream=True))
+
+    assert first == third
+    assert second["values"] == {
+        "A1": "Report Discharge", "A2": "Station", "D2": "Q", "A3": "R1", "A4": "S001", "B4": "Station 1",
+        "D4": "1.5", "E4": "=D4*2", "A6": "Total", "D6": "=SUM(D4:D4)", "A7": "Author: me"
+    }
+    assert second["merged"] == ["A1:E1", "A3:E3", "A6:C6", "A7:B8", "B4:C4"]
+
+
+def test_compiled_template_copies_are_independent(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["F2"].comment = Comment("note", "me")
+    wb.active["F3"].hyperlink = "https://example.com"
+    wb.save(path)
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+    compiled_template = generator.compiled_template
+
+    ws = compiled_template.new_workbook().active
+    ws["A1"].value = "changed"
+    ws["A1"].font = Font(italic=True)
+
+    original = compiled_template.workbook.active
+    assert original["A1"].value == "Report {{TITLE}}"
+    assert not original["A1"].font.italic
+    assert ws["A2"].parent is ws
+    assert ws["F2"].comment.parent is ws["F2"]
+    assert ws["F3"].hyperlink.target == "https://example.com"
+    assert all(merged_range.ws is ws for merged_range in ws.merged_cells.ranges)
+
+
+def test_compiling_doesnt_create_cells(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["AD20"] = "far away"
+    wb.save(path)
+    cells = set(openpyxl.load_workbook(path).active._cells)
+
+    generator = make_generator(
+        DefaultReportGenerator, tags, templates_directory, tag_settings, template_cache=TemplateCache()
+    )
+
+    assert set(generator.compiled_template.workbook.active._cells) == cells
+    assert generator.compiled_template.sheets[0].max_column == 30
+
+
+def test_template_cache_evicts_least_recently_used_templates():
+    template_cache = TemplateCache(max_entries=2, max_bytes=100)
+    first, second, third = CompiledTemplate(None), CompiledTemplate(None), CompiledTemplate(None)
+
+    template_cache.put("first", first, 10)
+    template_cache.put("second", second, 10)
+    assert template_cache.get("first") is first
+    template_cache.put("third", third, 10)
+
+    assert template_cache.get("second") is None
+    assert template_cache.get("first") is first
+    template_cache.put("second", second, 85)
+    assert template_cache.get("third") is None
+    template_cache.put("large", third, 101)
+    assert template_cache.get("large") is None
+    assert template_cache.cache_info() == TemplateCacheInfo(
+        hits=2, misses=3, evictions=2, max_entries=2, max_bytes=100, entries=2, bytes=95
+    )
+
+
+def test_template_cache_is_invalidated_by_modified_templates(tags, templates_directory, tag_settings):
+    template_cache = TemplateCache()
+    compiled_template = make_generator(
+        DefaultReportGenerator, tags, templates_directory, tag_settings, template_cache=template_cache
+    ).compiled_template
+    generator = make_generator(
+        DefaultReportGenerator, tags, templates_directory, tag_settings, template_cache=template_cache
+    )
+    assert generator.compiled_template is compiled_template
+
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["A2"] = "Code"
+    wb.save(path)
+    os.utime(path, ns=(1, 1))
+    generator = make_generator(
+        DefaultReportGenerator, tags, templates_directory, tag_settings, template_cache=template_cache
+    )
+
+    assert generator.compiled_template is not compiled_template
+    assert read_report(generator.generate_report(list_objects=[Station(1)], as_stream=True))["values"]["A2"] == "Code"
+    assert template_cache.cache_info().misses == 2
+
+
+def test_default_template_cache_is_configured_by_the_settings(monkeypatch):
+    monkeypatch.setenv("IEASYREPORTS_TEMPLATE_CACHE_MAX_ENTRIES", "3")
+    monkeypatch.setenv("IEASYREPORTS_TEMPLATE_CACHE_MAX_BYTES", "1024")
+    monkeypatch.setattr(template_cache_module, "_default_template_cache", None)
+
+    template_cache = get_default_template_cache()
+
+    assert (template_cache.max_entries, template_cache.max_bytes) == (3, 1024)
+    assert get_default_template_cache() is template_cache
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_empty_list_removes_header_and_data_rows(generator_class, tags, templates_directory, tag_settings):
+    generator = make_generator(generator_class, tags, templates_directory, tag_settings)
+    report = read_report(generator.generate_report(list_objects=[], as_stream=True))
+
+    assert report["values"] == {
+        "A1": "Report Discharge", "A2": "Station", "D2": "Q", "A4": "Total", "D4": "=SUM(#REF!)", "A5": "Author: me"
+    }
+    assert report["merged"] == ["A1:E1", "A4:C4", "A5:B6"]
+    assert report["heights"] == {5: 30}
+
+
+def test_rows_are_inserted_for_every_header_group(tags, templates_directory, tag_settings):
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+    report = read_report(
+        generator.generate_report(list_objects=[Station(0), Station(2), Station(1)], as_stream=True)
+    )
+
+    assert report["values"] == {
+        "A1": "Report Discharge", "A2": "Station", "D2": "Q",
+        "A3": "R0",
+        "A4": "S000", "B4": "Station 0", "D4": "0.0", "E4": "=D4*2",
+        "A5": "S002", "B5": "Station 2", "D5": "3.0", "E5": "=D5*2",
+        "A6": "R1",
+        "A7": "S001", "B7": "Station 1", "D7": "1.5", "E7": "=D7*2",
+        "A9": "Total", "D9": "=SUM(D4:D4)",
+        "A10": "Author: me",
+    }
+    assert report["merged"] == ["A10:B11", "A1:E1", "A3:E3", "A6:E6", "A9:C9", "B4:C4", "B5:C5", "B7:C7"]
+    assert report["heights"][5] == report["heights"][7] == 22
+    assert report["heights"][10] == 30
+
+
+def test_merged_range_index_finds_ranges_by_top_left_cell_and_rows():
+    title, region, name, author = (CellRange(ref) for ref in ("A1:E1", "A3:E3", "B4:C4", "A7:B8"))
+    index = MergedRangeIndex([name, author, title, region])
+
+    assert len(index) == 4
+    assert index.starting_at(4, 2) is name
+    assert index.starting_at(4, 3) is None
+    assert index.intersecting_rows_from(4) == [name, author]
+    assert index.intersecting_rows_from(9) == []
+    assert index.contains(CellRange("A8:B8"))
+    assert not index.contains(CellRange("A8:C8"))
+
+    moved = CellRange("B4:D5")
+    index.add(moved)
+    index.remove(name)
+    assert index.starting_at(4, 2) is moved
+    assert index.intersecting_rows_from(5) == [moved, author]
+    index.remove(moved)
+    assert len(index) == 3 and index.intersecting_rows_from(4) == [author]
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+@pytest.mark.parametrize("library", ["pandas", "pyarrow"])
+def test_columnar_data_is_rendered_like_objects(generator_class, library, tags, templates_directory, tag_settings):
+    pandas = pytest.importorskip("pandas")
+    stations = [Station(idx) for idx in (0, 2, 1)]
+    expected = read_report(
+        make_generator(generator_class, tags, templates_directory, tag_settings)
+        .generate_report(list_objects=stations, as_stream=True)
+    )
+    table = pandas.DataFrame({
+        "region": [station.region for station in stations],
+        "code": [station.code for station in stations],
+        "name": [station.name for station in stations],
+        "discharge": [station.discharge for station in stations],
+    })
+    if library == "pyarrow":
+        table = pytest.importorskip("pyarrow").Table.from_pandas(table)
+    calls = []
+
+    def get_discharges(table, **kwargs):
+        calls.append(len(table))
+        return [value for value in table["discharge"].to_pylist()] if library == "pyarrow" else table["discharge"]
+
+    columnar_tags = [
+        Tag("TITLE", "Discharge", tag_settings),
+        Tag("AUTHOR", "me", tag_settings),
+        Tag("REGION", None, tag_settings, header=True, column="region"),
+        Tag("CODE", None, tag_settings, data=True, column="code"),
+        # tags without a column or a vectorized function are evaluated for every row
+        Tag("NAME", lambda obj, **kwargs: obj.name, tag_settings, data=True),
+        Tag("Q", None, tag_settings, data=True, vectorized_fn=get_discharges),
+    ]
+    generator = make_generator(generator_class, columnar_tags, templates_directory, tag_settings)
+
+    assert read_report(generator.generate_report(list_objects=table, as_stream=True)) == expected
+    assert calls == [3]
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_cells_with_several_tags_are_rendered(generator_class, tag_settings, tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "{{TITLE}} by {{AUTHOR}}, {{TITLE}}"
+    ws["A2"] = "{{HEADER.REGION}}"
+    ws["A3"] = "{{DATA.CODE}}: {{DATA.NAME}} ({{DATA.CODE}})"
+    ws["B3"] = "{{DATA.CODE}}"
+    wb.save(tmp_path / "stations.xlsx")
+    tags = [
+        Tag("TITLE", "Discharge", tag_settings, custom_number_format_fn=str.upper),
+        Tag("AUTHOR", r"\1 {{TITLE}}", tag_settings),
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+        Tag("NAME", lambda obj, **kwargs: obj.name, tag_settings, data=True),
+    ]
+    generator = make_generator(generator_class, tags, tmp_path, tag_settings)
+
+    report = read_report(generator.generate_report(list_objects=[Station(1)], as_stream=True))
+
+    assert report["values"] == {
+        "A1": r"DISCHARGE by \1 {{TITLE}}, DISCHARGE",
+        "A2": "R1",
+        "A3": "S001: Station 1 (S001)",
+        "B3": "S001",
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_reports_returns_results_and_errors_in_order(workers, tags, templates_directory, tag_settings):
+    jobs = [
+        ReportJob("stations.xlsx", list_objects=[Station(1)], as_stream=True),
+        ReportJob("missing.xlsx", list_objects=[Station(1)]),
+        ReportJob("stations.xlsx", list_objects=[Station(0), Station(2)], output_filename="two.xlsx"),
+        ReportJob("stations.xlsx", list_objects=[Station(1)], context={"fail": True}),
+    ]
+
+    def get_code(obj, **kwargs):
+        if kwargs.get("fail"):
+            raise ValueError("no code")
+        return obj.code
+
+    tags = [tag for tag in tags if tag.name != "CODE"] + [Tag("CODE", get_code, tag_settings, data=True)]
+    results = generate_reports(
+        jobs, tags, str(templates_directory), str(templates_directory / "reports"), tag_settings,
+        requires_header=True, workers=workers, mp_context=multiprocessing.get_context("fork")
+    )
+
+    assert [result.job for result in results] == jobs
+    assert [result.ok for result in results] == [True, False, True, False]
+    assert read_report(results[0].output)["values"]["A4"] == "S001"
+    assert isinstance(results[1].error, TemplateNotFoundException)
+    assert results[2].output == str(templates_directory / "reports" / "two.xlsx")
+    assert read_report(results[2].output)["values"]["A5"] == "S002"
+    assert isinstance(results[3].error, ValueError)
+
+
+def test_async_generator_resolves_tag_values_concurrently(tags, templates_directory, tag_settings):
+    running, peak = 0, 0
+
+    async def get_name(obj, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return obj.name
+
+    async_tags = [tag for tag in tags if tag.name != "NAME"]
+    async_tags.append(Tag("NAME", get_name, tag_settings, data=True))
+    stations = [Station(idx) for idx in range(6)]
+    generator = make_generator(AsyncReportGenerator, async_tags, templates_directory, tag_settings, max_concurrency=3)
+
+    report = read_report(asyncio.run(generator.generate_report(list_objects=stations, as_stream=True)))
+
+    expected = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+    assert report == read_report(expected.generate_report(list_objects=stations, as_stream=True))
+    assert peak == 3
+
+
+@pytest.mark.parametrize("cache_policy, calls", [("none", 6), ("render", 4), ("process", 2)])
+def test_tag_values_are_cached_by_policy(cache_policy, calls, tags, templates_directory, tag_settings):
+    regions = []
+
+    def get_region(obj, **kwargs):
+        regions.append(obj.region)
+        return obj.region
+
+    tags = [tag for tag in tags if tag.name != "REGION"] + [
+        Tag("REGION", get_region, tag_settings, header=True, cache_policy=cache_policy, cache_key_args=["obj"])
+    ]
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+    station = Station(0)
+    stations = [station, station, Station(1)]
+
+    first = read_report(generator.generate_report(list_objects=stations, as_stream=True))
+    second = read_report(generator.generate_report(list_objects=stations, as_stream=True))
+
+    assert first == second
+    assert len(regions) == calls
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_prefetch_functions_receive_all_objects(generator_class, tags, templates_directory, tag_settings):
+    batches = []
+
+    def load_names(objs, **kwargs):
+        batches.append([obj.code for obj in objs])
+        return {obj.code: f"{obj.name} ({kwargs['unit']})" for obj in objs}
+
+    tags = [tag for tag in tags if tag.name != "NAME"] + [
+        Tag(
+            "NAME", lambda obj, prefetched, **kwargs: prefetched[obj.code], tag_settings, data=True,
+            value_fn_args={"unit": "m3/s"}, prefetch_fn=load_names
+        )
+    ]
+    generator = make_generator(generator_class, tags, templates_directory, tag_settings)
+
+    report = read_report(generator.generate_report(list_objects=[Station(0), Station(1), Station(2)], as_stream=True))
+
+    assert [report["values"][f"B{row}"] for row in (4, 5, 7)] == [
+        "Station 0 (m3/s)", "Station 2 (m3/s)", "Station 1 (m3/s)"
+    ]
+    assert batches == [["S000", "S001", "S002"]]
+
+
+def test_validate_only_scans_the_template(tags, templates_directory, tag_settings):
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings, validate_only=True)
+
+    assert generator.validated is True
+    assert generator.compiled_template is None
+    with pytest.raises(TemplateNotValidatedException, match="only scanned"):
+        generator.generate_report(list_objects=[Station(1)], as_stream=True)
+
+
+def test_scan_template_tags_finds_the_tags_without_openpyxl(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["F2"] = "{{HEADER:meteo.REGION}} {{UNIT}}"
+    wb.create_sheet("Meteo")["B2"] = "{{DATA.CODE}}"
+    wb.save(path)
+
+    positions = scan_template_tags(str(path), tag_settings)
+
+    assert positions == [
+        TagPosition("TITLE", None, 1, 1),
+        TagPosition("REGION", "HEADER", 2, 6, "meteo"), TagPosition("UNIT", None, 2, 6),
+        TagPosition("REGION", "HEADER", 3, 1), TagPosition("CODE", "DATA", 4, 1), TagPosition("NAME", "DATA", 4, 2),
+        TagPosition("Q", "DATA", 4, 4), TagPosition("AUTHOR", None, 7, 1),
+    ]
+    with open(path, "rb") as f:
+        assert scan_template_sheets(f, tag_settings) == [positions, [TagPosition("CODE", "DATA", 2, 2)]]
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_every_worksheet_is_rendered(generator_class, tag_settings, tmp_path):
+    wb = openpyxl.Workbook()
+    discharge = wb.active
+    discharge.title = "Discharge"
+    for ws in (discharge, wb.create_sheet("Meteo")):
+        ws["A1"] = "{{TITLE}}"
+        ws["A2"] = "{{HEADER.REGION}}"
+        ws["A3"] = "{{DATA.CODE}}"
+        ws["A4"] = "end"
+    wb.save(tmp_path / "stations.xlsx")
+    tags = [
+        Tag("TITLE", lambda **kwargs: kwargs["title"], tag_settings),
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+    ]
+    generator = make_generator(generator_class, tags, tmp_path, tag_settings)
+
+    stream = generator.generate_report(
+        list_objects=[Station(0), Station(1)], data_sources={"Meteo": [Station(3)]}, context={"title": "Report"},
+        as_stream=True
+    )
+    wb = openpyxl.load_workbook(stream)
+
+    assert [[cell.value for cell in ws["A"]] for ws in wb.worksheets] == [
+        ["Report", "R0", "S000", "R1", "S001", "end"],
+        ["Report", "R1", "S003", "end"],
+    ]
+
+
+def test_async_generator_renders_every_worksheet(tag_settings, tmp_path):
+    wb = openpyxl.Workbook()
+    discharge = wb.active
+    discharge.title = "Discharge"
+    for ws in (discharge, wb.create_sheet("Meteo")):
+        ws["A1"] = "{{HEADER.REGION}}"
+        ws["A2"] = "{{DATA.NAME}}"
+    wb.save(tmp_path / "stations.xlsx")
+    batches = []
+
+    async def load_names(objs, **kwargs):
+        batches.append(sorted(obj.code for obj in objs))
+        return {obj.code: obj.name for obj in objs}
+
+    tags = [
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("NAME", lambda obj, prefetched, **kwargs: prefetched[obj.code], tag_settings, data=True,
+            prefetch_fn=load_names),
+    ]
+    generator = make_generator(AsyncReportGenerator, tags, tmp_path, tag_settings)
+
+    stream = asyncio.run(generator.generate_report(
+        list_objects=[Station(0), Station(1)], data_sources={"Meteo": [Station(3)]}, as_stream=True
+    ))
+    wb = openpyxl.load_workbook(stream)
+
+    assert [[cell.value for cell in ws["A"]] for ws in wb.worksheets] == [
+        ["R0", "Station 0", "R1", "Station 1"],
+        ["R1", "Station 3"],
+    ]
+    # the prefetch function is called once, with the objects of all worksheets
+    assert batches == [["S000", "S001", "S003"]]
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_several_tables_per_worksheet(generator_class, tag_settings, tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "{{HEADER:a.REGION}}"
+    ws["A2"] = "{{DATA:a.CODE}}"
+    ws["A3"] = "between"
+    ws.merge_cells("A3:B3")
+    ws["A4"] = "{{HEADER:b.REGION}}"
+    ws["A5"] = "{{DATA:b.CODE}}"
+    ws["A6"] = "=A3&A7"
+    ws["A7"] = "end"
+    wb.save(tmp_path / "stations.xlsx")
+    tags = [
+        Tag("REGION", lambda obj, **kwargs: obj.region, tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+    ]
+    generator = make_generator(generator_class, tags, tmp_path, tag_settings)
+
+    report = read_report(generator.generate_report(
+        data_sources={"a": [Station(0), Station(2)], "b": [Station(1), Station(3), Station(5)]}, as_stream=True
+    ))
+
+    assert report["values"] == {
+        "A1": "R0", "A2": "S000", "A3": "S002", "A4": "between",
+        "A5": "R1", "A6": "S001", "A7": "S003", "A8": "S005", "A9": "=A4&A10", "A10": "end",
+    }
+    assert report["merged"] == ["A4:B4"]
+
+    report = read_report(generator.generate_report(data_sources={"a": [], "b": [Station(1)]}, as_stream=True))
+
+    assert report["values"] == {"A1": "between", "A2": "R1", "A3": "S001", "A4": "=A1&A5", "A5": "end"}
+    assert report["merged"] == ["A1:B1"]
+
+
+class RecordingInstrumentation(ReportInstrumentation):
+    def __init__(self):
+        self.phases = []
+        self.reports = []
+
+    def phase_finished(self, phase, template, duration):
+        self.phases.append(phase)
+
+    def report_finished(self, stats):
+        self.reports.append(stats)
+
+
+class Span:
+    def __init__(self, spans, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.ended = False
+        spans.append(self)
+
+    def end(self, end_time=None):
+        self.ended = True
+
+
+class Tracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes=None, start_time=None):
+        return Span(self.spans, name, attributes)
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_instrumentation_receives_the_report_stats(generator_class, tags, templates_directory, tag_settings):
+    instrumentation = RecordingInstrumentation()
+    generator = make_generator(
+        generator_class, tags, templates_directory, tag_settings, instrumentation=instrumentation
+    )
+
+    stream = generator.generate_report(list_objects=[Station(0), Station(2), Station(1)], as_stream=True)
+
+    stats, = instrumentation.reports
+    assert (stats.template, stats.generator) == ("stations.xlsx", generator_class.__name__)
+    assert stats.error is None and not stats.cached
+    assert (stats.rows, stats.merges) == (11, 8)
+    assert stats.cells > 0
+    assert stats.bytes_written == len(stream.getvalue())
+    assert stats.tag_calls == {"TITLE": 1, "AUTHOR": 1, "REGION": 3, "CODE": 3, "NAME": 3, "Q": 3}
+    assert {"validation", "grouping", "serialization"} <= set(instrumentation.phases)
+    assert set(stats.phases) <= set(instrumentation.phases)
+
+
+def test_logging_and_span_instrumentation(tags, templates_directory, tag_settings, caplog):
+    tracer = Tracer()
+    logging_instrumentation = LoggingInstrumentation(slowest_tags=1)
+    span_instrumentation = SpanInstrumentation(tracer)
+    stats = ReportStats(
+        template="stations.xlsx", generator="DefaultReportGenerator", duration=0.5, phases={"load": 0.25},
+        rows=3, cells=12, merges=2, bytes_written=1024
+    )
+    stats.add_tag("CODE", 0.1, calls=3)
+    stats.add_tag("NAME", 0.2)
+
+    with caplog.at_level(logging.DEBUG, logger="ieasyreports"):
+        logging_instrumentation.phase_finished("load", "stations.xlsx", 0.25)
+        logging_instrumentation.report_finished(stats)
+        stats.error = ValueError("no code")
+        logging_instrumentation.report_finished(stats)
+    span_instrumentation.phase_finished("load", "stations.xlsx", 0.25)
+    span_instrumentation.report_finished(stats)
+
+    debug, generated, failed = caplog.records
+    assert debug.levelno == logging.DEBUG and "load took 0.2500s" in debug.getMessage()
+    assert generated.levelno == logging.INFO and failed.levelno == logging.ERROR
+    assert generated.getMessage() == (
+        "stations.xlsx report generated in 0.5000s (load=0.2500s); rows=3 cells=12 merges=2 bytes=1024; "
+        "slowest tags: NAME=0.2000s"
+    )
+    assert "report failed" in failed.getMessage()
+    phase, report = tracer.spans
+    assert (phase.name, report.name) == ("ieasyreports.load", "ieasyreports.generate_report")
+    assert report.attributes["ieasyreports.rows"] == 3
+    assert report.attributes["ieasyreports.tag.CODE.calls"] == 3
+    assert phase.ended and report.ended
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_formula_references_follow_the_rendered_rows(generator_class, tag_settings, tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "{{HEADER.REGION}}"
+    ws["A2"] = "{{DATA.CODE}}"
+    ws["B2"] = "=LOG10(C2)"
+    ws["D2"] = '=IF(C2>0,"C2",Other!C2)'
+    ws["A4"] = "=SUM($B$2:B2)+LOG10($C$5)+Other!C5"
+    ws["C5"] = 10
+    wb.create_sheet("Other")
+    wb.save(tmp_path / "stations.xlsx")
+    tags = [
+        Tag("REGION", "R", tag_settings, header=True),
+        Tag("CODE", lambda obj, **kwargs: obj.code, tag_settings, data=True),
+    ]
+    generator = make_generator(generator_class, tags, tmp_path, tag_settings)
+
+    report = read_report(generator.generate_report(list_objects=[Station(0), Station(1)], as_stream=True))
+
+    assert report["values"] == {
+        "A1": "R",
+        "A2": "S000", "B2": "=LOG10(C2)", "D2": '=IF(C2>0,"C2",Other!C2)',
+        "A3": "S001", "B3": "=LOG10(C3)", "D3": '=IF(C3>0,"C2",Other!C2)',
+        "A5": "=SUM($B$2:B2)+LOG10($C$6)+Other!C5",
+        "C6": 10,
+    }
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_references_from_other_worksheets_follow_the_rendered_rows(
+    generator_class, tags, templates_directory, tag_settings
+):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active.title = "Q"
+    wb.active["F6"] = "=Summary!A1"
+    summary = wb.create_sheet("Summary", 0)
+    summary["A1"] = "=Q!D6"
+    summary["A2"] = "=SUM('Q'!D4:D4)+Q!A7"
+    wb.save(path)
+    generator = make_generator(generator_class, tags, templates_directory, tag_settings, requires_header=False)
+
+    def render(stations):
+        wb = openpyxl.load_workbook(generator.generate_report(list_objects=stations, as_stream=True))
+        return [wb["Summary"]["A1"].value, wb["Summary"]["A2"].value, wb["Q"]["F9"].value]
+
+    assert render([Station(0), Station(2), Station(1)]) == ["=Q!D9", "=SUM('Q'!D4:D4)+Q!A10", "=Summary!A1"]
+    assert render([])[:2] == ["=Q!D4", "=SUM('Q'!#REF!)+Q!A5"]
+
+
+def test_row_templates_are_stamped_onto_inserted_rows(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["AD4"] = "{{DATA.CODE}}"
+    wb.active["AD4"].number_format = "@"
+    wb.save(path)
+    generator = make_generator(DefaultReportGenerator, tags, templates_directory, tag_settings)
+
+    stream = generator.generate_report(list_objects=[Station(0), Station(2), Station(1)], as_stream=True)
+    ws = openpyxl.load_workbook(stream).active
+
+    for row in (4, 5, 7):
+        assert [ws.cell(row, column).border.left.style for column in (1, 2, 4, 5)] == ["thin"] * 4
+        assert ws.cell(row, 4).number_format == "0.00"
+        assert ws.cell(row, 30).value == ws.cell(row, 1).value
+        assert ws.cell(row, 30).number_format == "@"
+    for row in (3, 6):
+        assert ws.cell(row, 1).fill.fgColor.rgb == "00FFFF00"
+    assert ws.cell(8, 1).border.left.style is None
+
+
+def test_report_cache_key_includes_tag_arguments_and_format(tags, templates_directory, tag_settings):
+    report_cache = ReportCache()
+
+    def render(**title_kwargs):
+        title = Tag("TITLE", lambda **kwargs: kwargs["unit"], tag_settings, **title_kwargs)
+        generator = make_generator(
+            DefaultReportGenerator, [title, *tags[1:]], templates_directory, tag_settings, report_cache=report_cache
+        )
+        return read_report(generator.generate_report(list_objects=[], as_stream=True))["values"]["A1"]
+
+    assert render(value_fn_args={"unit": "m3/s"}) == "Report m3/s"
+    assert render(value_fn_args={"unit": "l/s"}) == "Report l/s"
+    assert render(value_fn_args={"unit": "l/s"}, custom_number_format_fn=str.upper) == "Report L/S"
+    assert report_cache.cache_info().hits == 0
+    assert render(value_fn_args={"unit": "l/s"}) == "Report l/s"
+    assert report_cache.cache_info().hits == 1
+
+
+def test_report_cache_key_includes_the_state_of_tag_functions(tags, templates_directory, tag_settings):
+    report_cache = ReportCache()
+
+    def render(get_value_fn):
+        title = Tag("TITLE", get_value_fn, tag_settings)
+        generator = make_generator(
+            DefaultReportGenerator, [title, *tags[1:]], templates_directory, tag_settings, report_cache=report_cache
+        )
+        return read_report(generator.generate_report(list_objects=[], as_stream=True))["values"]["A1"]
+
+    def unit_fn(unit):
+        return lambda **kwargs: unit
+
+    def get_unit(scale, unit="m3/s", **kwargs):
+        return f"{scale} {unit}"
+
+    assert render(unit_fn("m3/s")) == "Report m3/s"
+    assert render(unit_fn("l/s")) == "Report l/s"
+    assert render(functools.partial(get_unit, 1)) == "Report 1 m3/s"
+    assert render(functools.partial(get_unit, 1000, unit="l/s")) == "Report 1000 l/s"
+    assert report_cache.cache_info().hits == 0
+    assert render(unit_fn("l/s")) == "Report l/s"
+    assert report_cache.cache_info().hits == 1
+
+
+def test_report_cache_skipped_for_objects_without_fingerprint(tags, templates_directory, tag_settings):
+    report_cache = ReportCache()
+    generator = make_generator(
+        DefaultReportGenerator, tags, templates_directory, tag_settings, report_cache=report_cache
+    )
+    station = Station(1)
+    station.parent = station
+
+    report = read_report(generator.generate_report(list_objects=[station], as_stream=True))
+
+    assert report["values"]["A4"] == "S001"
+    assert len(report_cache) == 0
+
+
+def test_report_cache_is_invalidated_by_data_context_and_template(tags, templates_directory, tag_settings):
+    report_cache = ReportCache()
+
+    def render(stations, context=None):
+        generator = make_generator(
+            DefaultReportGenerator, tags, templates_directory, tag_settings, report_cache=report_cache
+        )
+        return read_report(generator.generate_report(list_objects=stations, context=context, as_stream=True))
+
+    first = render([Station(1)])
+    assert render([Station(1)]) == first
+    assert report_cache.cache_info().hits == 1
+
+    assert render([Station(3)])["values"]["A4"] == "S003"
+    assert render([Station(1)], context={"unit": "l/s"}) == first
+    assert report_cache.cache_info().hits == 1
+
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["A2"] = "Code"
+    wb.save(path)
+    os.utime(path, ns=(1, 1))
+    assert render([Station(1)])["values"]["A2"] == "Code"
+    assert report_cache.cache_info().hits == 1
+
+
+def test_xml_generator_closes_spooled_rows(tags, templates_directory, tag_settings):
+    generator = make_generator(XmlReportGenerator, tags, templates_directory, tag_settings)
+    generator.generate_report(list_objects=[Station(1)], as_stream=True)
+
+    assert generator._rows_file.closed
+
+
+def test_xml_generator_rejects_conditional_formatting(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active.conditional_formatting.add("D4", CellIsRule(operator="lessThan", formula=["0"], font=Font(bold=True)))
+    wb.save(path)
+    generator = make_generator(XmlReportGenerator, tags, templates_directory, tag_settings)
+
+    with pytest.raises(UnsupportedTemplateException, match="conditionalFormatting"):
+        generator.generate_report(list_objects=[Station(1)], as_stream=True)
+
+
+def test_generators_render_the_same_report(tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    wb.active["F1"] = "{{DATE}}"
+    wb.active["F6"] = "=IF(D4>1,D7,$D$7)"
+    wb.save(path)
+    tags = [*tags, Tag("DATE", datetime.datetime(2024, 5, 1, 12, 30), tag_settings)]
+    stations = [Station(idx) for idx in (0, 2, 4, 1, 3)]
+
+    reports = [
+        read_report(
+            make_generator(generator_class, tags, templates_directory, tag_settings)
+            .generate_report(list_objects=stations, as_stream=True)
+        )
+        for generator_class in GENERATORS
+    ]
+
+    default, streaming, xml = reports
+    assert streaming == xml
+    # the Default generator also gives the HEADER rows it inserts the height of the DATA row
+    for report in reports:
+        del report["heights"]
+    assert default == streaming
+    assert xml["values"]["F1"] == "2024-05-01 12:30:00"
+    assert xml["values"]["F11"] == "=IF(D4>1,D12,$D$12)"
+
+
+@pytest.mark.parametrize("element", ["hyperlink", "data_validation"])
+def test_xml_generator_rejects_row_anchored_elements_next_to_tables(element, tags, templates_directory, tag_settings):
+    def add_element(ws):
+        if element == "hyperlink":
+            ws["F7"].hyperlink = "https://example.com"
+        else:
+            validation = DataValidation(type="whole")
+            validation.add("F7")
+            ws.add_data_validation(validation)
+
+    path = templates_directory / "stations.xlsx"
+    wb = openpyxl.load_workbook(path)
+    # worksheets without tables keep their elements
+    add_element(wb.create_sheet("Notes"))
+    wb.save(path)
+    make_generator(XmlReportGenerator, tags, templates_directory, tag_settings).generate_report(
+        list_objects=[Station(1)], as_stream=True
+    )
+
+    add_element(wb.active)
+    wb.save(path)
+    generator = make_generator(XmlReportGenerator, tags, templates_directory, tag_settings)
+
+    with pytest.raises(UnsupportedTemplateException, match="worksheet Sheet has .* elements"):
+        generator.generate_report(list_objects=[Station(1)], as_stream=True)
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+@pytest.mark.parametrize("kind", ["bytes", "memoryview", "mmap"])
+def test_templates_are_read_from_memory(generator_class, kind, tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    expected = read_report(
+        make_generator(generator_class, tags, templates_directory, tag_settings)
+        .generate_report(list_objects=[Station(0), Station(1)], as_stream=True)
+    )
+
+    with open(path, "rb") as f:
+        data = f.read() if kind != "mmap" else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if kind == "memoryview":
+        data = memoryview(data)
+    generator = generator_class(
+        tags=tags, template=data, template_name="memory.xlsx",
+        templates_directory_path=str(templates_directory / "missing"),
+        reports_directory_path=str(templates_directory / "reports"), tag_settings=tag_settings,
+        requires_header=True, template_cache=TemplateCache()
+    )
+    generator.validate()
+    os.remove(path)
+    report_path = generator.generate_report(list_objects=[Station(0), Station(1)])
+
+    assert report_path == str(templates_directory / "reports" / "memory.xlsx")
+    assert read_report(report_path) == expected
+    if kind == "mmap":
+        data.close()
+
+
+def test_template_store_maps_templates_once(templates_directory):
+    path = templates_directory / "stations.xlsx"
+    (templates_directory / "empty.xlsx").write_bytes(b"")
+    with TemplateStore() as template_store:
+        paths = template_store.preload(str(templates_directory))
+        mapped = template_store.get(str(path))
+
+        assert paths == [str(templates_directory / "empty.xlsx"), str(path)]
+        assert str(path) in template_store and len(template_store) == 2
+        assert template_store.get(str(templates_directory / "empty.xlsx")) == b""
+        assert bytes(mapped) == path.read_bytes()
+
+        # a template with a different size is mapped again, even if its modification time is the same
+        stat = os.stat(path)
+        with open(path, "ab") as f:
+            f.write(b"\0")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert template_store.get(str(path)) is not mapped
+        assert mapped.closed
+
+        template_store.clear()
+        assert len(template_store) == 0
+        with pytest.raises(FileNotFoundError):
+            template_store.get(str(templates_directory / "missing.xlsx"))
+
+
+def test_template_store_closes_replaced_maps(templates_directory):
+    path = str(templates_directory / "stations.xlsx")
+    with TemplateStore() as template_store:
+        first = template_store.get(path)
+        os.utime(path, ns=(1, 1))
+        second = template_store.get(path)
+
+        assert first.closed
+        assert not second.closed
+        assert template_store.get(path) is second
+
+    assert second.closed
+    assert len(template_store) == 0
+
+
+@pytest.mark.parametrize("generator_class", GENERATORS)
+def test_template_store_renders_modified_template(generator_class, tags, templates_directory, tag_settings):
+    path = templates_directory / "stations.xlsx"
+    with TemplateStore() as template_store:
+        generator = make_generator(
+            generator_class, tags, templates_directory, tag_settings, template_store=template_store
+        )
+        generator.generate_report(list_objects=[Station(1)], as_stream=True)
+
+        wb = openpyxl.load_workbook(path)
+        wb.active["A2"] = "Code"
+        wb.save(path)
+        os.utime(path, ns=(1, 1))
+        modified_generator = make_generator(
+            generator_class, tags, templates_directory, tag_settings, template_store=template_store
+        )
+        # the first generator still renders after the map it read the template from is closed
+        generator.generate_report(list_objects=[Station(1)], as_stream=True)
+        report = read_report(modified_generator.generate_report(list_objects=[Station(1)], as_stream=True))
+
+    assert report["values"]["A2"] == "Code"
+
+
+def test_exports_are_imported_lazily():
+    code = (
+        "import sys, ieasyreports.core.report_generator as report_generator; "
+        "assert 'openpyxl' not in sys.modules; "
+        "assert 'ieasyreports.core.report_generator.report_cache' not in sys.modules; "
+        "report_generator.fingerprint; "
+        "assert 'openpyxl' not in sys.modules; "
+        "assert 'DefaultReportGenerator' in dir(report_generator); "
+        "report_generator.DefaultReportGenerator; "
+        "assert 'openpyxl' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+    with pytest.raises(AttributeError, match="has no attribute 'Missing'"):
+        report_generator_package.Missing
+    with pytest.raises(AttributeError, match="has no attribute 'Missing'"):
+        tags_package.Missing
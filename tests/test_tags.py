@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""Tests for the tags of `ieasyreports`."""
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ieasyreports.core.tags import CachePolicy, Tag, TagResolver, TagValueCache
+from ieasyreports.core.tags import tag_cache as tag_cache_module
+from ieasyreports.settings import TagSettings
+
+
+@pytest.fixture
+def tag_settings():
+    return TagSettings()
+
+
+def test_process_cache_is_shared_by_resolvers_until_it_expires(tag_settings, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(tag_cache_module.time, "monotonic", lambda: now[0])
+    calls = []
+
+    def get_value(**kwargs):
+        calls.append(kwargs["station"])
+        return kwargs["station"].upper()
+
+    tag = Tag(
+        "STATION", get_value, tag_settings, cache_policy=CachePolicy.PROCESS, cache_key_args=["station"],
+        cache_ttl=60, cache_max_entries=2
+    )
+
+    assert TagResolver().get_value(tag, station="a", unit="m3/s") == "A"
+    assert TagResolver().get_value(tag, station="a", unit="l/s") == "A"
+    now[0] = 61
+    assert TagResolver().get_value(tag, station="a") == "A"
+    for station in ("b", "c"):
+        TagResolver().get_value(tag, station=station)
+
+    assert calls == ["a", "a", "b", "c"]
+    assert tag.cache_info() == (1, 4, 1, 2, 2)
+
+
+def test_value_cache_evicts_the_least_recently_used_values():
+    cache = TagValueCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert [cache.get(key) for key in ("a", "c")] == [1, 3]
+    assert cache.get("b") is tag_cache_module.MISSING
+    assert cache.cache_info().evictions == 1
+
+
+def test_context_is_read_only(tag_settings):
+    tag = Tag("UNIT", lambda **kwargs: kwargs["unit"], tag_settings, value_fn_args={"unit": "m3/s"})
+
+    with pytest.raises(TypeError):
+        tag.context["unit"] = "l/s"
+
+    assert tag.get_value() == "m3/s"
+
+
+def test_tag_is_immutable(tag_settings):
+    tag = Tag("UNIT", "m3/s", tag_settings)
+
+    with pytest.raises(AttributeError):
+        tag.get_value_fn = "l/s"
+    with pytest.raises(TypeError):
+        tag.value_fn_args["unit"] = "l/s"
+
+
+def test_set_context_is_deprecated(tag_settings):
+    tag = Tag("UNIT", lambda **kwargs: kwargs["unit"], tag_settings)
+
+    with pytest.warns(DeprecationWarning):
+        tag.set_context({"unit": "l/s"})
+
+    assert tag.get_value() == "l/s"
+
+
+def test_tag_can_be_pickled(tag_settings):
+    tag = Tag("UNIT", "m3/s", tag_settings, value_fn_args={"unit": "l/s"}, cache_policy=CachePolicy.PROCESS)
+
+    copied = pickle.loads(pickle.dumps(tag))
+
+    assert copied.get_value() == "m3/s"
+    assert dict(copied.value_fn_args) == {"unit": "l/s"}
+    assert copied.value_cache is not tag.value_cache
+
+
+def test_resolver_context_overrides_value_fn_args(tag_settings):
+    tag = Tag(
+        "UNIT", lambda **kwargs: (kwargs["a"], kwargs["b"], kwargs["c"]), tag_settings,
+        value_fn_args={"a": "args", "b": "args", "c": "args"}
+    )
+    resolver = TagResolver(context={"b": "global", "c": "global"})
+    resolver.update_tag_context("UNIT", {"c": "tag"})
+
+    assert resolver.get_value(tag) == ("args", "global", "tag")
+    assert resolver.get_value(tag, c="call") == ("args", "global", "call")
+    assert tag.get_value() == ("args", "args", "args")
+
+
+def test_render_cache_is_owned_by_the_resolver(tag_settings):
+    calls = []
+
+    def get_value(**kwargs):
+        calls.append(kwargs["station"])
+        return kwargs["station"].upper()
+
+    tag = Tag("STATION", get_value, tag_settings, cache_policy=CachePolicy.RENDER)
+    first, second = TagResolver(), TagResolver()
+
+    assert [first.get_value(tag, station=station) for station in ("a", "b", "a")] == ["A", "B", "A"]
+    assert second.get_value(tag, station="a") == "A"
+    assert calls == ["a", "b", "a"]
+    assert first.cache_info(tag).hits == 1
+
+
+def test_tag_is_shared_across_threads(tag_settings):
+    tag = Tag("UNIT", lambda **kwargs: kwargs["unit"], tag_settings)
+
+    def render(unit):
+        resolver = TagResolver(context={"unit": unit})
+        return [resolver.get_value(tag) for _ in range(100)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(render, [f"unit {idx}" for idx in range(8)]))
+
+    assert results == [[f"unit {idx}"] * 100 for idx in range(8)]